@@ -3,6 +3,11 @@ ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The kitchen display stream (``/api/kitchen/restaurant/<id>/stream/``) is an
+async Server-Sent Events view and needs to be served from here, e.g.
+``uvicorn backend.asgi:application``. Kitchen events travel through the
+database, so any number of ASGI and WSGI workers can serve it and publish.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
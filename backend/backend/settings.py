@@ -52,6 +52,9 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'superadmin.User'
 
 MIDDLEWARE = [
+    'superadmin.middleware.RequestInstrumentationMiddleware',
+    'superadmin.middleware.MetricsMiddleware',
+    'superadmin.middleware.SlowRequestProfilerMiddleware',
     'corsheaders.middleware.CorsMiddleware',
        'django.middleware.common.CommonMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -141,7 +144,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'superadmin.authentication.ScopedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
@@ -166,6 +169,140 @@ SIMPLE_JWT = {
 }
 
 
+# Cache
+# Holds health samples, dashboard payloads, access maps and token versions,
+# all invalidated by model signals, so every worker process must share it.
+# LocMemCache is private to one process and only used with DEBUG on; without
+# DEBUG the database cache is the default (run `manage.py createcachetable`)
+# until this points at Redis or Memcached. `manage.py check --deploy`
+# refuses a process-local cache (superadmin.E001).
+if DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'rms-default',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'rms_cache',
+        }
+    }
+
+
+# Seconds the admin dashboards' platform counters are cached
+PLATFORM_COUNTERS_CACHE_TIMEOUT = 30
+
+# Upper bound in seconds on how long a restaurant dashboard payload is
+# cached; model signals invalidate it earlier whenever its data changes
+DASHBOARD_CACHE_TIMEOUT = 300
+
+# Seconds a user's restaurant access map is cached; role and assignment
+# changes invalidate it immediately
+ACCESS_CACHE_TIMEOUT = 300
+
+# Seconds an employee's token version is cached when checking scoped JWTs
+TOKEN_VERSION_CACHE_TIMEOUT = 300
+
+
+# Per-endpoint budgets enforced by the benchmark_endpoints command. Query
+# counts are those of an uncached request, so they hold for --cold runs too
+# (including the token version and user role lookups behind the access token
+# check).
+ENDPOINT_BUDGETS = {
+    'owner_dashboard:dashboard-stats': {'queries': 12},
+    'owner_dashboard:analytics': {'queries': 5},
+    'owner_dashboard:order-history': {'queries': 4},
+    'staff_dashboard:dashboard-stats': {'queries': 10},
+    'staff_dashboard:table-management': {'queries': 5},
+    'kitchen_dashboard:dashboard-stats': {'queries': 12},
+    'superadmin:dashboard_stats': {'queries': 5},
+}
+
+
+# Idempotency-Key support on POST endpoints (superadmin.idempotency): stored
+# responses are replayed for this many seconds, expired keys are purged at
+# most once per interval, and an attempt that never finished stops blocking
+# retries after IDEMPOTENCY_LOCK_TIMEOUT seconds
+IDEMPOTENCY_KEY_TTL = 24 * 3600
+IDEMPOTENCY_PURGE_INTERVAL = 3600
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# Preparation time estimates (`manage.py fit_prep_estimates`): business days
+# of served history to fit on, and the fewest measured items per menu item
+PREP_ESTIMATE_WINDOW_DAYS = 90
+PREP_ESTIMATE_MIN_SAMPLES = 20
+
+# Kitchen display streams (kitchen_dashboard.events): seconds between polls
+# of the shared event table by each process holding streams, seconds events
+# are kept, and seconds a process's interest in a restaurant outlives its
+# last poll
+KITCHEN_EVENT_POLL_SECONDS = 0.5
+KITCHEN_EVENT_RETENTION_SECONDS = 300
+KITCHEN_EVENT_LISTENER_TTL = 30
+
+# Order ETAs (kitchen_dashboard.eta): cooks shared by the stations of
+# restaurants without Restaurant.kitchen_cooks, and seconds a cached
+# schedule is reused when the queue does not change
+KITCHEN_DEFAULT_COOKS = 2
+ORDER_ETA_REFRESH_SECONDS = 30
+
+# Station queues (kitchen_dashboard.stations): latest a pending item is
+# scheduled to start, in minutes after it was added, and minutes past its
+# order's due time before an item is flagged late
+STATION_MAX_WAIT_MINUTES = 20
+STATION_LATE_GRACE_MINUTES = 5
+
+# Request instrumentation (superadmin.middleware). Fraction of requests that
+# get Server-Timing headers and a log line; 0 disables the middleware.
+REQUEST_INSTRUMENTATION_SAMPLE_RATE = 0.0
+# Times one SQL statement may run in a request before it is logged as a duplicate
+REQUEST_INSTRUMENTATION_DUPLICATE_THRESHOLD = 3
+
+# Per-view request metrics served at /metrics. Each process writes its
+# numbers to a file in METRICS_DIR (default: <tmp>/rms-metrics) at most every
+# METRICS_FLUSH_INTERVAL seconds; the endpoint sums them. It only answers
+# requests from METRICS_ALLOWED_IPS or carrying METRICS_TOKEN as a bearer
+# token (an empty token disables token access).
+METRICS_ENABLED = False
+METRICS_FLUSH_INTERVAL = 1.0
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+METRICS_TOKEN = ''
+
+# Stack-sampling profiles of dashboard requests slower than
+# SLOW_REQUEST_THRESHOLD_MS, stored in PROFILE_DIR (default: <tmp>/rms-profiles)
+# and listed to administrators at /api/superadmin/profiles/
+SLOW_REQUEST_PROFILING_ENABLED = False
+SLOW_REQUEST_THRESHOLD_MS = 1000
+SLOW_REQUEST_SAMPLE_INTERVAL_MS = 5
+PROFILE_MAX_FILES = 200
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'superadmin.requests': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+
+# System health sampler
+SYSTEM_HEALTH_SAMPLE_INTERVAL = 5  # seconds between background samples
+SYSTEM_HEALTH_HISTORY_SIZE = 120  # samples kept in the ring buffer (10 minutes)
+
+
+# Daily statistics snapshots
+# Prefer scheduling `manage.py snapshot_daily_stats`; enable this to snapshot
+# from a background thread in each server process instead.
+DAILY_STATS_SCHEDULER_ENABLED = False
+DAILY_STATS_SNAPSHOT_INTERVAL = 3600  # seconds
+
+
 # # settings.py
 # AUTH_USER_MODEL = 'superadmin.Employee'
 
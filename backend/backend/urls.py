@@ -20,25 +20,23 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 
+from superadmin.views import metrics
+
 @csrf_exempt
 def dashboard_stats_view(request):
     """Simple dashboard stats endpoint"""
     try:
-        # Import models inside the function to avoid import issues
-        from superadmin.models import Restaurant, Employee, Vendor
-
-        # Get current counts
-        total_restaurants = Restaurant.objects.count()
-        total_employees = Employee.objects.count()
-        total_vendors = Vendor.objects.count()
-
-        # Calculate week-over-week changes
-        from datetime import timedelta
-        week_ago = timezone.now() - timedelta(days=7)
+        # Import inside the function to avoid import issues
+        from superadmin.stats import get_platform_counters
 
-        restaurants_week_ago = Restaurant.objects.filter(created_at__lt=week_ago).count()
-        employees_week_ago = Employee.objects.filter(created_at__lt=week_ago).count()
-        vendors_week_ago = Vendor.objects.filter(created_at__lt=week_ago).count()
+        # Current and week-ago counts from one aggregate query
+        counters = get_platform_counters()
+        total_restaurants = counters['restaurants']['total']
+        total_employees = counters['employees']['total']
+        total_vendors = counters['vendors']['total']
+        restaurants_week_ago = counters['restaurants']['week_ago']
+        employees_week_ago = counters['employees']['week_ago']
+        vendors_week_ago = counters['vendors']['week_ago']
 
         # Calculate percentage changes
         restaurant_change = ((total_restaurants - restaurants_week_ago) / max(restaurants_week_ago, 1)) * 100 if restaurants_week_ago > 0 else 0
@@ -85,6 +83,7 @@ def dashboard_stats_view(request):
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/dashboard-stats/', dashboard_stats_view, name='dashboard-stats'),
+    path('metrics', metrics, name='metrics'),
     path('api/superadmin/', include('superadmin.urls')),
     path('api/owner/', include('owner_dashboard.urls')),
     path('api/kitchen/', include('kitchen_dashboard.urls')),
@@ -0,0 +1,166 @@
+"""
+Order ready-time predictions from the live kitchen queue.
+
+Each kitchen station works through its own items in parallel with the
+others (items routed to no station form one more queue). A station's items
+are replayed on its cooks with a heap of the times each cook becomes free:
+items already preparing keep their cooks for whatever is left of their
+preparation_time, then pending items are taken in the order the station
+display shows them (see stations.schedule_station). Every unit of a line's
+quantity is one job, and a line is ready when its last unit is. An order is
+ready when its last item is.
+
+A station with KitchenStation.cooks has that many cooks. The restaurant's
+cooks (Restaurant.kitchen_cooks, or KITCHEN_DEFAULT_COOKS) are split evenly
+across the other queues that have items, each getting at least one.
+
+The whole restaurant schedule is computed at once and cached under the
+restaurant's dashboard version, so it is rebuilt only when the queue, the
+menu, the stations or the restaurant change, and at least
+ORDER_ETA_REFRESH_SECONDS after it was built so late items push their
+estimates back. The refresh is timed per restaurant, so schedules do not
+all expire together.
+"""
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from superadmin.dashboard_cache import cached_dashboard
+from superadmin.models import KitchenStation, Restaurant
+from .queue import active_queue_items
+from .stations import pending_priority, start_by_time
+
+
+DEFAULT_COOKS = getattr(settings, 'KITCHEN_DEFAULT_COOKS', 2)
+REFRESH_SECONDS = getattr(settings, 'ORDER_ETA_REFRESH_SECONDS', 30)
+
+
+def _run(free_at, quantity, duration):
+    """Give each unit to the first free cook; when the last unit is done"""
+    finish = None
+    for _ in range(max(quantity, 1)):
+        done = heapq.heappop(free_at) + duration
+        heapq.heappush(free_at, done)
+        finish = done if finish is None else max(finish, done)
+    return finish
+
+
+def queue_due_times(items):
+    """When each order should be complete: its first item's arrival plus its longest preparation"""
+    first_added, longest = {}, {}
+    for item in items:
+        order_id = item['order_id']
+        first_added[order_id] = min(first_added.get(order_id, item['added_at']), item['added_at'])
+        longest[order_id] = max(longest.get(order_id, 0), item['preparation_time'])
+    return {order_id: added + timedelta(minutes=longest[order_id]) for order_id, added in first_added.items()}
+
+
+def simulate_station(items, cooks, now, due_times):
+    """Estimated ready time per item id of one station's queue"""
+    free_at = [now] * max(cooks, 1)
+    estimates = {}
+
+    preparing = sorted(
+        (item for item in items if item['status'] == 'preparing'),
+        key=lambda item: item['preparing_at'] or now
+    )
+    for item in preparing:
+        started = item['preparing_at'] or now
+        remaining = max(started + timedelta(minutes=item['preparation_time']) - now, timedelta(0))
+        estimates[item['id']] = _run(free_at, item['quantity'], remaining)
+
+    pending = sorted(
+        (item for item in items if item['status'] == 'pending'),
+        key=lambda item: pending_priority(
+            start_by_time(due_times.get(item['order_id']), item['added_at'], item['preparation_time']),
+            item['added_at'], item['id']
+        )
+    )
+    for item in pending:
+        estimates[item['id']] = _run(free_at, item['quantity'], timedelta(minutes=item['preparation_time']))
+
+    for item in items:
+        if item['status'] == 'ready':
+            estimates[item['id']] = item['ready_at'] or now
+    return estimates
+
+
+def assign_cooks(queues, station_cooks, shared_cooks):
+    """
+    Cooks per queue (station id, or None for unrouted items).
+
+    Stations with cooks of their own keep them; ``shared_cooks`` are split
+    evenly across the other queues, each getting at least one.
+    """
+    cooks = {queue: station_cooks[queue] for queue in queues if station_cooks.get(queue)}
+    shared = sorted((queue for queue in queues if queue not in cooks), key=lambda queue: (queue is None, queue))
+    if shared:
+        share, extra = divmod(shared_cooks, len(shared))
+        for index, queue in enumerate(shared):
+            cooks[queue] = max(1, share + (index < extra))
+    return cooks
+
+
+def simulate_kitchen(items, now, station_cooks=None, shared_cooks=DEFAULT_COOKS):
+    """
+    Estimated ready time per item id.
+
+    ``items`` are dicts with id, order_id, station_id, status, quantity,
+    preparation_time (minutes), added_at, preparing_at and ready_at of
+    every open or ready item of the orders in the queue. ``station_cooks``
+    maps station ids to their own cook counts; see assign_cooks().
+    """
+    stations = {}
+    for item in items:
+        stations.setdefault(item['station_id'], []).append(item)
+    cooks = assign_cooks(stations, station_cooks or {}, shared_cooks)
+    due_times = queue_due_times(items)
+    estimates = {}
+    for station_id, station_items in stations.items():
+        estimates.update(simulate_station(station_items, cooks[station_id], now, due_times))
+    return estimates
+
+
+def build_kitchen_schedule(restaurant_id):
+    """Predicted ready time of every order with items in the kitchen queue"""
+    shared_cooks = Restaurant.objects.filter(pk=restaurant_id).values_list('kitchen_cooks', flat=True).get()
+    shared_cooks = shared_cooks or DEFAULT_COOKS
+    station_cooks = dict(
+        KitchenStation.objects.filter(restaurant_id=restaurant_id, cooks__isnull=False).values_list('id', 'cooks')
+    )
+    items = list(
+        active_queue_items(restaurant_id)
+        .filter(status__in=('pending', 'preparing', 'ready'))
+        .order_by('added_at', 'pk')
+        .values('id', 'order_id', 'station_id', 'status', 'quantity', 'added_at', 'preparing_at', 'ready_at',
+                preparation_time=F('menu_item__preparation_time'))
+    )
+    now = timezone.now()
+    estimates = simulate_kitchen(items, now, station_cooks, shared_cooks)
+
+    orders = {}
+    for item in items:
+        order = orders.setdefault(item['order_id'], {
+            'order_id': item['order_id'],
+            'estimated_ready_at': now,
+            'items': {'pending': 0, 'preparing': 0, 'ready': 0},
+        })
+        order['items'][item['status']] += 1
+        order['estimated_ready_at'] = max(order['estimated_ready_at'], estimates[item['id']])
+    return {
+        'cooks': shared_cooks,
+        'computed_at': now,
+        'orders': orders,
+    }
+
+
+def kitchen_schedule(restaurant_id):
+    """Cached schedule; returns ``(schedule, hit)``"""
+    return cached_dashboard(
+        'eta', restaurant_id,
+        lambda: build_kitchen_schedule(restaurant_id),
+        timeout=REFRESH_SECONDS
+    )
@@ -0,0 +1,233 @@
+"""
+Publish/subscribe hub for kitchen display events, shared by every process.
+
+Publishers append events to the KitchenEvent table, so a write served by
+any WSGI or ASGI worker reaches every stream. Each process holding stream
+connections runs one poller thread that reads the events after the oldest
+cursor of its subscribers in one query and hands them to the subscribers'
+asyncio queues with ``call_soon_threadsafe``. Ids are handed out before
+commit, so a lower id can become visible after a higher one; events created
+within LATE_COMMIT_SECONDS are read again and delivered if they were not
+seen yet. Subscribed processes keep a per-restaurant key alive in the
+shared cache; publishers skip the write when no process is listening.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from superadmin.models import KitchenEvent, OrderItem
+from .queue import serialize_queue_item
+
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = getattr(settings, 'KITCHEN_EVENT_POLL_SECONDS', 0.5)
+RETENTION_SECONDS = getattr(settings, 'KITCHEN_EVENT_RETENTION_SECONDS', 300)
+LISTENER_TTL = getattr(settings, 'KITCHEN_EVENT_LISTENER_TTL', 30)
+
+LISTENER_KEY = 'kitchen:listeners:{}'
+
+# Events buffered per subscriber before it is asked to resync from a snapshot
+SUBSCRIBER_QUEUE_SIZE = 256
+
+# Events read per poll; a full batch is followed by another poll right away
+POLL_BATCH_SIZE = 1000
+
+# Seconds an event may take from insert to commit and still be delivered
+LATE_COMMIT_SECONDS = 5
+
+RESYNC = {'type': 'resync'}
+
+
+def listen(restaurant_id):
+    """
+    Mark a restaurant as streamed and return the id its events follow.
+
+    Called before subscribing and before the snapshot is read, so every
+    event committed after the snapshot has a larger id.
+    """
+    cache.set(LISTENER_KEY.format(restaurant_id), True, timeout=LISTENER_TTL)
+    return KitchenEvent.objects.aggregate(last=Max('pk'))['last'] or 0
+
+
+def has_listeners(restaurant_id):
+    """Whether a stream of this restaurant is open in any process"""
+    return bool(cache.get(LISTENER_KEY.format(restaurant_id)))
+
+
+def publish(restaurant_id, *events):
+    """Send events to every subscriber of a restaurant's kitchen channel"""
+    KitchenEvent.objects.bulk_create([
+        KitchenEvent(restaurant_id=restaurant_id, payload=event) for event in events
+    ])
+
+
+class Subscription:
+    def __init__(self, restaurant_id, loop, after, station_id=None):
+        self.restaurant_id = restaurant_id
+        # Station displays only receive events of their own items
+        self.station_id = station_id
+        self.loop = loop
+        # Events up to this id are reflected in the snapshot or delivered,
+        # apart from late commits, which are matched against ``seen``
+        self.cursor = after
+        self.after = after
+        self.seen = set()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def deliver(self, event):
+        """Runs on the subscriber's event loop"""
+        if self.overflowed:
+            return
+        item = event.get('item')
+        if self.station_id is not None and item is not None and item.get('station_id') != self.station_id:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow consumer: drop buffered events and ask for a fresh snapshot
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    async def get(self):
+        event = await self.queue.get()
+        if event is RESYNC:
+            self.overflowed = False
+        return event
+
+
+class KitchenBroker:
+    def __init__(self, poll_seconds=POLL_SECONDS):
+        # None disables the poller thread; poll() is then called directly
+        self.poll_seconds = poll_seconds
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pruned_at = 0.0
+        self._listened_at = 0.0
+
+    def subscribe(self, restaurant_id, after, station_id=None, loop=None):
+        """Register a subscriber for events after ``after`` (see listen())"""
+        subscription = Subscription(restaurant_id, loop or asyncio.get_running_loop(), after, station_id)
+        with self._lock:
+            self._subscribers[restaurant_id].add(subscription)
+            if self.poll_seconds is not None and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='kitchen-events', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.restaurant_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.restaurant_id]
+
+    def poll(self):
+        """
+        Deliver new events to this process's subscribers.
+
+        Returns whether a full batch was read, so more may be waiting.
+        """
+        with self._lock:
+            subscriptions = [s for subscribers in self._subscribers.values() for s in subscribers]
+        if not subscriptions:
+            return False
+
+        self._keep_listening({s.restaurant_id for s in subscriptions})
+        late_after = timezone.now() - timedelta(seconds=LATE_COMMIT_SECONDS)
+        events = list(
+            KitchenEvent.objects.filter(
+                Q(pk__gt=min(s.cursor for s in subscriptions)) | Q(created_at__gte=late_after),
+                restaurant_id__in={s.restaurant_id for s in subscriptions},
+            ).order_by('pk').values_list('pk', 'restaurant_id', 'payload')[:POLL_BATCH_SIZE]
+        )
+        by_restaurant = defaultdict(list)
+        for event_id, restaurant_id, payload in events:
+            by_restaurant[restaurant_id].append((event_id, payload))
+
+        for subscription in subscriptions:
+            candidates = [(event_id, payload) for event_id, payload in by_restaurant[subscription.restaurant_id]
+                          if event_id > subscription.after]
+            pending = [payload for event_id, payload in candidates if event_id not in subscription.seen]
+            # Everything delivered that can still come back in the next poll
+            subscription.seen = {event_id for event_id, _ in candidates}
+            if events:
+                subscription.cursor = max(subscription.cursor, events[-1][0])
+            for payload in pending:
+                try:
+                    subscription.loop.call_soon_threadsafe(subscription.deliver, payload)
+                except RuntimeError:
+                    # Loop already closed; the stream's cleanup will unsubscribe it
+                    break
+
+        self._prune()
+        return len(events) == POLL_BATCH_SIZE
+
+    def _keep_listening(self, restaurant_ids):
+        now = time.monotonic()
+        if now - self._listened_at < LISTENER_TTL / 3:
+            return
+        self._listened_at = now
+        cache.set_many({LISTENER_KEY.format(restaurant_id): True for restaurant_id in restaurant_ids},
+                       timeout=LISTENER_TTL)
+
+    def _prune(self):
+        now = time.monotonic()
+        if now - self._pruned_at < RETENTION_SECONDS / 10:
+            return
+        self._pruned_at = now
+        KitchenEvent.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=RETENTION_SECONDS)).delete()
+
+    def _run(self):
+        try:
+            while True:
+                with self._lock:
+                    if not self._subscribers:
+                        self._thread = None
+                        return
+                close_old_connections()
+                try:
+                    more = self.poll()
+                except Exception:
+                    logger.exception('Kitchen event poll failed')
+                    more = False
+                if not more:
+                    time.sleep(self.poll_seconds)
+        finally:
+            connection.close()
+
+
+broker = KitchenBroker()
+
+
+def publish_item_events(restaurant_id, event_type, item_ids, previous_status=None):
+    """
+    Load order items in one query and publish an event for each.
+
+    ``previous_status`` maps item id to the status it moved from, for
+    ``item.status`` events. Nothing is loaded when no screen is listening.
+    """
+    if not has_listeners(restaurant_id):
+        return
+    items = OrderItem.objects.filter(pk__in=item_ids).select_related('order__table', 'menu_item')
+    events = []
+    for item in items:
+        event = {'type': event_type, 'item': serialize_queue_item(item)}
+        if previous_status is not None:
+            event['from'] = previous_status.get(item.pk)
+        events.append(event)
+    publish(restaurant_id, *events)
@@ -0,0 +1,115 @@
+"""
+Fit per-menu-item cook time estimates from the transition log.
+
+Cook times come from the database (see prep_times.measured_items) and are
+summarised per menu item with NumPy using robust statistics: samples whose
+modified z-score (0.6745 * |x - median| / MAD) exceeds OUTLIER_Z are
+dropped, which removes items left on the pass or bumped by mistake, and the
+recommended preparation time is a high percentile of what remains, rounded
+up to whole minutes. Used by `manage.py fit_prep_estimates`.
+"""
+import math
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from superadmin.business_dates import restaurant_today
+from superadmin.dashboard_cache import bump_restaurant_version
+from superadmin.models import MenuItem, MenuItemPrepEstimate
+from .prep_times import measured_items
+
+
+WINDOW_DAYS = getattr(settings, 'PREP_ESTIMATE_WINDOW_DAYS', 90)
+MIN_SAMPLES = getattr(settings, 'PREP_ESTIMATE_MIN_SAMPLES', 20)
+
+# Percentile of the inlier cook times recommended as preparation_time
+RECOMMENDED_PERCENTILE = 75
+OUTLIER_Z = 3.5
+
+# Scales a MAD to a standard deviation for normally distributed data
+MAD_SCALE = 1.4826
+
+ESTIMATE_FIELDS = ('sample_count', 'outlier_count', 'median_minutes', 'mad_minutes', 'p90_minutes',
+                   'recommended_minutes', 'window_start', 'window_end', 'computed_at')
+
+
+def cook_time_samples(restaurant_id, start_date, end_date):
+    """(menu item ids, cook minutes) arrays, sorted by menu item"""
+    rows = (
+        measured_items(restaurant_id, start_date, end_date)
+        .order_by('menu_item_id')
+        .values_list('menu_item_id', 'cook_time')
+    )
+    menu_item_ids, minutes = [], []
+    for menu_item_id, cook_time in rows.iterator(chunk_size=5000):
+        menu_item_ids.append(menu_item_id)
+        minutes.append(cook_time.total_seconds() / 60)
+    return np.asarray(menu_item_ids, dtype=np.int64), np.asarray(minutes, dtype=np.float64)
+
+
+def robust_summary(minutes):
+    """Outlier-filtered statistics of one menu item's cook times"""
+    median = np.median(minutes)
+    mad = np.median(np.abs(minutes - median))
+    if mad > 0:
+        inliers = minutes[0.6745 * np.abs(minutes - median) / mad <= OUTLIER_Z]
+    else:
+        # More than half the samples are identical; keep everything
+        inliers = minutes
+    return {
+        'sample_count': int(minutes.size),
+        'outlier_count': int(minutes.size - inliers.size),
+        'median_minutes': round(float(np.median(inliers)), 2),
+        'mad_minutes': round(float(mad * MAD_SCALE), 2),
+        'p90_minutes': round(float(np.percentile(inliers, 90)), 2),
+        'recommended_minutes': max(1, math.ceil(float(np.percentile(inliers, RECOMMENDED_PERCENTILE)))),
+    }
+
+
+def fit_restaurant(restaurant_id, window_days=WINDOW_DAYS, min_samples=MIN_SAMPLES, apply=False):
+    """
+    Fit and store estimates for one restaurant's menu items.
+
+    Items with fewer than ``min_samples`` measured cook times keep their
+    previous estimate, if any. With ``apply`` the recommendation is also
+    written to MenuItem.preparation_time. Returns ``(fitted, applied)``
+    counts.
+    """
+    window_end = restaurant_today(restaurant_id)
+    window_start = window_end - timedelta(days=window_days - 1)
+    menu_item_ids, minutes = cook_time_samples(restaurant_id, window_start, window_end)
+
+    # Split the sorted samples into one run per menu item
+    groups, starts = np.unique(menu_item_ids, return_index=True)
+    estimates = []
+    for menu_item_id, samples in zip(groups.tolist(), np.split(minutes, starts[1:])):
+        if samples.size < min_samples:
+            continue
+        estimates.append(MenuItemPrepEstimate(
+            menu_item_id=menu_item_id, window_start=window_start, window_end=window_end,
+            **robust_summary(samples)
+        ))
+    if not estimates:
+        return 0, 0
+
+    applied = 0
+    with transaction.atomic():
+        MenuItemPrepEstimate.objects.bulk_create(
+            estimates, update_conflicts=True, unique_fields=['menu_item'], update_fields=ESTIMATE_FIELDS
+        )
+        if apply:
+            recommended = {estimate.menu_item_id: estimate.recommended_minutes for estimate in estimates}
+            changed = [
+                menu_item for menu_item in MenuItem.objects.filter(pk__in=recommended).only('id', 'preparation_time')
+                if menu_item.preparation_time != recommended[menu_item.pk]
+            ]
+            for menu_item in changed:
+                menu_item.preparation_time = recommended[menu_item.pk]
+            MenuItem.objects.bulk_update(changed, ['preparation_time'])
+            applied = len(changed)
+            if changed:
+                # Cached dashboards were computed from the old times
+                transaction.on_commit(lambda: bump_restaurant_version(restaurant_id))
+    return len(estimates), applied
@@ -0,0 +1,110 @@
+"""
+Queue wait and cook time from the order item transition log.
+
+Queue wait runs from an item being added to its last move into
+'preparing' (an undone start does not count), cook time from there to its
+move into 'ready'. Only items with both transitions are measured. All
+figures are computed in the database: averages with one aggregate query,
+nearest-rank percentiles with window functions.
+"""
+import math
+
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, OuterRef, Q, Subquery, Window
+from django.db.models.functions import Ceil, RowNumber
+
+from superadmin.models import OrderItem, OrderItemTransition
+
+
+PERCENTILES = (50, 90, 99)
+
+# Groupings accepted by prep_time_percentiles, mapped to their field
+GROUPINGS = {
+    'menu_item': 'menu_item_id',
+    'day': 'order__business_date',
+}
+
+
+def _entered(status, last):
+    """When each item first (or last) entered a status, from the transition log"""
+    return Subquery(
+        OrderItemTransition.objects
+        .filter(item=OuterRef('pk'), to_status=status)
+        .order_by('-at' if last else 'at')
+        .values('at')[:1]
+    )
+
+
+def _duration(end, start):
+    return ExpressionWrapper(F(end) - F(start), output_field=DurationField())
+
+
+def measured_items(restaurant_id, start_date, end_date):
+    """Items of a restaurant's orders in a business-date range, with queue_wait and cook_time"""
+    return (
+        OrderItem.objects
+        .filter(order__restaurant_id=restaurant_id, order__business_date__range=(start_date, end_date))
+        .annotate(started=_entered('preparing', last=True), finished=_entered('ready', last=False))
+        .filter(started__isnull=False, finished__isnull=False)
+        .annotate(queue_wait=_duration('started', 'added_at'), cook_time=_duration('finished', 'started'))
+    )
+
+
+def _minutes(duration):
+    return round(duration.total_seconds() / 60, 1) if duration is not None else None
+
+
+def prep_time_summary(restaurant_id, day):
+    """Average queue wait and cook time of one business day, in minutes"""
+    totals = measured_items(restaurant_id, day, day).aggregate(
+        items=Count('id'),
+        avg_queue_wait=Avg('queue_wait'),
+        avg_cook_time=Avg('cook_time'),
+    )
+    return {
+        'measured_items': totals['items'],
+        'avg_queue_wait_minutes': _minutes(totals['avg_queue_wait']) or 0,
+        'avg_cook_time_minutes': _minutes(totals['avg_cook_time']) or 0,
+    }
+
+
+def prep_time_percentiles(restaurant_id, start_date, end_date, group_by='menu_item'):
+    """
+    p50/p90/p99 of queue wait and cook time per menu item or per day.
+
+    One query ranks each item within its group by both durations and keeps
+    only the rows sitting at a percentile rank (ceil(p * n)), so at most a
+    handful of rows per group leave the database.
+    """
+    group_field = GROUPINGS[group_by]
+    partition = [F(group_field)]
+    ranks = Q()
+    for percentile in PERCENTILES:
+        rank = Ceil(F('group_size') * (percentile / 100))
+        ranks |= Q(wait_rank=rank) | Q(cook_rank=rank)
+
+    rows = (
+        measured_items(restaurant_id, start_date, end_date)
+        .annotate(
+            group_key=F(group_field),
+            group_size=Window(Count('id'), partition_by=partition),
+            wait_rank=Window(RowNumber(), partition_by=partition, order_by=[F('queue_wait').asc(), F('pk').asc()]),
+            cook_rank=Window(RowNumber(), partition_by=partition, order_by=[F('cook_time').asc(), F('pk').asc()]),
+        )
+        .filter(ranks)
+        .values('group_key', 'group_size', 'wait_rank', 'cook_rank', 'queue_wait', 'cook_time')
+    )
+
+    groups = {}
+    for row in rows:
+        group = groups.setdefault(row['group_key'], {
+            'items': row['group_size'],
+            'queue_wait_minutes': {},
+            'cook_time_minutes': {},
+        })
+        for percentile in PERCENTILES:
+            rank = math.ceil(row['group_size'] * (percentile / 100))
+            if row['wait_rank'] == rank:
+                group['queue_wait_minutes'][f'p{percentile}'] = _minutes(row['queue_wait'])
+            if row['cook_rank'] == rank:
+                group['cook_time_minutes'][f'p{percentile}'] = _minutes(row['cook_time'])
+    return groups
@@ -0,0 +1,81 @@
+"""
+Kitchen queue reads shared by the dashboard endpoint and the live stream
+"""
+from django.db.models import Count, Q
+
+from superadmin.models import OrderItem
+
+
+QUEUE_STATUSES = ('pending', 'preparing', 'ready')
+
+# Per queue: ordering field, timestamp key shown on screen, field it comes
+# from; items moved before the status timestamps existed fall back to
+# updated_at
+QUEUE_LAYOUT = {
+    'pending': ('added_at', 'added_at', 'added_at'),
+    'preparing': ('added_at', 'started_at', 'preparing_at'),
+    'ready': ('updated_at', 'ready_at', 'ready_at'),
+}
+
+
+def active_queue_items(restaurant_id):
+    """Order items of a restaurant's active orders"""
+    return OrderItem.objects.filter(
+        order__restaurant_id=restaurant_id,
+        order__status='active'
+    )
+
+
+def queue_summary(restaurant_id):
+    """Pending/preparing/ready counts in a single aggregate query"""
+    return active_queue_items(restaurant_id).aggregate(
+        pending_items=Count('id', filter=Q(status='pending')),
+        preparing_items=Count('id', filter=Q(status='preparing')),
+        ready_items=Count('id', filter=Q(status='ready')),
+    )
+
+
+def serialize_queue_item(item):
+    """Full kitchen-screen representation of an order item"""
+    return {
+        'id': item.pk,
+        'order_id': item.order_id,
+        'menu_item': item.menu_item.name,
+        'quantity': item.quantity,
+        'status': item.status,
+        'station_id': item.station_id,
+        'table_number': item.order.table.number if item.order.table else None,
+        'added_at': item.added_at.isoformat() if item.added_at else None,
+        'updated_at': item.updated_at.isoformat() if item.updated_at else None,
+    }
+
+
+def queue_entries(restaurant_id, queue_status, limit=10):
+    """The first ``limit`` items of one queue, in display order"""
+    ordering, timestamp_key, timestamp_field = QUEUE_LAYOUT[queue_status]
+    items = (
+        active_queue_items(restaurant_id)
+        .filter(status=queue_status)
+        .select_related('order', 'menu_item', 'order__table')
+        .order_by(ordering)[:limit]
+    )
+    entries = []
+    for item in items:
+        timestamp = getattr(item, timestamp_field) or item.updated_at
+        entries.append({
+            'id': item.pk,
+            'menu_item': item.menu_item.name,
+            'quantity': item.quantity,
+            'table_number': item.order.table.number if item.order.table else None,
+            'order_id': item.order.id,
+            timestamp_key: timestamp.isoformat() if timestamp else None
+        })
+    return entries
+
+
+def kitchen_queue_snapshot(restaurant_id, limit=10):
+    """Queue counts plus the head of each queue: four queries in total"""
+    snapshot = {'queue_summary': queue_summary(restaurant_id)}
+    for queue_status in QUEUE_STATUSES:
+        snapshot[f'{queue_status}_queue'] = queue_entries(restaurant_id, queue_status, limit)
+    return snapshot
@@ -0,0 +1,86 @@
+"""
+Publish order item changes to the kitchen display stream and record status
+changes in the OrderItemTransition log
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from superadmin.models import Order, OrderItem, OrderItemTransition
+from superadmin.signals import DEFERRED, loaded_values
+from .events import has_listeners, publish, publish_item_events
+
+
+def _loaded_status(instance):
+    return loaded_values(instance, ('status',))[0]
+
+
+def _status_changed(previous, current):
+    # A status deferred at load time and still unloaded was not saved
+    return current is not DEFERRED and previous != current
+
+
+@receiver(post_init, sender=OrderItem)
+def remember_item_status(sender, instance, **kwargs):
+    instance._kitchen_status = _loaded_status(instance)
+
+
+@receiver(post_save, sender=OrderItem)
+def publish_item_change(sender, instance, created, **kwargs):
+    """Log a status change and publish it; one receiver, so both see the same previous status"""
+    previous = instance._kitchen_status
+    current = _loaded_status(instance)
+    instance._kitchen_status = current
+    if not created and not _status_changed(previous, current):
+        return
+    if not created and previous is not DEFERRED:
+        OrderItemTransition.objects.create(
+            item=instance, from_status=previous, to_status=current, at=instance.updated_at
+        )
+
+    restaurant_id = instance.order.restaurant_id
+    if not has_listeners(restaurant_id):
+        return
+
+    item_id = instance.pk
+    if created:
+        transaction.on_commit(lambda: publish_item_events(restaurant_id, 'item.created', [item_id]))
+    else:
+        transaction.on_commit(lambda: publish_item_events(
+            restaurant_id, 'item.status', [item_id],
+            previous_status={item_id: None if previous is DEFERRED else previous}
+        ))
+
+
+@receiver(post_delete, sender=OrderItem)
+def publish_item_removal(sender, instance, **kwargs):
+    restaurant_id = Order.objects.filter(pk=instance.order_id).values_list('restaurant_id', flat=True).first()
+    if restaurant_id is None or not has_listeners(restaurant_id):
+        return
+    event = {'type': 'item.removed', 'item': {
+        'id': instance.pk, 'order_id': instance.order_id, 'station_id': instance.station_id
+    }}
+    transaction.on_commit(lambda: publish(restaurant_id, event))
+
+
+@receiver(post_init, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    instance._kitchen_status = _loaded_status(instance)
+
+
+@receiver(post_save, sender=Order)
+def publish_order_status(sender, instance, created, **kwargs):
+    """Items leave the kitchen queues when their order stops being active"""
+    previous = instance._kitchen_status
+    current = _loaded_status(instance)
+    instance._kitchen_status = current
+    if created or not _status_changed(previous, current):
+        return
+    restaurant_id = instance.restaurant_id
+    if not has_listeners(restaurant_id):
+        return
+    event = {
+        'type': 'order.status', 'order_id': instance.pk,
+        'from': None if previous is DEFERRED else previous, 'to': current
+    }
+    transaction.on_commit(lambda: publish(restaurant_id, event))
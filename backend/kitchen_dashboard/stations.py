@@ -0,0 +1,127 @@
+"""
+Per-station kitchen queues.
+
+Order items are routed to a KitchenStation when they are created (see
+OrderItem.station), so each station display reads only its own open items
+through the station/status index. Pending items are scheduled so the items
+of one order finish together: an order is due when its longest item would
+be done had it started when the order came in, each item should start by
+``due - preparation_time``, and the queue runs in order of that start time.
+No item is scheduled to start later than STATION_MAX_WAIT_MINUTES after it
+was added, so a long-waiting item moves ahead of newer, tighter orders
+instead of starving behind them. An item is late once it can no longer be
+ready within STATION_LATE_GRACE_MINUTES of its order's due time.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+
+from superadmin.models import KitchenStation, OrderItem
+
+
+MAX_WAIT = timedelta(minutes=getattr(settings, 'STATION_MAX_WAIT_MINUTES', 20))
+LATE_GRACE = timedelta(minutes=getattr(settings, 'STATION_LATE_GRACE_MINUTES', 5))
+
+OPEN_STATUSES = ('pending', 'preparing')
+
+
+def restaurant_stations(restaurant_id):
+    """Active stations of a restaurant with open item counts, in one query"""
+    open_items = Q(order_items__order__status='active')
+    return (
+        KitchenStation.objects
+        .filter(restaurant_id=restaurant_id, is_active=True)
+        .annotate(
+            pending_items=Count('order_items', filter=open_items & Q(order_items__status='pending')),
+            preparing_items=Count('order_items', filter=open_items & Q(order_items__status='preparing')),
+        )
+    )
+
+
+def station_open_items(station_id):
+    """Pending and preparing items of active orders routed to a station"""
+    return OrderItem.objects.filter(
+        station_id=station_id,
+        status__in=OPEN_STATUSES,
+        order__status='active'
+    )
+
+
+def order_due_times(order_ids):
+    """When each order should be complete, from all of its open items across stations"""
+    rows = (
+        OrderItem.objects
+        .filter(order_id__in=order_ids, status__in=OPEN_STATUSES + ('ready',))
+        .values('order_id')
+        .annotate(first_added=Min('added_at'), longest=Max('menu_item__preparation_time'))
+    )
+    return {
+        row['order_id']: row['first_added'] + timedelta(minutes=row['longest'] or 0)
+        for row in rows
+    }
+
+
+def start_by_time(due_at, added_at, preparation_time):
+    """Latest start that has an item ready by its order's due time"""
+    return (due_at or added_at) - timedelta(minutes=preparation_time)
+
+
+def pending_priority(start_by, added_at, item_id):
+    """Sort key of a pending item: its start-by time, but no later than MAX_WAIT after it was added"""
+    return (min(start_by, added_at + MAX_WAIT), item_id)
+
+
+def schedule_station(items, due_times):
+    """Preparing items by start time, then pending items by start-by time capped at MAX_WAIT"""
+    def start_by(item):
+        return start_by_time(due_times.get(item.order_id), item.added_at, item.menu_item.preparation_time)
+
+    preparing = sorted(
+        (item for item in items if item.status == 'preparing'),
+        key=lambda item: (item.preparing_at or item.updated_at, item.pk)
+    )
+    pending = sorted(
+        (item for item in items if item.status == 'pending'),
+        key=lambda item: pending_priority(start_by(item), item.added_at, item.pk)
+    )
+    return [
+        (item, due_times.get(item.order_id), start_by(item))
+        for item in preparing + pending
+    ]
+
+
+def station_queue(station_id, now=None):
+    """A station's open items in the order they should be cooked: two queries"""
+    now = now or timezone.now()
+    items = list(station_open_items(station_id).select_related('order__table', 'menu_item'))
+    due_times = order_due_times({item.order_id for item in items})
+
+    entries = []
+    for item, due_at, start_by in schedule_station(items, due_times):
+        started = item.preparing_at if item.status == 'preparing' else None
+        ready_by = (started or now) + timedelta(minutes=item.menu_item.preparation_time)
+        entries.append({
+            'id': item.pk,
+            'order_id': item.order_id,
+            'menu_item': item.menu_item.name,
+            'quantity': item.quantity,
+            'notes': item.notes,
+            'status': item.status,
+            'table_number': item.order.table.number if item.order.table else None,
+            'added_at': item.added_at.isoformat() if item.added_at else None,
+            'started_at': item.preparing_at.isoformat() if item.preparing_at else None,
+            'start_by': start_by.isoformat(),
+            'due_at': due_at.isoformat() if due_at else None,
+            'late': due_at is not None and ready_by > due_at + LATE_GRACE,
+        })
+    return entries
+
+
+def station_queue_snapshot(station):
+    """Stream snapshot of one station"""
+    return {
+        'station': {'id': station.pk, 'name': station.name, 'type': station.type},
+        'queue': station_queue(station.pk),
+    }
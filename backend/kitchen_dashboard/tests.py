@@ -1,3 +1,480 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import AsyncClient, SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from superadmin.models import (
+    Employee, KitchenEvent, KitchenStation, MenuCategory, MenuItem, MenuItemPrepEstimate, Order, OrderItem,
+    OrderItemTransition, Restaurant, User,
+)
+from superadmin.dashboard_cache import get_restaurant_version
+from superadmin.tokens import ScopedRefreshToken
+from .eta import assign_cooks, simulate_kitchen
+from .events import SUBSCRIBER_QUEUE_SIZE, broker, publish
+from .prep_estimates import MIN_SAMPLES, robust_summary
+from .prep_times import prep_time_percentiles
+from .stations import MAX_WAIT, schedule_station, station_queue
+
+
+def create_restaurant(name='Test Restaurant'):
+    return Restaurant.objects.create(
+        name=name, email=f"{name.lower().replace(' ', '-')}@example.com", address='1 Main Street', phone='9800000000'
+    )
+
+
+def pending_item(pk, order_id, added_at, preparation_time):
+    return SimpleNamespace(
+        pk=pk, order_id=order_id, status='pending', added_at=added_at,
+        menu_item=SimpleNamespace(preparation_time=preparation_time)
+    )
+
+
+class StationScheduleTests(SimpleTestCase):
+    """Pending items run by start-by time, but none waits past MAX_WAIT"""
+
+    def setUp(self):
+        self.now = timezone.now()
+
+    def schedule(self, items, due_times):
+        return [item.pk for item, _, _ in schedule_station(items, due_times)]
+
+    def test_tighter_order_goes_first(self):
+        # Both just arrived: the side dish of a long order can wait
+        side = pending_item(1, order_id=1, added_at=self.now, preparation_time=5)
+        burger = pending_item(2, order_id=2, added_at=self.now, preparation_time=10)
+        due_times = {1: self.now + timedelta(minutes=60), 2: self.now + timedelta(minutes=10)}
+        self.assertEqual(self.schedule([side, burger], due_times), [2, 1])
+
+    def test_long_waiting_item_overtakes_newer_one(self):
+        added = self.now - MAX_WAIT - timedelta(minutes=10)
+        side = pending_item(1, order_id=1, added_at=added, preparation_time=5)
+        burger = pending_item(2, order_id=2, added_at=self.now, preparation_time=10)
+        due_times = {1: added + timedelta(minutes=60), 2: self.now + timedelta(minutes=10)}
+        self.assertEqual(self.schedule([side, burger], due_times), [1, 2])
+
+
+
+class KitchenSimulationTests(SimpleTestCase):
+    """Order ETAs replay each station's queue on its cooks"""
+
+    def setUp(self):
+        self.now = timezone.now()
+
+    def item(self, pk, station_id, preparation_time, quantity=1, order_id=None, added_at=None):
+        return {
+            'id': pk, 'order_id': order_id or pk, 'station_id': station_id, 'status': 'pending',
+            'quantity': quantity, 'preparation_time': preparation_time, 'added_at': added_at or self.now,
+            'preparing_at': None, 'ready_at': None,
+        }
+
+    def minutes(self, items, cooks, station_cooks=None):
+        return {
+            item_id: round((ready_at - self.now).total_seconds() / 60)
+            for item_id, ready_at in simulate_kitchen(items, self.now, station_cooks, cooks).items()
+        }
+
+    def test_stations_cook_in_parallel(self):
+        items = [self.item(1, 'grill', 10), self.item(2, 'grill', 10), self.item(3, 'bar', 2)]
+        self.assertEqual(self.minutes(items, cooks=2), {1: 10, 2: 20, 3: 2})
+
+    def test_each_unit_of_a_line_is_a_job(self):
+        items = [self.item(1, 'grill', 10, quantity=3), self.item(2, 'grill', 5)]
+        self.assertEqual(self.minutes(items, cooks=2), {1: 20, 2: 15})
+
+    def test_kitchen_cooks_are_split_across_stations(self):
+        # Three cooks for four busy queues: one each, not three each
+        items = [self.item(pk, station, 10) for pk, station in
+                 ((1, 1), (2, 1), (3, 2), (4, 2), (5, 3), (6, 3), (7, None), (8, None))]
+        self.assertEqual(self.minutes(items, cooks=3), {1: 10, 2: 20, 3: 10, 4: 20, 5: 10, 6: 20, 7: 10, 8: 20})
+        self.assertEqual(assign_cooks([None, 3, 1, 2], {}, 3), {1: 1, 2: 1, 3: 1, None: 1})
+        self.assertEqual(assign_cooks([1, 2], {}, 5), {1: 3, 2: 2})
+
+    def test_station_with_its_own_cooks_keeps_them(self):
+        items = [self.item(1, 'grill', 10), self.item(2, 'grill', 10), self.item(3, 'bar', 5), self.item(4, 'bar', 5)]
+        self.assertEqual(self.minutes(items, cooks=4, station_cooks={'grill': 1}), {1: 10, 2: 20, 3: 5, 4: 5})
+
+    def test_pending_items_follow_the_station_schedule(self):
+        # Both just arrived: the side of a long order waits for the burger
+        long_order_main = self.item(1, 'cold', 60, order_id=1)
+        side = self.item(2, 'grill', 5, order_id=1)
+        burger = self.item(3, 'grill', 10, order_id=2)
+        self.assertEqual(self.minutes([long_order_main, side, burger], cooks=2,
+                                      station_cooks={'cold': 1, 'grill': 1}),
+                         {1: 60, 2: 15, 3: 10})
+
+        # An item waiting past MAX_WAIT goes first again
+        added = self.now - MAX_WAIT - timedelta(minutes=10)
+        long_order_main['added_at'] = side['added_at'] = added
+        self.assertEqual(self.minutes([long_order_main, side, burger], cooks=2,
+                                      station_cooks={'cold': 1, 'grill': 1}),
+                         {1: 60, 2: 5, 3: 15})
+
+
+class StationQueueTests(TestCase):
+    def setUp(self):
+        self.restaurant = create_restaurant()
+        self.station = KitchenStation.objects.create(name='Grill', type='grill', restaurant=self.restaurant)
+        category = MenuCategory.objects.create(name='Mains', restaurant=self.restaurant, station=self.station)
+        self.steak = MenuItem.objects.create(
+            name='Steak', price=Decimal('20.00'), category=category, restaurant=self.restaurant, preparation_time=20
+        )
+        self.order = Order.objects.create(restaurant=self.restaurant, order_type='takeaway', status='active')
+
+    def test_item_is_not_late_on_arrival(self):
+        item = OrderItem.objects.create(order=self.order, menu_item=self.steak, unit_price=Decimal('20.00'))
+        self.assertEqual(item.station_id, self.station.pk)
+        [entry] = station_queue(self.station.pk)
+        self.assertFalse(entry['late'])
+
+    def test_item_that_cannot_make_its_due_time_is_late(self):
+        item = OrderItem.objects.create(order=self.order, menu_item=self.steak, unit_price=Decimal('20.00'))
+        OrderItem.objects.filter(pk=item.pk).update(added_at=timezone.now() - timedelta(minutes=10))
+        [entry] = station_queue(self.station.pk)
+        self.assertTrue(entry['late'])
+
+    def test_menu_cannot_route_to_another_restaurants_station(self):
+        other = KitchenStation.objects.create(name='Bar', type='bar', restaurant=create_restaurant('Other'))
+        self.steak.station = other
+        with self.assertRaises(ValidationError):
+            self.steak.full_clean()
+        category = self.steak.category
+        category.station = other
+        with self.assertRaises(ValidationError):
+            category.full_clean()
+
+
+class PrepTimePercentileTests(TestCase):
+    """Nearest-rank percentiles computed by the window query"""
+
+    def setUp(self):
+        self.restaurant = create_restaurant()
+        category = MenuCategory.objects.create(name='Mains', restaurant=self.restaurant)
+        self.burger = MenuItem.objects.create(
+            name='Burger', price=Decimal('10.00'), category=category, restaurant=self.restaurant
+        )
+        self.steak = MenuItem.objects.create(
+            name='Steak', price=Decimal('20.00'), category=category, restaurant=self.restaurant
+        )
+        self.day = timezone.localdate() - timedelta(days=2)
+        self.next_day = self.day + timedelta(days=1)
+        self.orders = {}
+        self.base = timezone.now() - timedelta(days=1)
+
+        # Burger: cook times 1..10 and queue waits 10..1 minutes, added out of order
+        for minutes in (7, 2, 10, 5, 1, 9, 4, 8, 3, 6):
+            self.cooked(self.burger, self.day, wait=11 - minutes, cook=minutes)
+        # Steak: one item on the first day, two on the next
+        self.cooked(self.steak, self.day, wait=12, cook=12)
+        self.cooked(self.steak, self.next_day, wait=8, cook=8)
+        self.cooked(self.steak, self.next_day, wait=4, cook=4)
+
+        # Neither an unfinished item nor another restaurant's counts
+        self.logged(self.item(self.burger, self.day), ('pending', 'preparing', 1))
+        other = create_restaurant('Other')
+        order = Order.objects.create(restaurant=other, order_type='takeaway')
+        Order.objects.filter(pk=order.pk).update(business_date=self.day)
+        item = OrderItem.objects.create(order=order, menu_item=self.burger, unit_price=Decimal('10.00'))
+        self.logged(item, ('pending', 'preparing', 1), ('preparing', 'ready', 90))
+
+    def item(self, menu_item, day):
+        if day not in self.orders:
+            self.orders[day] = Order.objects.create(restaurant=self.restaurant, order_type='takeaway')
+            Order.objects.filter(pk=self.orders[day].pk).update(business_date=day)
+        item = OrderItem.objects.create(order=self.orders[day], menu_item=menu_item, unit_price=menu_item.price)
+        OrderItem.objects.filter(pk=item.pk).update(added_at=self.base)
+        return item
+
+    def logged(self, item, *moves):
+        OrderItemTransition.objects.bulk_create([
+            OrderItemTransition(item=item, from_status=from_status, to_status=to_status,
+                                at=self.base + timedelta(minutes=minutes))
+            for from_status, to_status, minutes in moves
+        ])
+
+    def cooked(self, menu_item, day, wait, cook):
+        # An undone start is replaced by the later one
+        self.logged(
+            self.item(menu_item, day),
+            ('pending', 'preparing', wait / 2), ('preparing', 'pending', wait / 2 + 0.5),
+            ('pending', 'preparing', wait), ('preparing', 'ready', wait + cook),
+        )
+
+    def test_percentiles_per_menu_item(self):
+        groups = prep_time_percentiles(self.restaurant.pk, self.day, self.next_day)
+        self.assertEqual(groups[self.burger.pk], {
+            'items': 10,
+            'queue_wait_minutes': {'p50': 5.0, 'p90': 9.0, 'p99': 10.0},
+            'cook_time_minutes': {'p50': 5.0, 'p90': 9.0, 'p99': 10.0},
+        })
+        self.assertEqual(groups[self.steak.pk], {
+            'items': 3,
+            'queue_wait_minutes': {'p50': 8.0, 'p90': 12.0, 'p99': 12.0},
+            'cook_time_minutes': {'p50': 8.0, 'p90': 12.0, 'p99': 12.0},
+        })
+
+    def test_percentiles_per_day(self):
+        groups = prep_time_percentiles(self.restaurant.pk, self.day, self.next_day, group_by='day')
+        self.assertEqual(set(groups), {self.day, self.next_day})
+        # Eleven items: ranks 6, 10 and 11
+        self.assertEqual(groups[self.day]['items'], 11)
+        self.assertEqual(groups[self.day]['cook_time_minutes'], {'p50': 6.0, 'p90': 10.0, 'p99': 12.0})
+        self.assertEqual(groups[self.day]['queue_wait_minutes'], {'p50': 6.0, 'p90': 10.0, 'p99': 12.0})
+        self.assertEqual(groups[self.next_day]['cook_time_minutes'], {'p50': 4.0, 'p90': 8.0, 'p99': 8.0})
+
+    def test_range_excludes_other_days(self):
+        groups = prep_time_percentiles(self.restaurant.pk, self.next_day, self.next_day)
+        self.assertEqual(list(groups), [self.steak.pk])
+        self.assertEqual(groups[self.steak.pk]['items'], 2)
+
+
+class RobustSummaryTests(SimpleTestCase):
+    def test_outliers_beyond_the_mad_cutoff_are_dropped(self):
+        # Median 10 and MAD 1: 60 minutes scores 33.7, 12 minutes only 1.3
+        summary = robust_summary(np.array([12, 8, 60, 10, 9, 11, 10], dtype=np.float64))
+        self.assertEqual(summary, {
+            'sample_count': 7,
+            'outlier_count': 1,
+            'median_minutes': 10.0,
+            'mad_minutes': 1.48,
+            'p90_minutes': 11.5,
+            # p75 of the inliers is 10.75
+            'recommended_minutes': 11,
+        })
+
+    def test_identical_majority_keeps_every_sample(self):
+        summary = robust_summary(np.array([5, 5, 5, 5, 30], dtype=np.float64))
+        self.assertEqual((summary['outlier_count'], summary['mad_minutes']), (0, 0.0))
+        self.assertEqual(summary['recommended_minutes'], 5)
+
+    def test_recommendation_rounds_up_to_a_whole_minute(self):
+        self.assertEqual(robust_summary(np.array([4.0, 4.2]))['recommended_minutes'], 5)
+        self.assertEqual(robust_summary(np.array([0.2, 0.3, 0.4]))['recommended_minutes'], 1)
+
+
+class FitPrepEstimatesCommandTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.restaurant = create_restaurant()
+        category = MenuCategory.objects.create(name='Mains', restaurant=self.restaurant)
+        self.burger = MenuItem.objects.create(
+            name='Burger', price=Decimal('10.00'), category=category, restaurant=self.restaurant, preparation_time=15
+        )
+        self.steak = MenuItem.objects.create(
+            name='Steak', price=Decimal('20.00'), category=category, restaurant=self.restaurant, preparation_time=25
+        )
+        order = Order.objects.create(restaurant=self.restaurant, order_type='takeaway')
+        started = timezone.now() - timedelta(hours=2)
+        transitions = []
+        # Burger has exactly enough samples, steak one too few
+        for menu_item, count in ((self.burger, MIN_SAMPLES), (self.steak, MIN_SAMPLES - 1)):
+            for index in range(count):
+                item = OrderItem.objects.create(order=order, menu_item=menu_item, unit_price=menu_item.price)
+                cook = 90 if index == 0 else 6 + index % 3
+                transitions += [
+                    OrderItemTransition(item=item, from_status='pending', to_status='preparing', at=started),
+                    OrderItemTransition(item=item, from_status='preparing', to_status='ready',
+                                        at=started + timedelta(minutes=cook)),
+                ]
+        OrderItemTransition.objects.bulk_create(transitions)
+        MenuItemPrepEstimate.objects.create(
+            menu_item=self.burger, sample_count=3, median_minutes=1, mad_minutes=0, p90_minutes=1,
+            recommended_minutes=1, window_start=timezone.localdate(), window_end=timezone.localdate()
+        )
+
+    def fit(self, *args):
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('fit_prep_estimates', *args, stdout=out)
+        return out.getvalue()
+
+    def test_apply_updates_the_estimate_and_preparation_time(self):
+        version = get_restaurant_version(self.restaurant.pk)
+        output = self.fit('--apply')
+        self.assertIn('Fitted 1 menu item estimates, updated preparation_time of 1 menu items', output)
+
+        # The existing row is updated in place; the steak has too few samples
+        estimate = MenuItemPrepEstimate.objects.get()
+        self.assertEqual(estimate.menu_item_id, self.burger.pk)
+        self.assertEqual((estimate.sample_count, estimate.outlier_count), (MIN_SAMPLES, 1))
+        self.assertEqual(estimate.recommended_minutes, 8)
+        self.burger.refresh_from_db()
+        self.steak.refresh_from_db()
+        self.assertEqual((self.burger.preparation_time, self.steak.preparation_time), (8, 25))
+        self.assertGreater(get_restaurant_version(self.restaurant.pk), version)
+
+        # Nothing changes on a second run, so cached dashboards stay valid
+        version = get_restaurant_version(self.restaurant.pk)
+        self.assertIn('updated preparation_time of 0 menu items', self.fit('--apply'))
+        self.assertEqual(get_restaurant_version(self.restaurant.pk), version)
+
+    def test_without_apply_only_estimates_are_stored(self):
+        version = get_restaurant_version(self.restaurant.pk)
+        self.fit('--min-samples', str(MIN_SAMPLES - 1))
+        self.assertEqual(MenuItemPrepEstimate.objects.count(), 2)
+        self.burger.refresh_from_db()
+        self.assertEqual(self.burger.preparation_time, 15)
+        self.assertEqual(get_restaurant_version(self.restaurant.pk), version)
+
+
+class BulkItemStatusTests(TestCase):
+    """One request moves many items and logs each move"""
+
+    def setUp(self):
+        self.restaurant = create_restaurant()
+        user = User.objects.create_user(email='cook@example.com', password='pw', role='kitchen')
+        employee = Employee.objects.create(name='Cook', email=user.email, role='kitchen', password='x')
+        employee.restaurants.add(self.restaurant)
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        category = MenuCategory.objects.create(name='Mains', restaurant=self.restaurant)
+        burger = MenuItem.objects.create(
+            name='Burger', price=Decimal('10.00'), category=category, restaurant=self.restaurant
+        )
+        order = Order.objects.create(restaurant=self.restaurant, order_type='takeaway', status='active')
+        self.items = [
+            OrderItem.objects.create(order=order, menu_item=burger, unit_price=Decimal('10.00')) for _ in range(3)
+        ]
+        self.url = f'/api/kitchen/restaurant/{self.restaurant.pk}/items/status/'
+
+    def post(self, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(self.url, data, format='json')
+
+    def test_items_move_and_are_logged(self):
+        ids = [item.pk for item in self.items[:2]]
+        response = self.post({'item_ids': ids, 'status': 'preparing'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], 2)
+        self.assertEqual(
+            set(OrderItem.objects.filter(preparing_at__isnull=False).values_list('pk', flat=True)), set(ids)
+        )
+        self.assertEqual(
+            sorted(OrderItemTransition.objects.values_list('item_id', 'from_status', 'to_status')),
+            [(item_id, 'pending', 'preparing') for item_id in ids]
+        )
+
+        # Served is only reachable from ready
+        response = self.post({'item_ids': ids, 'status': 'served'})
+        self.assertEqual(response.json()['updated'], 0)
+        self.assertEqual([item['status'] for item in response.json()['skipped']], ['preparing', 'preparing'])
+
+    def test_undo_clears_start(self):
+        self.post({'item_ids': [self.items[0].pk], 'status': 'preparing'})
+        self.post({'item_ids': [self.items[0].pk], 'status': 'pending'})
+        self.items[0].refresh_from_db()
+        self.assertEqual(self.items[0].status, 'pending')
+        self.assertIsNone(self.items[0].preparing_at)
+
+    def test_non_object_body_is_rejected(self):
+        for body in ([1, 2], 'preparing', 3):
+            self.assertEqual(self.post(body).status_code, 400)
+
+    def test_save_back_to_pending_clears_start(self):
+        item = self.items[0]
+        item.status = 'preparing'
+        item.save(update_fields=['status'])
+        self.assertIsNotNone(item.preparing_at)
+        item.status = 'pending'
+        item.save(update_fields=['status'])
+        item.refresh_from_db()
+        self.assertIsNone(item.preparing_at)
+
+    def test_saved_status_change_is_logged_once(self):
+        item = self.items[0]
+        for status in ('preparing', 'ready', 'ready'):
+            item.status = status
+            item.save()
+        self.assertEqual(
+            list(OrderItemTransition.objects.order_by('pk').values_list('from_status', 'to_status')),
+            [('pending', 'preparing'), ('preparing', 'ready')]
+        )
+
+
+@mock.patch.object(broker, 'poll_seconds', None)
+class KitchenStreamTests(TestCase):
+    """Streams start from a snapshot, then follow events written by any process"""
+
+    def setUp(self):
+        cache.clear()
+        self.restaurant = create_restaurant()
+        user = User.objects.create_user(email='cook@example.com', password='pw', role='kitchen')
+        employee = Employee.objects.create(name='Cook', email=user.email, role='kitchen', password='x')
+        employee.restaurants.add(self.restaurant)
+        self.token = str(ScopedRefreshToken.for_user(user).access_token)
+        category = MenuCategory.objects.create(name='Mains', restaurant=self.restaurant)
+        burger = MenuItem.objects.create(
+            name='Burger', price=Decimal('10.00'), category=category, restaurant=self.restaurant
+        )
+        order = Order.objects.create(restaurant=self.restaurant, order_type='takeaway', status='active')
+        self.item = OrderItem.objects.create(order=order, menu_item=burger, unit_price=Decimal('10.00'))
+        self.url = f'/api/kitchen/restaurant/{self.restaurant.pk}/stream/'
+
+    async def open_stream(self):
+        response = await AsyncClient().get(self.url, {'token': self.token})
+        self.assertEqual(response.status_code, 200)
+        return aiter(response.streaming_content)
+
+    async def next_event(self, stream):
+        event, data = (await anext(stream)).decode().strip().split('\n')
+        return event.removeprefix('event: '), json.loads(data.removeprefix('data: '))
+
+    def start_item(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.status = 'preparing'
+            self.item.save()
+
+    async def test_stream_requires_a_token(self):
+        response = await AsyncClient().get(self.url)
+        self.assertEqual(response.status_code, 401)
+        response = await AsyncClient().get(self.url, {'token': 'not-a-token'})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_snapshot_then_each_event(self):
+        stream = await self.open_stream()
+        try:
+            event, snapshot = await self.next_event(stream)
+            self.assertEqual(event, 'snapshot')
+            self.assertEqual([item['id'] for item in snapshot['pending_queue']], [self.item.pk])
+
+            # The write needs no subscriber in its own process; it goes through the event table
+            await sync_to_async(self.start_item)()
+            self.assertEqual(await KitchenEvent.objects.acount(), 1)
+            await sync_to_async(broker.poll)()
+            event, data = await self.next_event(stream)
+            self.assertEqual((event, data['from'], data['item']['status']), ('item.status', 'pending', 'preparing'))
+
+            # Polling again does not deliver the same event twice
+            await sync_to_async(broker.poll)()
+            self.assertTrue(all(subscription.queue.empty()
+                                for subscriptions in broker._subscribers.values()
+                                for subscription in subscriptions))
+        finally:
+            await stream.aclose()
+
+    async def test_overflow_resends_snapshot(self):
+        stream = await self.open_stream()
+        try:
+            await self.next_event(stream)
+            events = [{'type': 'order.status', 'order_id': n} for n in range(SUBSCRIBER_QUEUE_SIZE + 1)]
+            await sync_to_async(publish)(self.restaurant.pk, *events)
+            await sync_to_async(broker.poll)()
+            event, snapshot = await self.next_event(stream)
+            self.assertEqual(event, 'snapshot')
+            self.assertEqual([item['id'] for item in snapshot['pending_queue']], [self.item.pk])
+        finally:
+            await stream.aclose()
+
+    def test_nothing_is_written_without_listeners(self):
+        self.start_item()
+        self.assertFalse(KitchenEvent.objects.exists())
@@ -0,0 +1,111 @@
+"""
+Bulk kitchen status changes for order items.
+
+Items are selected by id, by order, or by menu item, always within one
+restaurant's active orders. One UPDATE moves every selected item whose
+current status allows the transition, stamping the timestamp of the status
+it enters, and one bulk insert appends the moves to the transition log.
+``update()`` skips model signals, so the kitchen stream and the dashboard
+cache are notified here once the transaction commits.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from superadmin.dashboard_cache import bump_restaurant_version
+from superadmin.models import OrderItem, OrderItemTransition
+from .events import publish_item_events
+from .queue import active_queue_items
+
+
+# Target status -> statuses an item may move from
+ALLOWED_TRANSITIONS = {
+    'preparing': ('pending',),
+    'ready': ('pending', 'preparing'),
+    'served': ('ready',),
+    # Undo a premature bump
+    'pending': ('preparing',),
+}
+
+# Largest number of item ids accepted in one request
+MAX_ITEM_IDS = 500
+
+
+class TransitionError(ValueError):
+    """The requested status change is invalid; the message is safe to show"""
+
+
+def _ids(values, field):
+    if not isinstance(values, list) or not values:
+        raise TransitionError(f'{field} must be a non-empty list')
+    if len(values) > MAX_ITEM_IDS:
+        raise TransitionError(f'At most {MAX_ITEM_IDS} {field} per request')
+    try:
+        return {int(value) for value in values}
+    except (TypeError, ValueError):
+        raise TransitionError(f'{field} must contain ids')
+
+
+def select_items(restaurant_id, data):
+    """Active-order items of a restaurant picked by item_ids, order_id or menu_item_id"""
+    items = active_queue_items(restaurant_id)
+    if 'item_ids' in data:
+        return items.filter(pk__in=_ids(data['item_ids'], 'item_ids'))
+    if 'order_id' in data:
+        return items.filter(order_id=_ids([data['order_id']], 'order_id').pop())
+    if 'menu_item_id' in data:
+        items = items.filter(menu_item_id=_ids([data['menu_item_id']], 'menu_item_id').pop())
+        from_status = data.get('from_status')
+        if from_status is not None:
+            if from_status not in dict(OrderItem.STATUS_CHOICES):
+                raise TransitionError('Invalid from_status')
+            items = items.filter(status=from_status)
+        return items
+    raise TransitionError('Provide item_ids, order_id or menu_item_id')
+
+
+def transition_items(restaurant_id, data):
+    """
+    Move the selected items to ``data['status']``.
+
+    Returns ``(moved, skipped)``: moved items as ``{'id', 'from', 'to'}``
+    and items left alone because their status does not allow the move, as
+    ``{'id', 'status'}``.
+    """
+    if not isinstance(data, dict):
+        raise TransitionError('Request body must be a JSON object')
+    target = data.get('status')
+    if target not in ALLOWED_TRANSITIONS:
+        raise TransitionError(f"status must be one of {', '.join(ALLOWED_TRANSITIONS)}")
+    allowed = ALLOWED_TRANSITIONS[target]
+    selected = select_items(restaurant_id, data)
+
+    now = timezone.now()
+    changes = {'status': target, 'updated_at': now}
+    timestamp_field = OrderItem.STATUS_TIMESTAMPS.get(target)
+    if timestamp_field:
+        changes[timestamp_field] = now
+    if target == 'pending':
+        changes['preparing_at'] = None
+
+    with transaction.atomic():
+        current = dict(selected.select_for_update().values_list('id', 'status'))
+        movable = [item_id for item_id, item_status in current.items() if item_status in allowed]
+        if movable:
+            # The status filter repeats the check inside the UPDATE itself
+            OrderItem.objects.filter(pk__in=movable, status__in=allowed).update(**changes)
+            previous = {item_id: current[item_id] for item_id in movable}
+            OrderItemTransition.objects.bulk_create([
+                OrderItemTransition(item_id=item_id, from_status=from_status, to_status=target, at=now)
+                for item_id, from_status in previous.items()
+            ])
+            transaction.on_commit(lambda: bump_restaurant_version(restaurant_id))
+            transaction.on_commit(lambda: publish_item_events(
+                restaurant_id, 'item.status', movable, previous_status=previous
+            ))
+
+    moved = [{'id': item_id, 'from': current[item_id], 'to': target} for item_id in sorted(movable)]
+    skipped = [
+        {'id': item_id, 'status': item_status}
+        for item_id, item_status in sorted(current.items()) if item_status not in allowed
+    ]
+    return moved, skipped
@@ -2,11 +2,21 @@
 Kitchen Dashboard URL Configuration
 """
 from django.urls import path
-from .views import kitchen_dashboard_stats
+from .views import (
+    bulk_update_item_status, kitchen_dashboard_stats, kitchen_station_queue, kitchen_stations, kitchen_stream,
+    order_eta, prep_time_estimates, prep_time_stats
+)
 
 app_name = 'kitchen_dashboard'
 
 urlpatterns = [
     # Kitchen Dashboard - start with basic endpoint
     path('restaurant/<int:restaurant_id>/', kitchen_dashboard_stats, name='dashboard-stats'),
+    path('restaurant/<int:restaurant_id>/stream/', kitchen_stream, name='queue-stream'),
+    path('restaurant/<int:restaurant_id>/items/status/', bulk_update_item_status, name='bulk-item-status'),
+    path('restaurant/<int:restaurant_id>/prep-times/', prep_time_stats, name='prep-times'),
+    path('restaurant/<int:restaurant_id>/prep-estimates/', prep_time_estimates, name='prep-estimates'),
+    path('restaurant/<int:restaurant_id>/orders/<int:order_id>/eta/', order_eta, name='order-eta'),
+    path('restaurant/<int:restaurant_id>/stations/', kitchen_stations, name='stations'),
+    path('restaurant/<int:restaurant_id>/stations/<int:station_id>/queue/', kitchen_station_queue, name='station-queue'),
 ]
@@ -5,158 +5,273 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework.exceptions import AuthenticationFailed
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db.models import Q, Count, Sum, Avg, F
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.views.decorators.http import require_GET
 from datetime import datetime, timedelta, date
+import asyncio
 import json
 
 from superadmin.models import (
     Restaurant, Employee, Order, OrderItem, MenuItem, InventoryItem,
-    InventoryCategory, WasteEntry, Notification
+    InventoryCategory, WasteEntry, Notification, KitchenStation
 )
 from superadmin.serializers import (
     OrderSerializer, OrderItemSerializer, MenuItemSerializer,
     InventoryItemSerializer, WasteEntrySerializer, NotificationSerializer
 )
+from superadmin.rollups import get_daily_rollup
+from superadmin.authentication import ScopedJWTAuthentication
+from superadmin.access import user_has_restaurant_access
+from superadmin.business_dates import restaurant_today
+from superadmin.dashboard_cache import cached_dashboard
+from .eta import kitchen_schedule
+from .events import RESYNC, broker, listen
+from .prep_times import GROUPINGS, prep_time_percentiles, prep_time_summary
+from .queue import kitchen_queue_snapshot
+from .stations import restaurant_stations, station_queue_snapshot
+from .transitions import TransitionError, transition_items
 
+# Seconds between keep-alive comments on an idle kitchen stream
+STREAM_HEARTBEAT_SECONDS = 15
 
-def check_kitchen_access(user_email, restaurant_id):
+# Longest business-date range accepted by the prep time report
+MAX_PREP_TIME_RANGE_DAYS = 366
+
+
+def check_kitchen_access(user, restaurant_id):
     """Check if user has kitchen access to restaurant"""
-    try:
-        employee = Employee.objects.get(email=user_email)
-        return (employee.restaurants.filter(id=restaurant_id).exists() and
-                employee.role in ['kitchen', 'manager', 'owner'])
-    except Employee.DoesNotExist:
-        return False
+    return user_has_restaurant_access(user, restaurant_id, roles=['kitchen', 'manager', 'owner'])
+
+
+def check_eta_access(user, restaurant_id):
+    """Kitchen and floor staff may both ask how long an order will take"""
+    return user_has_restaurant_access(user, restaurant_id, roles=['kitchen', 'staff', 'manager', 'owner'])
+
+
+def build_kitchen_dashboard(restaurant_id, today):
+    """Kitchen dashboard payload for one restaurant and day"""
+    restaurant = Restaurant.objects.get(id=restaurant_id)
+
+    # Queue counts and the head of each queue, each queue read once
+    queues = kitchen_queue_snapshot(restaurant.pk)
+
+    # Today's kitchen metrics
+    today_rollup = get_daily_rollup(restaurant.pk, today)
+    completed_orders_today = today_rollup.orders_completed
+    total_orders_today = today_rollup.orders_total
+
+    # Queue wait and cook time from the transition log, one aggregate query
+    prep_times = prep_time_summary(restaurant.pk, today)
+
+    # Inventory alerts for kitchen
+    low_stock_ingredients = InventoryItem.objects.filter(
+        restaurant=restaurant,
+        status='low-stock'
+    ).order_by('name')
+
+    return {
+        'restaurant': {
+            'id': restaurant.pk,
+            'name': restaurant.name
+        },
+        'queue_summary': queues['queue_summary'],
+        'today_metrics': {
+            'completed_orders': completed_orders_today,
+            'total_orders': total_orders_today,
+            'avg_prep_time_minutes': prep_times['avg_cook_time_minutes'],
+            'avg_queue_wait_minutes': prep_times['avg_queue_wait_minutes'],
+            'measured_items': prep_times['measured_items']
+        },
+        'inventory_alerts': {
+            'low_stock_count': low_stock_ingredients.count(),
+            'low_stock_items': [
+                {
+                    'name': item.name,
+                    'current_stock': item.current_stock,
+                    'minimum_stock': item.min_stock
+                }
+                for item in low_stock_ingredients[:5]
+            ]
+        },
+        'pending_queue': queues['pending_queue'],
+        'preparing_queue': queues['preparing_queue'],
+        'ready_queue': queues['ready_queue'],
+        'last_updated': timezone.now().isoformat()
+    }
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def kitchen_dashboard_stats(request, restaurant_id):
     """Kitchen dashboard statistics"""
-    if not check_kitchen_access(request.user.email, restaurant_id):
+    if not check_kitchen_access(request.user, restaurant_id):
         return Response({
             'error': 'Access denied to this restaurant kitchen'
         }, status=status.HTTP_403_FORBIDDEN)
 
     try:
-        restaurant = Restaurant.objects.get(id=restaurant_id)
-        now = timezone.now()
-        today = now.date()
-
-        # Active order items by status
-        pending_items = OrderItem.objects.filter(
-            order__restaurant=restaurant,
-            order__status='active',
-            status='pending'
-        ).select_related('order', 'menu_item', 'order__table').order_by('added_at')
-
-        preparing_items = OrderItem.objects.filter(
-            order__restaurant=restaurant,
-            order__status='active',
-            status='preparing'
-        ).select_related('order', 'menu_item', 'order__table').order_by('added_at')
-
-        ready_items = OrderItem.objects.filter(
-            order__restaurant=restaurant,
-            order__status='active',
-            status='ready'
-        ).select_related('order', 'menu_item', 'order__table').order_by('updated_at')
-
-        # Today's kitchen metrics
-        today_orders = Order.objects.filter(
-            restaurant=restaurant,
-            created_at__date=today
+        today = restaurant_today(restaurant_id)
+        payload, hit = cached_dashboard(
+            'kitchen', restaurant_id,
+            lambda: build_kitchen_dashboard(restaurant_id, today),
+            variant=today.isoformat()
         )
+        return Response(payload, headers={'X-Cache': 'HIT' if hit else 'MISS'})
+
+    except Restaurant.DoesNotExist:
+        return Response({
+            'error': 'Restaurant not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response({
+            'error': f'Failed to fetch kitchen dashboard: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_update_item_status(request, restaurant_id):
+    """Move many order items to a new kitchen status in one update"""
+    if not check_kitchen_access(request.user, restaurant_id):
+        return Response({
+            'error': 'Access denied to this restaurant kitchen'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        moved, skipped = transition_items(restaurant_id, request.data)
+        return Response({
+            'status': request.data['status'],
+            'updated': len(moved),
+            'items': moved,
+            'skipped': skipped,
+        })
+
+    except TransitionError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({
+            'error': f'Failed to update item status: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        completed_orders_today = today_orders.filter(status='completed').count()
-        total_orders_today = today_orders.count()
 
-        # Average preparation time
-        completed_items_today = OrderItem.objects.filter(
-            order__restaurant=restaurant,
-            order__created_at__date=today,
-            status='served'
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def prep_time_stats(request, restaurant_id):
+    """Queue wait and cook time percentiles per menu item or per day"""
+    if not check_kitchen_access(request.user, restaurant_id):
+        return Response({
+            'error': 'Access denied to this restaurant kitchen'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        restaurant = Restaurant.objects.get(id=restaurant_id)
+
+        group_by = request.GET.get('group_by', 'menu_item')
+        if group_by not in GROUPINGS:
+            return Response({
+                'error': f"group_by must be one of: {', '.join(GROUPINGS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Date range: explicit start/end, or the last `days` days ending today
+        try:
+            end_param = request.GET.get('end')
+            end_date = date.fromisoformat(end_param) if end_param else restaurant_today(restaurant.pk)
+            start_param = request.GET.get('start')
+            if start_param:
+                start_date = date.fromisoformat(start_param)
+            else:
+                days = int(request.GET.get('days', 30))
+                start_date = end_date - timedelta(days=max(days, 1) - 1)
+        except ValueError:
+            return Response({
+                'error': 'start and end must be ISO dates (YYYY-MM-DD) and days an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if start_date > end_date:
+            return Response({
+                'error': 'start must not be after end'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if (end_date - start_date).days >= MAX_PREP_TIME_RANGE_DAYS:
+            return Response({
+                'error': f'Date range cannot exceed {MAX_PREP_TIME_RANGE_DAYS} days'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        groups = prep_time_percentiles(restaurant.pk, start_date, end_date, group_by)
+        if group_by == 'menu_item':
+            names = dict(MenuItem.objects.filter(pk__in=groups).values_list('id', 'name'))
+            results = [
+                {'menu_item_id': key, 'menu_item': names.get(key), **stats}
+                for key, stats in sorted(groups.items(), key=lambda group: names.get(group[0]) or '')
+            ]
+        else:
+            results = [{'date': key.isoformat(), **stats} for key, stats in sorted(groups.items())]
+
+        return Response({
+            'group_by': group_by,
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'results': results,
+            'last_updated': timezone.now().isoformat()
+        })
+
+    except Restaurant.DoesNotExist:
+        return Response({
+            'error': 'Restaurant not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response({
+            'error': f'Failed to fetch prep times: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def prep_time_estimates(request, restaurant_id):
+    """Configured preparation times next to the estimates fitted from history"""
+    if not check_kitchen_access(request.user, restaurant_id):
+        return Response({
+            'error': 'Access denied to this restaurant kitchen'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        restaurant = Restaurant.objects.get(id=restaurant_id)
+        menu_items = (
+            MenuItem.objects.filter(restaurant=restaurant)
+            .select_related('prep_estimate')
+            .order_by('name')
         )
 
-        avg_prep_time = 0
-        if completed_items_today.exists():
-            total_prep_time = 0
-            count = 0
-            for item in completed_items_today:
-                if item.updated_at and item.added_at:
-                    prep_time = (item.updated_at - item.added_at).total_seconds() / 60
-                    total_prep_time += prep_time
-                    count += 1
-
-            if count > 0:
-                avg_prep_time = total_prep_time / count
-
-        # Inventory alerts for kitchen
-        low_stock_ingredients = InventoryItem.objects.filter(
-            restaurant=restaurant,
-            status='low-stock'
-        ).order_by('name')
-
-        return Response({
-            'restaurant': {
-                'id': restaurant.pk,
-                'name': restaurant.name
-            },
-            'queue_summary': {
-                'pending_items': pending_items.count(),
-                'preparing_items': preparing_items.count(),
-                'ready_items': ready_items.count()
-            },
-            'today_metrics': {
-                'completed_orders': completed_orders_today,
-                'total_orders': total_orders_today,
-                'avg_prep_time_minutes': round(avg_prep_time, 1)
-            },
-            'inventory_alerts': {
-                'low_stock_count': low_stock_ingredients.count(),
-                'low_stock_items': [
-                    {
-                        'name': item.name,
-                        'current_stock': item.current_stock,
-                        'minimum_stock': item.min_stock
-                    }
-                    for item in low_stock_ingredients[:5]
-                ]
-            },
-            'pending_queue': [
-                {
-                    'id': item.pk,
-                    'menu_item': item.menu_item.name,
-                    'quantity': item.quantity,
-                    'table_number': item.order.table.number if item.order.table else None,
-                    'order_id': item.order.id,
-                    'added_at': item.added_at.isoformat()
-                }
-                for item in pending_items[:10]
-            ],
-            'preparing_queue': [
-                {
-                    'id': item.pk,
-                    'menu_item': item.menu_item.name,
-                    'quantity': item.quantity,
-                    'table_number': item.order.table.number if item.order.table else None,
-                    'order_id': item.order.id,
-                    'started_at': item.updated_at.isoformat() if item.updated_at else None
-                }
-                for item in preparing_items[:10]
-            ],
-            'ready_queue': [
-                {
-                    'id': item.pk,
-                    'menu_item': item.menu_item.name,
-                    'quantity': item.quantity,
-                    'table_number': item.order.table.number if item.order.table else None,
-                    'order_id': item.order.id,
-                    'ready_at': item.updated_at.isoformat() if item.updated_at else None
-                }
-                for item in ready_items[:10]
-            ],
+        results = []
+        for menu_item in menu_items:
+            estimate = getattr(menu_item, 'prep_estimate', None)
+            results.append({
+                'menu_item_id': menu_item.pk,
+                'menu_item': menu_item.name,
+                'preparation_time': menu_item.preparation_time,
+                'estimate': {
+                    'recommended_minutes': estimate.recommended_minutes,
+                    'median_minutes': estimate.median_minutes,
+                    'p90_minutes': estimate.p90_minutes,
+                    'mad_minutes': estimate.mad_minutes,
+                    'sample_count': estimate.sample_count,
+                    'outlier_count': estimate.outlier_count,
+                    'window_start': estimate.window_start.isoformat(),
+                    'window_end': estimate.window_end.isoformat(),
+                    'computed_at': estimate.computed_at.isoformat(),
+                } if estimate else None
+            })
+
+        return Response({
+            'restaurant_id': restaurant.pk,
+            'menu_items': results,
             'last_updated': timezone.now().isoformat()
         })
 
@@ -166,5 +281,215 @@ def kitchen_dashboard_stats(request, restaurant_id):
         }, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         return Response({
-            'error': f'Failed to fetch kitchen dashboard: {str(e)}'
+            'error': f'Failed to fetch prep estimates: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def order_eta(request, restaurant_id, order_id):
+    """Predicted ready time of an order from the live kitchen queue"""
+    if not check_eta_access(request.user, restaurant_id):
+        return Response({
+            'error': 'Access denied to this restaurant'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        schedule, hit = kitchen_schedule(restaurant_id)
+        now = timezone.now()
+        estimate = schedule['orders'].get(order_id)
+        if estimate is None:
+            # Nothing left in the kitchen: served, or not sent to the kitchen
+            order = Order.objects.filter(restaurant_id=restaurant_id, pk=order_id).first()
+            if order is None:
+                return Response({
+                    'error': 'Order not found'
+                }, status=status.HTTP_404_NOT_FOUND)
+            return Response({
+                'order_id': order.pk,
+                'order_status': order.status,
+                'in_kitchen': False,
+                'estimated_ready_at': None,
+                'minutes_remaining': 0,
+                'cooks': schedule['cooks'],
+                'computed_at': schedule['computed_at'].isoformat()
+            }, headers={'X-Cache': 'HIT' if hit else 'MISS'})
+
+        ready_at = estimate['estimated_ready_at']
+        return Response({
+            'order_id': order_id,
+            'in_kitchen': True,
+            'items': estimate['items'],
+            'estimated_ready_at': ready_at.isoformat(),
+            'minutes_remaining': max(0, round((ready_at - now).total_seconds() / 60, 1)),
+            'cooks': schedule['cooks'],
+            'computed_at': schedule['computed_at'].isoformat()
+        }, headers={'X-Cache': 'HIT' if hit else 'MISS'})
+
+    except Restaurant.DoesNotExist:
+        return Response({
+            'error': 'Restaurant not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response({
+            'error': f'Failed to estimate order time: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def kitchen_stations(request, restaurant_id):
+    """Active stations of a restaurant with their open item counts"""
+    if not check_kitchen_access(request.user, restaurant_id):
+        return Response({
+            'error': 'Access denied to this restaurant kitchen'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        stations = [
+            {
+                'id': station.pk,
+                'name': station.name,
+                'type': station.type,
+                'pending_items': station.pending_items,
+                'preparing_items': station.preparing_items,
+            }
+            for station in restaurant_stations(restaurant_id)
+        ]
+        return Response({
+            'stations': stations,
+            'last_updated': timezone.now().isoformat()
+        })
+
+    except Exception as e:
+        return Response({
+            'error': f'Failed to fetch kitchen stations: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def kitchen_station_queue(request, restaurant_id, station_id):
+    """One station's open items in scheduled cooking order"""
+    if not check_kitchen_access(request.user, restaurant_id):
+        return Response({
+            'error': 'Access denied to this restaurant kitchen'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        station = KitchenStation.objects.get(restaurant_id=restaurant_id, pk=station_id)
+        return Response({
+            **station_queue_snapshot(station),
+            'last_updated': timezone.now().isoformat()
+        })
+
+    except KitchenStation.DoesNotExist:
+        return Response({
+            'error': 'Station not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response({
+            'error': f'Failed to fetch station queue: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def authenticate_stream_request(request):
+    """Resolve the user from a JWT in the Authorization header or ?token=
+
+    Browser EventSource clients cannot set headers, so the token may also be
+    passed as a query parameter.
+    """
+    authenticator = ScopedJWTAuthentication()
+    try:
+        result = authenticator.authenticate(request)
+        if result is not None:
+            return result[0]
+        raw_token = request.GET.get('token')
+        if raw_token:
+            return authenticator.get_user(authenticator.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return None
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+async def _kitchen_event_stream(subscription, snapshot, load_snapshot):
+    try:
+        yield _sse('snapshot', snapshot)
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+
+            if event is RESYNC:
+                snapshot = await sync_to_async(load_snapshot)()
+                yield _sse('snapshot', snapshot)
+            else:
+                yield _sse(event['type'], event)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+@require_GET
+async def kitchen_stream(request, restaurant_id):
+    """
+    Server-Sent Events stream of a restaurant's kitchen queue.
+
+    Sends a ``snapshot`` event first, then one event per order item insert,
+    status transition or removal. With ``?station=<id>`` the snapshot is
+    that station's queue and only its items' events are sent. Must be
+    served by an ASGI server.
+    """
+    user = await sync_to_async(authenticate_stream_request)(request)
+    if user is None:
+        return JsonResponse({
+            'error': 'Authentication credentials were not provided or are invalid'
+        }, status=status.HTTP_401_UNAUTHORIZED)
+
+    if not await sync_to_async(check_kitchen_access)(user, restaurant_id):
+        return JsonResponse({
+            'error': 'Access denied to this restaurant kitchen'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    station = None
+    station_param = request.GET.get('station')
+    if station_param:
+        try:
+            station = await KitchenStation.objects.filter(
+                restaurant_id=restaurant_id, pk=int(station_param)
+            ).afirst()
+        except ValueError:
+            station = None
+        if station is None:
+            return JsonResponse({
+                'error': 'Station not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+    if station is None:
+        def load_snapshot():
+            return kitchen_queue_snapshot(restaurant_id)
+    else:
+        def load_snapshot():
+            return station_queue_snapshot(station)
+
+    # Subscribe before reading the snapshot so no change falls in between
+    after = await sync_to_async(listen)(restaurant_id)
+    subscription = broker.subscribe(restaurant_id, after, station_id=station.pk if station else None)
+    try:
+        snapshot = await sync_to_async(load_snapshot)()
+    except Exception:
+        broker.unsubscribe(subscription)
+        raise
+
+    response = StreamingHttpResponse(
+        _kitchen_event_stream(subscription, snapshot, load_snapshot),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,115 @@
+"""
+Keyset-paginated order history for the owner dashboard.
+
+Orders are listed newest first on ``(created_at, id)``; the cursor encodes
+the last row of a page, so every page is one index range scan no matter
+how deep the client pages.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Prefetch, Q
+from django.utils.dateparse import parse_datetime
+
+from superadmin.models import Order, OrderItem
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+# Query parameters that filter on a model field; each accepts a comma-separated list
+CHOICE_FILTERS = {
+    'status': dict(Order.STATUS_CHOICES),
+    'order_type': dict(Order.ORDER_TYPE_CHOICES),
+    'payment_method': dict(Order.PAYMENT_METHOD_CHOICES),
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(order):
+    payload = json.dumps({'created_at': order.created_at.isoformat(), 'id': order.pk})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """``(created_at, id)`` of the row a cursor points at"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = parse_datetime(payload['created_at'])
+        order_id = int(payload['id'])
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor('Invalid cursor')
+    if created_at is None:
+        raise InvalidCursor('Invalid cursor')
+    return created_at, order_id
+
+
+def order_history_queryset(restaurant_id):
+    """Orders with everything OrderSerializer reads, in keyset order"""
+    return (
+        Order.objects.filter(restaurant_id=restaurant_id)
+        .select_related('restaurant', 'table', 'customer', 'waiter_assigned')
+        .prefetch_related(Prefetch(
+            'order_items',
+            queryset=OrderItem.objects.select_related('menu_item', 'chair').order_by('added_at')
+        ))
+        .order_by('-created_at', '-id')
+    )
+
+
+def parse_filters(params):
+    """
+    Q object for the history filters in ``params``.
+
+    Raises ValueError with a client-facing message on bad input.
+    """
+    filters = Q()
+    for field, choices in CHOICE_FILTERS.items():
+        raw = params.get(field)
+        if not raw:
+            continue
+        values = [value.strip() for value in raw.split(',') if value.strip()]
+        unknown = [value for value in values if value not in choices]
+        if unknown:
+            raise ValueError(f"Invalid {field}: {', '.join(unknown)}")
+        filters &= Q(**{f'{field}__in': values})
+
+    try:
+        start = params.get('start')
+        end = params.get('end')
+        start_date = datetime.fromisoformat(start).date() if start else None
+        end_date = datetime.fromisoformat(end).date() if end else None
+    except ValueError:
+        raise ValueError('start and end must be ISO dates (YYYY-MM-DD)')
+    if start_date and end_date and start_date > end_date:
+        raise ValueError('start must not be after end')
+
+    if start_date:
+        filters &= Q(business_date__gte=start_date)
+    if end_date:
+        filters &= Q(business_date__lte=end_date)
+    return filters
+
+
+def order_history_page(restaurant_id, filters=Q(), cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    One page of a restaurant's order history.
+
+    Returns ``(orders, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    orders = order_history_queryset(restaurant_id).filter(filters)
+    if cursor:
+        created_at, order_id = decode_cursor(cursor)
+        orders = orders.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=order_id))
+
+    # One extra row tells whether another page follows
+    page = list(orders[:limit + 1])
+    if len(page) > limit:
+        page = page[:limit]
+        return page, encode_cursor(page[-1])
+    return page, None
@@ -1,3 +1,231 @@
+import base64
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import Q
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from superadmin.models import (
+    Employee, MenuCategory, MenuItem, Order, OrderItem, Restaurant, RestaurantDailyRollup, Table, User
+)
+from .analytics import MAX_RANGE_DAYS, revenue_trends
+from .history import InvalidCursor, decode_cursor, encode_cursor
+
+
+def create_restaurant(name='Test Restaurant'):
+    return Restaurant.objects.create(
+        name=name, email=f"{name.lower().replace(' ', '-')}@example.com", address='1 Main Street', phone='9800000000'
+    )
+
+
+def create_owner(restaurant, email='owner@example.com'):
+    user = User.objects.create_user(email=email, password='pw', role='owner')
+    employee = Employee.objects.create(name='Owner', email=email, role='owner', password='x')
+    employee.restaurants.add(restaurant)
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+class RevenueTrendTests(TestCase):
+    """Rollup rows grouped into contiguous day, week and month buckets"""
+
+    def setUp(self):
+        self.restaurant = create_restaurant()
+
+    def add_day(self, day, revenue, orders=1):
+        RestaurantDailyRollup.objects.create(
+            restaurant=self.restaurant, date=day, revenue=Decimal(revenue),
+            orders_total=orders, orders_completed=orders
+        )
+
+    def test_days_are_zero_filled(self):
+        self.add_day(date(2025, 3, 2), '10.00')
+        trends = revenue_trends(self.restaurant.pk, date(2025, 3, 1), date(2025, 3, 3))
+        self.assertEqual(
+            [(row['date'], row['revenue'], row['orders']) for row in trends],
+            [('2025-03-01', 0.0, 0), ('2025-03-02', 10.0, 1), ('2025-03-03', 0.0, 0)]
+        )
+
+    def test_weeks_start_on_monday_across_the_year_end(self):
+        # 2024-12-30 is a Monday; the range starts mid-week
+        self.add_day(date(2024, 12, 28), '5.00')
+        self.add_day(date(2024, 12, 31), '7.00')
+        self.add_day(date(2025, 1, 5), '3.00')
+        trends = revenue_trends(self.restaurant.pk, date(2024, 12, 27), date(2025, 1, 14), 'week')
+        self.assertEqual(
+            [(row['date'], row['revenue'], row['orders']) for row in trends],
+            [('2024-12-23', 5.0, 1), ('2024-12-30', 10.0, 2), ('2025-01-06', 0.0, 0), ('2025-01-13', 0.0, 0)]
+        )
+
+    def test_months_are_zero_filled_across_month_ends(self):
+        self.add_day(date(2024, 1, 31), '20.00')
+        self.add_day(date(2024, 3, 1), '30.00', orders=2)
+        trends = revenue_trends(self.restaurant.pk, date(2024, 1, 15), date(2024, 3, 10), 'month')
+        self.assertEqual(
+            [(row['date'], row['revenue'], row['completed_orders']) for row in trends],
+            [('2024-01-01', 20.0, 1), ('2024-02-01', 0.0, 0), ('2024-03-01', 30.0, 2)]
+        )
+
+    def test_december_rolls_over_to_january(self):
+        trends = revenue_trends(self.restaurant.pk, date(2024, 12, 5), date(2025, 1, 5), 'month')
+        self.assertEqual([row['date'] for row in trends], ['2024-12-01', '2025-01-01'])
+
+    def test_other_restaurants_and_days_outside_the_range_are_ignored(self):
+        self.add_day(date(2025, 2, 28), '99.00')
+        RestaurantDailyRollup.objects.create(
+            restaurant=create_restaurant('Other'), date=date(2025, 3, 1), revenue=Decimal('50.00')
+        )
+        trends = revenue_trends(self.restaurant.pk, date(2025, 3, 1), date(2025, 3, 31), 'month')
+        self.assertEqual([row['revenue'] for row in trends], [0.0])
+
+
+class RestaurantAnalyticsTests(TestCase):
+    """Parsing and validation of the analytics date range"""
+
+    def setUp(self):
+        self.restaurant = create_restaurant()
+        self.client = create_owner(self.restaurant)
+        self.url = f'/api/owner/restaurant/{self.restaurant.pk}/analytics/'
+
+    def test_explicit_range_and_granularity(self):
+        RestaurantDailyRollup.objects.create(restaurant=self.restaurant, date=date(2025, 5, 14),
+                                             revenue=Decimal('12.50'), orders_total=1)
+        response = self.client.get(self.url, {'start': '2025-05-01', 'end': '2025-05-31', 'granularity': 'week'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['start_date'], data['end_date'], data['granularity']),
+                         ('2025-05-01', '2025-05-31', 'week'))
+        self.assertEqual(data['revenue_trends'][0]['date'], '2025-04-28')
+        self.assertEqual([row['revenue'] for row in data['revenue_trends']], [0.0, 0.0, 12.5, 0.0, 0.0])
+
+    def test_days_counts_back_from_end(self):
+        response = self.client.get(self.url, {'end': '2025-05-31', 'days': 7})
+        data = response.json()
+        self.assertEqual(data['start_date'], '2025-05-25')
+        self.assertEqual(len(data['revenue_trends']), 7)
+
+    def test_invalid_ranges_are_rejected(self):
+        end = date(2025, 5, 31)
+        too_long = (end - timedelta(days=MAX_RANGE_DAYS)).isoformat()
+        for params in (
+            {'granularity': 'year'},
+            {'start': '2025-13-01'},
+            {'end': 'yesterday'},
+            {'days': 'many'},
+            {'start': '2025-06-01', 'end': '2025-05-31'},
+            {'start': too_long, 'end': end.isoformat()},
+        ):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
+
+    def test_longest_range_is_accepted(self):
+        end = date(2025, 5, 31)
+        start = end - timedelta(days=MAX_RANGE_DAYS - 1)
+        response = self.client.get(self.url, {'start': start.isoformat(), 'end': end.isoformat(),
+                                              'granularity': 'month'})
+        self.assertEqual(response.status_code, 200)
+
+
+class OrderHistoryTests(TestCase):
+    """Keyset pagination, cursors and filters of the order history endpoint"""
+
+    def setUp(self):
+        self.restaurant = create_restaurant()
+        self.client = create_owner(self.restaurant)
+        self.url = f'/api/owner/restaurant/{self.restaurant.pk}/orders/'
+        category = MenuCategory.objects.create(name='Mains', restaurant=self.restaurant)
+        self.menu_item = MenuItem.objects.create(name='Burger', price=Decimal('10.00'), category=category,
+                                                 restaurant=self.restaurant)
+        self.table = Table.objects.create(number='T1', restaurant=self.restaurant, capacity=4)
+
+    def create_orders(self, count, created_at=None, **fields):
+        orders = []
+        for _ in range(count):
+            order = Order.objects.create(restaurant=self.restaurant, table=self.table, **fields)
+            OrderItem.objects.create(order=order, menu_item=self.menu_item, quantity=2,
+                                     unit_price=self.menu_item.price)
+            orders.append(order)
+        if created_at is not None:
+            Order.objects.filter(pk__in=[order.pk for order in orders]).update(created_at=created_at)
+        return orders
+
+    def walk(self, limit, **params):
+        ids, cursor = [], None
+        while True:
+            query = dict(params, limit=limit)
+            if cursor:
+                query['cursor'] = cursor
+            data = self.client.get(self.url, query).json()
+            ids.extend(order['id'] for order in data['orders'])
+            self.assertEqual(data['has_more'], data['next_cursor'] is not None)
+            cursor = data['next_cursor']
+            if cursor is None:
+                return ids
+
+    def test_cursor_round_trip(self):
+        order = self.create_orders(1)[0]
+        self.assertEqual(decode_cursor(encode_cursor(order)), (order.created_at, order.pk))
+
+    def test_invalid_cursors_are_rejected(self):
+        forged = base64.urlsafe_b64encode(json.dumps({'created_at': 'yesterday', 'id': 1}).encode()).decode()
+        missing_id = base64.urlsafe_b64encode(json.dumps({'created_at': '2025-01-01T00:00:00'}).encode()).decode()
+        for cursor in ('not-a-cursor', '!!!', forged, missing_id):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(cursor)
+            response = self.client.get(self.url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+
+    def test_tampered_cursor_only_moves_the_page(self):
+        orders = self.create_orders(3)
+        cursor = encode_cursor(orders[1])
+        tampered = base64.urlsafe_b64encode(
+            json.dumps({'created_at': orders[1].created_at.isoformat(), 'id': orders[2].pk}).encode()
+        ).decode().rstrip('=')
+        self.assertNotEqual(cursor, tampered)
+        data = self.client.get(self.url, {'cursor': tampered}).json()
+        self.assertEqual([order['id'] for order in data['orders']],
+                         [order.pk for order in Order.objects.filter(
+                             Q(created_at__lt=orders[1].created_at) |
+                             Q(created_at=orders[1].created_at, pk__lt=orders[2].pk)
+                         ).order_by('-created_at', '-id')])
+
+    def test_walk_is_stable_across_created_at_ties(self):
+        tied = timezone.now() - timedelta(hours=1)
+        orders = self.create_orders(5, created_at=tied) + self.create_orders(3)
+        expected = [order.pk for order in Order.objects.order_by('-created_at', '-id')]
+        self.assertEqual(sorted(expected), sorted(order.pk for order in orders))
+        for limit in (1, 2, 3, 7):
+            self.assertEqual(self.walk(limit), expected, limit)
+
+    def test_comma_separated_filters(self):
+        self.create_orders(2, status='completed', payment_method='card')
+        cancelled = self.create_orders(1, status='cancelled', payment_method='cash')
+        self.create_orders(1, status='active')
+        self.assertEqual(len(self.walk(10, status='completed,cancelled')), 3)
+        self.assertEqual(self.walk(10, status='completed, cancelled', payment_method='cash'),
+                         [order.pk for order in cancelled])
+        self.assertEqual(len(self.walk(10, order_type='takeaway,delivery')), 0)
+        response = self.client.get(self.url, {'status': 'completed,lost'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('lost', response.json()['error'])
+
+    def test_date_filters(self):
+        self.create_orders(2)
+        today = timezone.localdate().isoformat()
+        self.assertEqual(len(self.walk(10, start=today, end=today)), 2)
+        self.assertEqual(self.client.get(self.url, {'start': '2025-02-30'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'start': '2025-02-02', 'end': '2025-02-01'}).status_code, 400)
 
-# Create your tests here.
+    def test_queries_do_not_grow_with_page_size(self):
+        self.create_orders(12)
+        self.client.get(self.url, {'limit': 1})
+        with self.assertNumQueries(2):
+            small = self.client.get(self.url, {'limit': 2}).json()
+        with self.assertNumQueries(2):
+            large = self.client.get(self.url, {'limit': 10}).json()
+        self.assertEqual((len(small['orders']), len(large['orders'])), (2, 10))
+        with self.assertNumQueries(2):
+            self.client.get(self.url, {'limit': 10, 'cursor': large['next_cursor']})
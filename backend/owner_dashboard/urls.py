@@ -5,6 +5,7 @@ from django.urls import path
 from .views import (
     owner_dashboard_stats,
     restaurant_analytics,
+    order_history,
     create_expense
 )
 
@@ -14,5 +15,6 @@ urlpatterns = [
     # Owner Dashboard
     path('restaurant/<int:restaurant_id>/', owner_dashboard_stats, name='dashboard-stats'),
     path('restaurant/<int:restaurant_id>/analytics/', restaurant_analytics, name='analytics'),
+    path('restaurant/<int:restaurant_id>/orders/', order_history, name='order-history'),
     path('restaurant/<int:restaurant_id>/expenses/create/', create_expense, name='create-expense'),
 ]
@@ -13,7 +13,7 @@ import json
 from superadmin.models import (
     Restaurant, Employee, Order, OrderItem, MenuCategory, MenuItem,
     InventoryItem, InventoryCategory, Table, Chair, Customer, Staff,
-    Notification, Expense, WasteEntry, Vendor
+    Notification, Expense, WasteEntry, Vendor, RestaurantDailyRollup
 )
 from superadmin.serializers import (
     RestaurantSerializer, EmployeeSerializer, OrderSerializer,
@@ -21,136 +21,138 @@ from superadmin.serializers import (
     CustomerSerializer, StaffSerializer, NotificationSerializer,
     ExpenseSerializer
 )
+from superadmin.access import user_has_restaurant_access
+from superadmin.business_dates import restaurant_today
+from superadmin.dashboard_cache import cached_dashboard
+from superadmin.idempotency import idempotent
+from .analytics import GRANULARITIES, MAX_RANGE_DAYS, revenue_trends
+from .history import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, order_history_page, parse_filters
+)
 
 
-def check_restaurant_access(user_email, restaurant_id):
+def check_restaurant_access(user, restaurant_id):
     """Check if user has access to restaurant"""
-    try:
-        employee = Employee.objects.get(email=user_email)
-        return employee.restaurants.filter(id=restaurant_id).exists()
-    except Employee.DoesNotExist:
-        return False
+    return user_has_restaurant_access(user, restaurant_id)
+
+
+def build_owner_dashboard(restaurant_id, today):
+    """Owner dashboard payload for one restaurant and day"""
+    restaurant = Restaurant.objects.get(id=restaurant_id)
+    week_ago = today - timedelta(days=7)
+    month_ago = today - timedelta(days=30)
+
+    # Sales metrics come from the daily rollup table: at most one row per day
+    rollups = {
+        rollup.date: rollup
+        for rollup in RestaurantDailyRollup.objects.filter(
+            restaurant=restaurant,
+            date__gte=month_ago,
+            date__lte=today
+        )
+    }
+
+    # Today's metrics
+    today_rollup = rollups.get(today) or RestaurantDailyRollup(restaurant=restaurant, date=today)
+    today_revenue = today_rollup.revenue
+    today_order_count = today_rollup.orders_total
+    active_orders = today_rollup.orders_active
+
+    # Weekly comparison
+    week_revenue = rollups[week_ago].revenue if week_ago in rollups else 0
+
+    revenue_change = 0
+    if week_revenue > 0:
+        revenue_change = ((today_revenue - week_revenue) / week_revenue) * 100
+
+    # Monthly metrics
+    monthly_revenue = sum((rollup.revenue for rollup in rollups.values()), 0)
+    monthly_orders = sum(rollup.orders_total for rollup in rollups.values())
+
+    # Table occupancy
+    total_tables = Table.objects.filter(restaurant=restaurant).count()
+    occupied_tables = Table.objects.filter(
+        restaurant=restaurant,
+        status='occupied'
+    ).count()
+
+    occupancy_rate = (occupied_tables / max(total_tables, 1)) * 100
+
+    # Staff metrics
+    total_staff = Employee.objects.filter(
+        restaurants=restaurant
+    ).count()
+
+    active_staff = Staff.objects.filter(
+        employee__restaurants=restaurant,
+        status='active'
+    ).count()
+
+    # Customer metrics
+    total_customers = Customer.objects.filter(restaurant=restaurant).count()
+
+    # Inventory alerts
+    low_stock_items = InventoryItem.objects.filter(
+        restaurant=restaurant,
+        status='low-stock'
+    ).count()
+
+    out_of_stock_items = InventoryItem.objects.filter(
+        restaurant=restaurant,
+        status='out-of-stock'
+    ).count()
+
+    return {
+        'restaurant': {
+            'id': restaurant.pk,
+            'name': restaurant.name,
+            'email': restaurant.email,
+            'address': restaurant.address
+        },
+        'today_metrics': {
+            'revenue': float(today_revenue),
+            'orders': today_order_count,
+            'active_orders': active_orders,
+            'revenue_change': round(revenue_change, 1)
+        },
+        'monthly_metrics': {
+            'revenue': float(monthly_revenue),
+            'orders': monthly_orders,
+            'avg_order_value': float(monthly_revenue / max(monthly_orders, 1))
+        },
+        'operations': {
+            'table_occupancy': round(occupancy_rate, 1),
+            'occupied_tables': occupied_tables,
+            'total_tables': total_tables,
+            'total_staff': total_staff,
+            'active_staff': active_staff,
+            'total_customers': total_customers
+        },
+        'inventory_alerts': {
+            'low_stock': low_stock_items,
+            'out_of_stock': out_of_stock_items
+        },
+        'last_updated': timezone.now().isoformat()
+    }
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def owner_dashboard_stats(request, restaurant_id):
     """Owner dashboard statistics for specific restaurant"""
-    if not check_restaurant_access(request.user.email, restaurant_id):
+    if not check_restaurant_access(request.user, restaurant_id):
         return Response({
             'error': 'Access denied to this restaurant'
         }, status=status.HTTP_403_FORBIDDEN)
 
     try:
-        restaurant = Restaurant.objects.get(id=restaurant_id)
-        today = timezone.now().date()
-        week_ago = today - timedelta(days=7)
-        month_ago = today - timedelta(days=30)
-
-        # Today's metrics
-        today_orders = Order.objects.filter(
-            restaurant=restaurant,
-            created_at__date=today
-        )
-
-        today_revenue = today_orders.filter(
-            status='completed'
-        ).aggregate(total=Sum('total'))['total'] or 0
-
-        today_order_count = today_orders.count()
-        active_orders = today_orders.filter(status='active').count()
-
-        # Weekly comparison
-        week_orders = Order.objects.filter(
-            restaurant=restaurant,
-            created_at__date=week_ago
+        today = restaurant_today(restaurant_id)
+        payload, hit = cached_dashboard(
+            'owner', restaurant_id,
+            lambda: build_owner_dashboard(restaurant_id, today),
+            variant=today.isoformat()
         )
-
-        week_revenue = week_orders.filter(
-            status='completed'
-        ).aggregate(total=Sum('total'))['total'] or 0
-
-        revenue_change = 0
-        if week_revenue > 0:
-            revenue_change = ((today_revenue - week_revenue) / week_revenue) * 100
-
-        # Monthly metrics
-        monthly_revenue = Order.objects.filter(
-            restaurant=restaurant,
-            status='completed',
-            created_at__gte=month_ago
-        ).aggregate(total=Sum('total'))['total'] or 0
-
-        monthly_orders = Order.objects.filter(
-            restaurant=restaurant,
-            created_at__gte=month_ago
-        ).count()
-
-        # Table occupancy
-        total_tables = Table.objects.filter(restaurant=restaurant).count()
-        occupied_tables = Table.objects.filter(
-            restaurant=restaurant,
-            status='occupied'
-        ).count()
-
-        occupancy_rate = (occupied_tables / max(total_tables, 1)) * 100
-
-        # Staff metrics
-        total_staff = Employee.objects.filter(
-            restaurants=restaurant
-        ).count()
-
-        active_staff = Staff.objects.filter(
-            employee__restaurants=restaurant,
-            status='active'
-        ).count()
-
-        # Customer metrics
-        total_customers = Customer.objects.filter(restaurant=restaurant).count()
-
-        # Inventory alerts
-        low_stock_items = InventoryItem.objects.filter(
-            restaurant=restaurant,
-            status='low-stock'
-        ).count()
-
-        out_of_stock_items = InventoryItem.objects.filter(
-            restaurant=restaurant,
-            status='out-of-stock'
-        ).count()
-
-        return Response({
-            'restaurant': {
-                'id': restaurant.pk,
-                'name': restaurant.name,
-                'email': restaurant.email,
-                'address': restaurant.address
-            },
-            'today_metrics': {
-                'revenue': float(today_revenue),
-                'orders': today_order_count,
-                'active_orders': active_orders,
-                'revenue_change': round(revenue_change, 1)
-            },
-            'monthly_metrics': {
-                'revenue': float(monthly_revenue),
-                'orders': monthly_orders,
-                'avg_order_value': float(monthly_revenue / max(monthly_orders, 1))
-            },
-            'operations': {
-                'table_occupancy': round(occupancy_rate, 1),
-                'occupied_tables': occupied_tables,
-                'total_tables': total_tables,
-                'total_staff': total_staff,
-                'active_staff': active_staff,
-                'total_customers': total_customers
-            },
-            'inventory_alerts': {
-                'low_stock': low_stock_items,
-                'out_of_stock': out_of_stock_items
-            },
-            'last_updated': timezone.now().isoformat()
-        })
+        return Response(payload, headers={'X-Cache': 'HIT' if hit else 'MISS'})
 
     except Restaurant.DoesNotExist:
         return Response({
@@ -166,7 +168,7 @@ def owner_dashboard_stats(request, restaurant_id):
 @permission_classes([IsAuthenticated])
 def restaurant_analytics(request, restaurant_id):
     """Detailed analytics for restaurant owner"""
-    if not check_restaurant_access(request.user.email, restaurant_id):
+    if not check_restaurant_access(request.user, restaurant_id):
         return Response({
             'error': 'Access denied to this restaurant'
         }, status=status.HTTP_403_FORBIDDEN)
@@ -174,36 +176,44 @@ def restaurant_analytics(request, restaurant_id):
     try:
         restaurant = Restaurant.objects.get(id=restaurant_id)
 
-        # Date range
-        days = int(request.GET.get('days', 30))
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=days)
+        # Date range: explicit start/end, or the last `days` days ending today
+        granularity = request.GET.get('granularity', 'day')
+        if granularity not in GRANULARITIES:
+            return Response({
+                'error': f"granularity must be one of: {', '.join(GRANULARITIES)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            end_param = request.GET.get('end')
+            end_date = date.fromisoformat(end_param) if end_param else restaurant_today(restaurant.pk)
+            start_param = request.GET.get('start')
+            if start_param:
+                start_date = date.fromisoformat(start_param)
+            else:
+                days = int(request.GET.get('days', 30))
+                start_date = end_date - timedelta(days=max(days, 1) - 1)
+        except ValueError:
+            return Response({
+                'error': 'start and end must be ISO dates (YYYY-MM-DD) and days an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if start_date > end_date:
+            return Response({
+                'error': 'start must not be after end'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if (end_date - start_date).days >= MAX_RANGE_DAYS:
+            return Response({
+                'error': f'Date range cannot exceed {MAX_RANGE_DAYS} days'
+            }, status=status.HTTP_400_BAD_REQUEST)
 
         # Revenue trends
-        revenue_data = []
-        for i in range(days):
-            date = end_date - timedelta(days=i)
-            daily_revenue = Order.objects.filter(
-                restaurant=restaurant,
-                status='completed',
-                created_at__date=date
-            ).aggregate(total=Sum('total'))['total'] or 0
-
-            daily_orders = Order.objects.filter(
-                restaurant=restaurant,
-                created_at__date=date
-            ).count()
-
-            revenue_data.append({
-                'date': date.isoformat(),
-                'revenue': float(daily_revenue),
-                'orders': daily_orders
-            })
-
-        revenue_data.reverse()
+        revenue_data = revenue_trends(restaurant.pk, start_date, end_date, granularity)
 
         return Response({
             'revenue_trends': revenue_data,
+            'granularity': granularity,
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
             'last_updated': timezone.now().isoformat()
         })
 
@@ -217,11 +227,56 @@ def restaurant_analytics(request, restaurant_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def order_history(request, restaurant_id):
+    """Order history, newest first, paginated with an opaque cursor"""
+    if not check_restaurant_access(request.user, restaurant_id):
+        return Response({
+            'error': 'Access denied to this restaurant'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        try:
+            limit = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return Response({
+                'error': 'limit must be an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        try:
+            filters = parse_filters(request.GET)
+            orders, next_cursor = order_history_page(
+                restaurant_id,
+                filters=filters,
+                cursor=request.GET.get('cursor'),
+                limit=limit
+            )
+        except (InvalidCursor, ValueError) as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'orders': OrderSerializer(orders, many=True).data,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
+            'limit': limit
+        })
+
+    except Exception as e:
+        return Response({
+            'error': f'Failed to fetch order history: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def create_expense(request, restaurant_id):
     """Create new expense"""
-    if not check_restaurant_access(request.user.email, restaurant_id):
+    if not check_restaurant_access(request.user, restaurant_id):
         return Response({
             'error': 'Access denied to this restaurant'
         }, status=status.HTTP_403_FORBIDDEN)
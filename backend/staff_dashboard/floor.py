@@ -0,0 +1,31 @@
+"""
+Floor plan reads for the staff table management screen
+"""
+from django.db.models import OuterRef, Prefetch, Subquery
+
+from superadmin.models import Chair, Order, Table
+
+
+def active_order_id_subquery():
+    """Id of a table's newest active order, for use in ``annotate``"""
+    return Subquery(
+        Order.objects.filter(table=OuterRef('pk'), status='active')
+        .order_by('-created_at')
+        .values('id')[:1]
+    )
+
+
+def floor_plan_tables(restaurant_id):
+    """
+    A restaurant's tables with everything the floor plan shows.
+
+    Waiter via a join, chairs via one prefetch and the active order id via a
+    correlated subquery: two queries however many tables there are.
+    """
+    return (
+        Table.objects.filter(restaurant_id=restaurant_id)
+        .select_related('waiter_assigned')
+        .prefetch_related(Prefetch('chairs', queryset=Chair.objects.order_by('number')))
+        .annotate(current_order_id=active_order_id_subquery())
+        .order_by('number')
+    )
@@ -0,0 +1,188 @@
+"""
+Order submission from the POS in a fixed number of queries.
+
+All menu items, chairs and the table of an order are validated with one
+query each, totals are computed from the fetched prices before the order
+row is written, and the items go in with a single bulk insert, all inside
+one transaction. ``bulk_create`` skips the OrderItem signals, so the
+kitchen stream is notified here; the Order's own post_save already bumps
+the dashboard cache version and refreshes its daily rollup on commit.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+
+from kitchen_dashboard.events import publish_item_events
+from superadmin.models import Chair, Customer, MenuItem, Order, OrderItem, Table
+
+
+# Largest number of item lines accepted in one order
+MAX_ORDER_ITEMS = 100
+MAX_ITEM_QUANTITY = 99
+
+CHARGE_FIELDS = ('tax', 'service_charge', 'discount')
+
+
+class OrderSubmissionError(ValueError):
+    """The submitted order is invalid; the message is safe to show to staff"""
+
+
+def _decimal(value, field):
+    try:
+        amount = Decimal(str(value)).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        raise OrderSubmissionError(f'{field} must be a number')
+    if not amount.is_finite():
+        raise OrderSubmissionError(f'{field} must be a number')
+    if amount < 0:
+        raise OrderSubmissionError(f'{field} must not be negative')
+    return amount
+
+
+def _optional_id(value, field):
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise OrderSubmissionError(f'{field} must be an id')
+
+
+def _parse_lines(items):
+    if not isinstance(items, list) or not items:
+        raise OrderSubmissionError('items must be a non-empty list')
+    if len(items) > MAX_ORDER_ITEMS:
+        raise OrderSubmissionError(f'An order can have at most {MAX_ORDER_ITEMS} items')
+
+    lines = []
+    for position, item in enumerate(items, start=1):
+        if not isinstance(item, dict):
+            raise OrderSubmissionError(f'Item {position} must be an object')
+        menu_item_id = _optional_id(item.get('menu_item_id'), f'Item {position} menu_item_id')
+        if menu_item_id is None:
+            raise OrderSubmissionError(f'Item {position} menu_item_id is required')
+        try:
+            quantity = int(item.get('quantity', 1))
+        except (TypeError, ValueError):
+            raise OrderSubmissionError(f'Item {position} quantity must be a whole number')
+        if not 1 <= quantity <= MAX_ITEM_QUANTITY:
+            raise OrderSubmissionError(f'Item {position} quantity must be between 1 and {MAX_ITEM_QUANTITY}')
+        customizations = item.get('customizations', [])
+        if not isinstance(customizations, list):
+            raise OrderSubmissionError(f'Item {position} customizations must be a list')
+        lines.append({
+            'position': position,
+            'menu_item_id': menu_item_id,
+            'quantity': quantity,
+            'notes': str(item.get('notes', '')),
+            'customizations': customizations,
+            'chair_id': _optional_id(item.get('chair_id'), f'Item {position} chair_id'),
+            # The price the POS displayed, checked against the menu below
+            'unit_price': None if item.get('unit_price') in (None, '') else _decimal(
+                item['unit_price'], f'Item {position} unit_price'
+            ),
+        })
+    return lines
+
+
+def create_order_with_items(restaurant, data, waiter=None):
+    """
+    Validate and create an order with all its items.
+
+    Raises OrderSubmissionError for invalid input. Returns the order with
+    its items prefetched for serialization.
+    """
+    if not isinstance(data, dict):
+        raise OrderSubmissionError('Request body must be a JSON object')
+    restaurant_id = restaurant.pk
+    order_type = data.get('order_type', 'dine-in')
+    if order_type not in dict(Order.ORDER_TYPE_CHOICES):
+        raise OrderSubmissionError('Invalid order_type')
+    lines = _parse_lines(data.get('items'))
+    charges = {field: _decimal(data.get(field, 0), field) for field in CHARGE_FIELDS}
+    table_id = _optional_id(data.get('table_id'), 'table_id')
+    chair_id = _optional_id(data.get('chair_id'), 'chair_id')
+    customer_id = _optional_id(data.get('customer_id'), 'customer_id')
+
+    menu_items = (
+        MenuItem.objects.filter(restaurant_id=restaurant_id)
+        .select_related('category')
+        .only('id', 'name', 'price', 'available', 'station', 'category', 'category__station')
+        .in_bulk({line['menu_item_id'] for line in lines})
+    )
+    for line in lines:
+        menu_item = menu_items.get(line['menu_item_id'])
+        if menu_item is None:
+            raise OrderSubmissionError(f"Item {line['position']}: menu item {line['menu_item_id']} not found")
+        if not menu_item.available:
+            raise OrderSubmissionError(f"Item {line['position']}: {menu_item.name} is not available")
+        if line['unit_price'] is not None and line['unit_price'] != menu_item.price:
+            raise OrderSubmissionError(
+                f"Item {line['position']}: price of {menu_item.name} is now {menu_item.price}"
+            )
+
+    table = None
+    if table_id is not None:
+        table = Table.objects.filter(restaurant_id=restaurant_id, pk=table_id).only('id', 'number').first()
+        if table is None:
+            raise OrderSubmissionError(f'Table {table_id} not found')
+    elif order_type == 'dine-in':
+        raise OrderSubmissionError('table_id is required for dine-in orders')
+
+    chair_ids = {line['chair_id'] for line in lines if line['chair_id'] is not None}
+    if chair_id is not None:
+        chair_ids.add(chair_id)
+    chairs = {}
+    if chair_ids:
+        if table is None:
+            raise OrderSubmissionError('Chairs can only be assigned with a table')
+        chairs = Chair.objects.filter(table_id=table.pk).only('id', 'number').in_bulk(chair_ids)
+        missing = sorted(chair_ids - chairs.keys())
+        if missing:
+            raise OrderSubmissionError(f'Chair {missing[0]} is not at table {table.number}')
+
+    customer = None
+    if customer_id is not None:
+        customer = Customer.objects.filter(restaurant_id=restaurant_id, pk=customer_id).only('id', 'name').first()
+        if customer is None:
+            raise OrderSubmissionError(f'Customer {customer_id} not found')
+
+    subtotal = sum(menu_items[line['menu_item_id']].price * line['quantity'] for line in lines)
+    total = subtotal + charges['tax'] + charges['service_charge'] - charges['discount']
+    if total < 0:
+        raise OrderSubmissionError('discount must not exceed the order amount')
+
+    with transaction.atomic():
+        order = Order.objects.create(
+            restaurant=restaurant,
+            table=table,
+            chair=chairs.get(chair_id),
+            customer=customer,
+            order_type=order_type,
+            subtotal=subtotal,
+            total=total,
+            waiter_assigned=waiter,
+            notes=str(data.get('notes', '')),
+            **charges
+        )
+        items = OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                menu_item=menu_items[line['menu_item_id']],
+                quantity=line['quantity'],
+                unit_price=menu_items[line['menu_item_id']].price,
+                notes=line['notes'],
+                customizations=line['customizations'],
+                chair=chairs.get(line['chair_id']),
+                station_id=menu_items[line['menu_item_id']].routed_station_id,
+            )
+            for line in lines
+        ])
+        item_ids = [item.pk for item in items]
+        transaction.on_commit(lambda: publish_item_events(restaurant.pk, 'item.created', item_ids))
+
+    prefetch_related_objects([order], Prefetch(
+        'order_items', queryset=OrderItem.objects.select_related('menu_item', 'chair')
+    ))
+    return order
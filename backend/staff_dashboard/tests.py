@@ -1,3 +1,107 @@
+from decimal import Decimal
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from superadmin.models import Chair, Employee, MenuCategory, MenuItem, Order, Restaurant, Table, User
+
+
+def create_restaurant(name='Test Restaurant'):
+    return Restaurant.objects.create(
+        name=name, email=f"{name.lower().replace(' ', '-')}@example.com", address='1 Main Street', phone='9800000000'
+    )
+
+
+class SubmitOrderTests(TestCase):
+    def setUp(self):
+        self.restaurant = create_restaurant()
+        user = User.objects.create_user(email='waiter@example.com', password='pw', role='staff')
+        employee = Employee.objects.create(name='Waiter', email=user.email, role='staff', password='x')
+        employee.restaurants.add(self.restaurant)
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        category = MenuCategory.objects.create(name='Mains', restaurant=self.restaurant)
+        self.burger = MenuItem.objects.create(
+            name='Burger', price=Decimal('10.00'), category=category, restaurant=self.restaurant
+        )
+        self.url = f'/api/staff/restaurant/{self.restaurant.pk}/orders/submit/'
+
+    def submit(self, data, **headers):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(self.url, data, format='json', headers=headers)
+
+    def order_data(self, quantity=2):
+        return {'order_type': 'takeaway', 'items': [{'menu_item_id': self.burger.pk, 'quantity': quantity}]}
+
+    def test_order_is_created_with_items(self):
+        response = self.submit(self.order_data())
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get()
+        self.assertEqual(order.order_items.get().quantity, 2)
+
+    def test_invalid_bodies_are_rejected(self):
+        bad_charge = {**self.order_data(), 'tax': 'NaN'}
+        for body in ([self.order_data()], 'order', bad_charge):
+            self.assertEqual(self.submit(body).status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+
+    def test_retry_with_same_key_is_replayed(self):
+        first = self.submit(self.order_data(), **{'Idempotency-Key': 'tablet-1-order-7'})
+        retry = self.submit(self.order_data(), **{'Idempotency-Key': 'tablet-1-order-7'})
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_same_key_for_a_different_order_is_a_conflict(self):
+        self.submit(self.order_data(), **{'Idempotency-Key': 'tablet-1-order-7'})
+        response = self.submit(self.order_data(quantity=3), **{'Idempotency-Key': 'tablet-1-order-7'})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class FloorPlanTests(TestCase):
+    """The floor plan costs the same queries for one table or many"""
+
+    def setUp(self):
+        self.restaurant = create_restaurant()
+        user = User.objects.create_user(email='waiter@example.com', password='pw', role='staff')
+        self.waiter = Employee.objects.create(name='Waiter', email=user.email, role='staff', password='x')
+        self.waiter.restaurants.add(self.restaurant)
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.url = f'/api/staff/restaurant/{self.restaurant.pk}/tables/'
+        self.tables = 0
+
+    def add_table(self):
+        self.tables += 1
+        table = Table.objects.create(
+            number=f'T{self.tables:02d}', restaurant=self.restaurant, capacity=4, waiter_assigned=self.waiter
+        )
+        for number in ('2', '1'):
+            Chair.objects.create(number=number, table=table)
+        Order.objects.create(restaurant=self.restaurant, table=table, status='completed')
+        return table, Order.objects.create(restaurant=self.restaurant, table=table, status='active')
+
+    def get_tables(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['tables']
+
+    def test_query_count_does_not_grow_with_tables(self):
+        table, order = self.add_table()
+        # Warm the restaurant access cache
+        self.get_tables()
+        with self.assertNumQueries(3):
+            [payload] = self.get_tables()
+        self.assertEqual((payload['id'], payload['current_order_id'], payload['waiter_name']),
+                         (table.pk, order.pk, 'Waiter'))
+        self.assertEqual([chair['number'] for chair in payload['chairs']], ['1', '2'])
 
-# Create your tests here.
+        orders = [order] + [self.add_table()[1] for _ in range(7)]
+        with self.assertNumQueries(3):
+            payload = self.get_tables()
+        self.assertEqual([table['current_order_id'] for table in payload], [order.pk for order in orders])
+        self.assertTrue(all(len(table['chairs']) == 2 for table in payload))
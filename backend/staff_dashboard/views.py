@@ -14,83 +14,101 @@ from superadmin.models import (
     Restaurant, Employee, Table, Chair, Order, OrderItem, Customer, Staff
 )
 from superadmin.serializers import (
-    TableSerializer, OrderSerializer, CustomerSerializer, StaffSerializer
+    TableSerializer, FloorPlanTableSerializer, OrderSerializer, CustomerSerializer,
+    StaffSerializer
 )
+from superadmin.rollups import get_daily_rollup
+from superadmin.access import user_has_restaurant_access
+from superadmin.business_dates import restaurant_today
+from superadmin.dashboard_cache import cached_dashboard
+from superadmin.idempotency import idempotent
+from .floor import floor_plan_tables
+from .orders import OrderSubmissionError, create_order_with_items
 
 
-def check_staff_access(user_email, restaurant_id):
+def _request_employee(user):
+    """The Employee behind the request: from the token claim, else by email"""
+    token = getattr(user, 'token', None)
+    employee_id = token.get('employee_id') if token is not None else None
+    if employee_id is not None:
+        return Employee.objects.filter(pk=employee_id).first()
+    return Employee.objects.filter(email=user.email).first()
+
+
+def check_staff_access(user, restaurant_id):
     """Check if user has staff access to restaurant"""
-    try:
-        employee = Employee.objects.get(email=user_email)
-        return (employee.restaurants.filter(id=restaurant_id).exists() and
-                employee.role in ['staff', 'manager', 'owner'])
-    except Employee.DoesNotExist:
-        return False
+    return user_has_restaurant_access(user, restaurant_id, roles=['staff', 'manager', 'owner'])
+
+
+def build_staff_dashboard(restaurant_id, today):
+    """Staff dashboard payload for one restaurant and day"""
+    restaurant = Restaurant.objects.get(id=restaurant_id)
+
+    # Table status overview
+    total_tables = Table.objects.filter(restaurant=restaurant).count()
+    occupied_tables = Table.objects.filter(
+        restaurant=restaurant,
+        status='occupied'
+    ).count()
+    available_tables = Table.objects.filter(
+        restaurant=restaurant,
+        status='available'
+    ).count()
+    reserved_tables = Table.objects.filter(
+        restaurant=restaurant,
+        status='reserved'
+    ).count()
+
+    # Today's orders
+    today_rollup = get_daily_rollup(restaurant.pk, today)
+    active_orders = today_rollup.orders_active
+    completed_orders = today_rollup.orders_completed
+
+    # Customer metrics
+    total_customers_today = Customer.objects.filter(
+        restaurant=restaurant,
+        business_date=today
+    ).count()
+
+    return {
+        'restaurant': {
+            'id': restaurant.pk,
+            'name': restaurant.name
+        },
+        'table_overview': {
+            'total_tables': total_tables,
+            'occupied': occupied_tables,
+            'available': available_tables,
+            'reserved': reserved_tables,
+            'occupancy_rate': round((occupied_tables / max(total_tables, 1)) * 100, 1)
+        },
+        'today_orders': {
+            'active': active_orders,
+            'completed': completed_orders,
+            'total': today_rollup.orders_total
+        },
+        'customers_today': total_customers_today,
+        'last_updated': timezone.now().isoformat()
+    }
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def staff_dashboard_stats(request, restaurant_id):
     """Staff dashboard statistics"""
-    if not check_staff_access(request.user.email, restaurant_id):
+    if not check_staff_access(request.user, restaurant_id):
         return Response({
             'error': 'Access denied to this restaurant'
         }, status=status.HTTP_403_FORBIDDEN)
 
     try:
-        restaurant = Restaurant.objects.get(id=restaurant_id)
-        today = timezone.now().date()
-
-        # Table status overview
-        total_tables = Table.objects.filter(restaurant=restaurant).count()
-        occupied_tables = Table.objects.filter(
-            restaurant=restaurant,
-            status='occupied'
-        ).count()
-        available_tables = Table.objects.filter(
-            restaurant=restaurant,
-            status='available'
-        ).count()
-        reserved_tables = Table.objects.filter(
-            restaurant=restaurant,
-            status='reserved'
-        ).count()
-
-        # Today's orders
-        today_orders = Order.objects.filter(
-            restaurant=restaurant,
-            created_at__date=today
+        today = restaurant_today(restaurant_id)
+        payload, hit = cached_dashboard(
+            'staff', restaurant_id,
+            lambda: build_staff_dashboard(restaurant_id, today),
+            variant=today.isoformat()
         )
-
-        active_orders = today_orders.filter(status='active').count()
-        completed_orders = today_orders.filter(status='completed').count()
-
-        # Customer metrics
-        total_customers_today = Customer.objects.filter(
-            restaurant=restaurant,
-            created_at__date=today
-        ).count()
-
-        return Response({
-            'restaurant': {
-                'id': restaurant.pk,
-                'name': restaurant.name
-            },
-            'table_overview': {
-                'total_tables': total_tables,
-                'occupied': occupied_tables,
-                'available': available_tables,
-                'reserved': reserved_tables,
-                'occupancy_rate': round((occupied_tables / max(total_tables, 1)) * 100, 1)
-            },
-            'today_orders': {
-                'active': active_orders,
-                'completed': completed_orders,
-                'total': today_orders.count()
-            },
-            'customers_today': total_customers_today,
-            'last_updated': timezone.now().isoformat()
-        })
+        return Response(payload, headers={'X-Cache': 'HIT' if hit else 'MISS'})
 
     except Restaurant.DoesNotExist:
         return Response({
@@ -106,17 +124,21 @@ def staff_dashboard_stats(request, restaurant_id):
 @permission_classes([IsAuthenticated])
 def staff_table_management(request, restaurant_id):
     """Get all tables for staff management"""
-    if not check_staff_access(request.user.email, restaurant_id):
+    if not check_staff_access(request.user, restaurant_id):
         return Response({
             'error': 'Access denied to this restaurant'
         }, status=status.HTTP_403_FORBIDDEN)
 
     try:
-        restaurant = Restaurant.objects.get(id=restaurant_id)
-        tables = Table.objects.filter(restaurant=restaurant).order_by('number')
+        restaurant = Restaurant.objects.only('id', 'name').get(id=restaurant_id)
+        tables = floor_plan_tables(restaurant.pk)
 
         return Response({
-            'tables': TableSerializer(tables, many=True).data,
+            'restaurant': {
+                'id': restaurant.pk,
+                'name': restaurant.name
+            },
+            'tables': FloorPlanTableSerializer(tables, many=True).data,
             'last_updated': timezone.now().isoformat()
         })
 
@@ -134,7 +156,7 @@ def staff_table_management(request, restaurant_id):
 @permission_classes([IsAuthenticated])
 def update_table_status(request, restaurant_id, table_id):
     """Update table status"""
-    if not check_staff_access(request.user.email, restaurant_id):
+    if not check_staff_access(request.user, restaurant_id):
         return Response({
             'error': 'Access denied to this restaurant'
         }, status=status.HTTP_403_FORBIDDEN)
@@ -169,3 +191,36 @@ def update_table_status(request, restaurant_id, table_id):
         return Response({
             'error': f'Failed to update table status: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@idempotent
+def submit_order(request, restaurant_id):
+    """Create an order with all of its items in one transaction"""
+    if not check_staff_access(request.user, restaurant_id):
+        return Response({
+            'error': 'Access denied to this restaurant'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        restaurant = Restaurant.objects.only('id', 'name').get(id=restaurant_id)
+        order = create_order_with_items(restaurant, request.data, waiter=_request_employee(request.user))
+
+        return Response({
+            'message': 'Order submitted successfully',
+            'order': OrderSerializer(order).data
+        }, status=status.HTTP_201_CREATED)
+
+    except Restaurant.DoesNotExist:
+        return Response({
+            'error': 'Restaurant not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except OrderSubmissionError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({
+            'error': f'Failed to submit order: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
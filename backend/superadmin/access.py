@@ -0,0 +1,75 @@
+"""
+Restaurant access resolution for the dashboard apps.
+
+Each user's restaurant_id -> role map is cached under their email, so
+authorization costs no queries once warm. Users authenticated from scoped
+tokens carry the map in their claims and skip the cache entirely. Signal handlers in
+``superadmin.signals`` drop the entry whenever an employee's role, email
+or restaurant assignments change.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Employee
+
+
+ACCESS_CACHE_TIMEOUT = getattr(settings, 'ACCESS_CACHE_TIMEOUT', 300)
+
+ACCESS_KEY = 'access:roles:{}'
+
+
+def _access_key(email):
+    # Emails may contain characters memcached rejects in keys
+    return ACCESS_KEY.format(email.strip().lower().encode('utf-8').hex())
+
+
+def load_restaurant_roles(email):
+    """Map of restaurant id to role for the employee with this email"""
+    # Matched like _access_key() normalises it, so the cache key and the
+    # lookup agree however the email is capitalised
+    rows = Employee.restaurants.through.objects.filter(
+        employee__email__iexact=email.strip()
+    ).values_list('restaurant_id', 'employee__role')
+    return dict(rows)
+
+
+def get_restaurant_roles(email):
+    """Cached restaurant id -> role map; empty when the user is no employee"""
+    if not email:
+        return {}
+    key = _access_key(email)
+    roles = cache.get(key)
+    if roles is None:
+        roles = load_restaurant_roles(email)
+        cache.set(key, roles, timeout=ACCESS_CACHE_TIMEOUT)
+    return roles
+
+
+def get_restaurant_role(email, restaurant_id):
+    """The user's role at a restaurant, or None without access"""
+    return get_restaurant_roles(email).get(int(restaurant_id))
+
+
+def has_restaurant_access(email, restaurant_id, roles=None):
+    """Whether the user works at the restaurant, optionally in one of ``roles``"""
+    role = get_restaurant_role(email, restaurant_id)
+    if role is None:
+        return False
+    return roles is None or role in roles
+
+
+def user_has_restaurant_access(user, restaurant_id, roles=None):
+    """Like ``has_restaurant_access`` but prefers the user's token claims"""
+    restaurant_roles = getattr(user, 'restaurant_roles', None)
+    if restaurant_roles is None:
+        return has_restaurant_access(user.email, restaurant_id, roles)
+    role = restaurant_roles.get(int(restaurant_id))
+    if role is None:
+        return False
+    return roles is None or role in roles
+
+
+def invalidate_access(*emails):
+    keys = [_access_key(email) for email in emails if email]
+    if keys:
+        cache.delete_many(keys)
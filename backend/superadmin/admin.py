@@ -3,7 +3,8 @@ from django.contrib.auth.admin import UserAdmin
 from .models import (
     Restaurant, Employee, DailyStats, MenuCategory, MenuItem,
     InventoryCategory, InventoryItem, Table, Chair, Customer,
-    Order, OrderItem, Vendor, Staff, Notification, Expense, WasteEntry
+    Order, OrderItem, Vendor, Staff, Notification, Expense, WasteEntry,
+    RestaurantDailyRollup, IdempotencyKey, OrderItemTransition, MenuItemPrepEstimate, KitchenStation
 )
 
 
@@ -33,7 +34,7 @@ class CustomUserAdmin(UserAdmin):
 
 @admin.register(Restaurant)
 class RestaurantAdmin(admin.ModelAdmin):
-    list_display = ('name', 'email', 'phone', 'created_at')
+    list_display = ('name', 'email', 'phone', 'timezone', 'created_at')
     list_filter = ('created_at',)
     search_fields = ('name', 'email', 'phone')
     ordering = ('name',)
@@ -57,22 +58,38 @@ class DailyStatsAdmin(admin.ModelAdmin):
 
 
 # === MENU MANAGEMENT ADMIN ===
+@admin.register(KitchenStation)
+class KitchenStationAdmin(admin.ModelAdmin):
+    list_display = ('name', 'restaurant', 'type', 'display_order', 'is_active')
+    list_filter = ('restaurant', 'type', 'is_active')
+    search_fields = ('name',)
+    ordering = ('restaurant', 'display_order')
+
+
 @admin.register(MenuCategory)
 class MenuCategoryAdmin(admin.ModelAdmin):
-    list_display = ('name', 'restaurant', 'display_order', 'is_active', 'created_at')
-    list_filter = ('restaurant', 'is_active')
+    list_display = ('name', 'restaurant', 'station', 'display_order', 'is_active', 'created_at')
+    list_filter = ('restaurant', 'is_active', 'station')
     search_fields = ('name', 'description')
     ordering = ('restaurant', 'display_order')
 
 
 @admin.register(MenuItem)
 class MenuItemAdmin(admin.ModelAdmin):
-    list_display = ('name', 'restaurant', 'category', 'price', 'available', 'created_at')
-    list_filter = ('restaurant', 'category', 'available', 'is_vegan', 'is_gluten_free')
+    list_display = ('name', 'restaurant', 'category', 'station', 'price', 'available', 'created_at')
+    list_filter = ('restaurant', 'category', 'station', 'available', 'is_vegan', 'is_gluten_free')
     search_fields = ('name', 'description')
     ordering = ('restaurant', 'category', 'name')
 
 
+@admin.register(MenuItemPrepEstimate)
+class MenuItemPrepEstimateAdmin(admin.ModelAdmin):
+    list_display = ('menu_item', 'recommended_minutes', 'median_minutes', 'p90_minutes', 'sample_count', 'computed_at')
+    list_filter = ('menu_item__restaurant',)
+    search_fields = ('menu_item__name',)
+    readonly_fields = ('computed_at',)
+
+
 # === INVENTORY MANAGEMENT ADMIN ===
 @admin.register(InventoryCategory)
 class InventoryCategoryAdmin(admin.ModelAdmin):
@@ -130,6 +147,18 @@ class OrderItemAdmin(admin.ModelAdmin):
     search_fields = ('menu_item__name', 'notes')
 
 
+@admin.register(OrderItemTransition)
+class OrderItemTransitionAdmin(admin.ModelAdmin):
+    list_display = ('item', 'from_status', 'to_status', 'at')
+    list_filter = ('to_status', 'item__order__restaurant')
+    ordering = ('-at',)
+    raw_id_fields = ('item',)
+
+    def has_change_permission(self, request, obj=None):
+        # The log is append-only
+        return False
+
+
 # === VENDOR MANAGEMENT ADMIN ===
 @admin.register(Vendor)
 class VendorAdmin(admin.ModelAdmin):
@@ -174,6 +203,23 @@ class WasteEntryAdmin(admin.ModelAdmin):
     search_fields = ('item_name', 'notes')
     ordering = ('-date',)
 
+
+# === REPORTING ADMIN ===
+@admin.register(RestaurantDailyRollup)
+class RestaurantDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('date', 'restaurant', 'revenue', 'orders_total', 'orders_completed', 'items_sold')
+    list_filter = ('restaurant', 'date')
+    ordering = ('-date',)
+    readonly_fields = ('updated_at',)
+
+# === API IDEMPOTENCY ADMIN ===
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ('key', 'scope', 'status_code', 'created_at', 'expires_at')
+    search_fields = ('key', 'scope')
+    ordering = ('-created_at',)
+    readonly_fields = ('created_at',)
+
 # @admin.register(SystemAlert)
 # class SystemAlertAdmin(admin.ModelAdmin):
 #     list_display = ('alert_type', 'truncated_message', 'created_at', 'is_read')
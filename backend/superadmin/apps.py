@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class SuperadminConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'superadmin'
+
+    def ready(self):
+        from django.conf import settings
+        from . import checks, signals  # noqa: F401
+        from .instrumentation import install_query_recording
+
+        # Before any connection opens, so requests can be measured in any thread
+        install_query_recording()
+
+        if getattr(settings, 'DAILY_STATS_SCHEDULER_ENABLED', False):
+            from .snapshots import start_scheduler
+            start_scheduler()
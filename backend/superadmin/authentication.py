@@ -0,0 +1,50 @@
+"""
+Authentication backed by the restaurant scope claims in access tokens
+"""
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .tokens import get_token_version, get_user_role
+
+
+class RestaurantScopedUser(TokenUser):
+    """
+    Request user built from token claims without loading User or Employee.
+
+    Unknown attributes fall through to the token's claims, so ``email``,
+    ``name`` and ``role`` read like they do on the User model.
+    """
+
+    @cached_property
+    def restaurant_ids(self):
+        return frozenset(self.token.get('restaurant_ids', ()))
+
+    @cached_property
+    def restaurant_roles(self):
+        """Restaurant id -> role, in the shape of superadmin.access maps"""
+        role = self.token.get('employee_role')
+        return {restaurant_id: role for restaurant_id in self.restaurant_ids}
+
+
+class ScopedJWTAuthentication(JWTAuthentication):
+    """
+    Authenticate scoped tokens statelessly; fall back to a User lookup for
+    tokens issued without scope claims.
+    """
+
+    def get_user(self, validated_token):
+        if 'restaurant_ids' not in validated_token:
+            return super().get_user(validated_token)
+
+        employee_id = validated_token.get('employee_id')
+        if employee_id is not None and get_token_version(employee_id) != validated_token.get('token_version'):
+            raise InvalidToken('Token has been revoked')
+
+        # Admin tokens carry no employee; their role claim is the User's own
+        if get_user_role(validated_token.get(api_settings.USER_ID_CLAIM)) != validated_token.get('role'):
+            raise InvalidToken('Token has been revoked')
+
+        return RestaurantScopedUser(validated_token)
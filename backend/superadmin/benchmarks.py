@@ -0,0 +1,393 @@
+"""
+Endpoint benchmarks: latency, SQL queries, rows fetched and peak memory.
+
+Every routed API endpoint is discovered from the URLconf and requested
+in-process through the Django test client, so middleware, authentication
+and serialization are all measured. Reports are plain JSON and two of them
+can be compared to flag regressions.
+
+Path parameters and POST bodies are taken from the dataset of the
+benchmarked restaurant (see ``generate_dataset``). Each POST request runs
+in a transaction that is rolled back once its on-commit work has run, so
+benchmarking leaves the dataset as it found it. POST endpoints still run
+after every GET endpoint, as cache invalidations are not rolled back.
+"""
+import json
+import re
+import statistics
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.backends.utils import CursorWrapper
+from django.test import Client
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+
+from . import metrics
+from .dataset import DEFAULT_PASSWORD
+from .instrumentation import count_queries
+from .models import Employee, KitchenStation, MenuItem, Order, Table, User, Vendor
+from .profiling import list_profiles
+from .tokens import ScopedRefreshToken
+
+
+# Endpoints that never finish a response on their own
+STREAMING_ENDPOINTS = {'kitchen_dashboard:queue-stream'}
+
+# URL namespaces that are not part of the API
+EXCLUDED_NAMESPACES = {'admin'}
+
+# Namespaces requested with an administrator's token; the rest use the owner's
+ADMIN_NAMESPACES = {'', 'superadmin'}
+
+# Query, p95 latency (ms) and row budgets per endpoint, checked after every run
+ENDPOINT_BUDGETS = getattr(settings, 'ENDPOINT_BUDGETS', {})
+
+# Relative growth tolerated before a metric counts as a regression, and the
+# absolute growth below which timing and memory noise is ignored
+DEFAULT_TOLERANCE = 0.2
+MIN_LATENCY_DELTA_MS = 2.0
+MIN_MEMORY_DELTA_KB = 64
+
+FETCH_METHODS = ('fetchone', 'fetchmany', 'fetchall')
+
+
+def discover_endpoints(patterns=None, prefix='', namespace=''):
+    """
+    (name, route, methods, parameter names) for every routed view.
+
+    ``methods`` lists the HTTP methods the view handles, or None when the
+    view is a plain function that does not declare them.
+    """
+    endpoints = []
+    for pattern in get_resolver().url_patterns if patterns is None else patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            child_namespace = pattern.namespace or namespace
+            if child_namespace in EXCLUDED_NAMESPACES:
+                continue
+            endpoints.extend(discover_endpoints(pattern.url_patterns, route, child_namespace))
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            view_class = getattr(pattern.callback, 'cls', None) or getattr(pattern.callback, 'view_class', None)
+            methods = None
+            if view_class is not None:
+                methods = sorted(
+                    method.upper() for method in view_class.http_method_names
+                    if method not in ('head', 'options') and hasattr(view_class, method)
+                )
+            endpoints.append({
+                'name': f'{namespace}:{pattern.name}' if namespace else pattern.name,
+                'namespace': namespace,
+                'route': route,
+                'methods': methods,
+                'parameters': re.findall(r'<(?:\w+:)?(\w+)>', route),
+            })
+    return endpoints
+
+
+def _percentile(values, percent):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    rank = max(1, round(percent / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+@contextmanager
+def count_fetched_rows():
+    """Count rows fetched from any database cursor"""
+    counter = {'rows': 0}
+
+    def counting(name):
+        def method(self, *args, **kwargs):
+            result = getattr(self.cursor, name)(*args, **kwargs)
+            if name == 'fetchone':
+                counter['rows'] += result is not None
+            else:
+                counter['rows'] += len(result)
+            return result
+        return method
+
+    for name in FETCH_METHODS:
+        setattr(CursorWrapper, name, counting(name))
+    try:
+        yield counter
+    finally:
+        for name in FETCH_METHODS:
+            delattr(CursorWrapper, name)
+
+
+@contextmanager
+def rolled_back():
+    """
+    Run a block in a transaction that is rolled back afterwards.
+
+    on_commit callbacks registered by the block run before the rollback, so
+    their queries are measured with the request that caused them.
+    """
+    with transaction.atomic():
+        start = len(connection.run_on_commit)
+        yield
+        while len(connection.run_on_commit) > start and not connection.needs_rollback:
+            callbacks = connection.run_on_commit[start:]
+            del connection.run_on_commit[start:]
+            for _, callback, _ in callbacks:
+                callback()
+        transaction.set_rollback(True)
+
+
+def _host():
+    hosts = [host for host in settings.ALLOWED_HOSTS if host != '*']
+    return hosts[0].lstrip('.') if hosts else 'localhost'
+
+
+def _method(endpoint):
+    """GET when the view handles it, else the first method it declares"""
+    methods = endpoint['methods']
+    return 'GET' if not methods or 'GET' in methods else methods[0]
+
+
+class EndpointBenchmark:
+    """Runs the endpoints of the API against one restaurant's data"""
+
+    def __init__(self, restaurant_id, runs=20, warmup=2, cold=False, read_only=False):
+        self.restaurant_id = restaurant_id
+        self.runs = runs
+        self.warmup = warmup
+        self.cold = cold
+        self.read_only = read_only
+        self.client = Client(HTTP_HOST=_host())
+        self.users = self._users()
+        self.parameters = self._parameters()
+        self.headers = self._headers()
+        self.bodies = self._bodies()
+
+    def _users(self):
+        """Dataset logins: the restaurant's owner and kitchen user, and the first administrator"""
+        users = {'admin': User.objects.filter(role='admin').order_by('pk').first()}
+        for role in ('owner', 'kitchen'):
+            email = (Employee.objects.filter(restaurants=self.restaurant_id, role=role)
+                     .order_by('pk').values_list('email', flat=True).first())
+            users[role] = User.objects.filter(email=email, role=role).first() if email else None
+        return users
+
+    def _parameters(self):
+        restaurant_id = self.restaurant_id
+        orders = Order.objects.filter(restaurant_id=restaurant_id).order_by('-pk')
+        # Each parameter is the first id of its querysets; order-eta prefers
+        # an order still in the kitchen so it does real work
+        providers = {
+            'table_id': [Table.objects.filter(restaurant_id=restaurant_id).order_by('pk')],
+            'vendor_id': [Vendor.objects.order_by('pk')],
+            'station_id': [
+                KitchenStation.objects.filter(restaurant_id=restaurant_id).order_by('display_order', 'pk'),
+            ],
+            'order_id': [orders.filter(status='active', order_items__isnull=False), orders],
+            'menu_item_id': [MenuItem.objects.filter(restaurant_id=restaurant_id, available=True).order_by('pk')],
+        }
+        parameters = {'restaurant_id': restaurant_id}
+        for name, querysets in providers.items():
+            for queryset in querysets:
+                value = queryset.values_list('id', flat=True).first()
+                if value is not None:
+                    parameters[name] = value
+                    break
+        profiles = list_profiles(limit=1)
+        if profiles:
+            parameters['profile_id'] = profiles[0]['id']
+        return parameters
+
+    def _token_headers(self, user):
+        if user is None:
+            return {}
+        token = ScopedRefreshToken.for_user(user).access_token
+        return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def _headers(self):
+        return {
+            'owner': self._token_headers(self.users['owner']),
+            'admin': self._token_headers(self.users['admin']),
+        }
+
+    def _credentials(self, role):
+        """Login body for a dataset user, or None when there is none to log in with"""
+        user = self.users[role]
+        if user is None or not user.check_password(DEFAULT_PASSWORD):
+            return None
+        return lambda: {'email': user.email, 'password': DEFAULT_PASSWORD}
+
+    def _bodies(self):
+        """
+        Endpoint name -> callable returning a fresh POST body.
+
+        Bodies are built per request, so each one is valid on its own: new
+        restaurants get unique emails and logout a fresh refresh token.
+        """
+        parameters = self.parameters
+        bodies = {
+            'superadmin:admin-login': self._credentials('admin'),
+            'superadmin:owner-login': self._credentials('owner'),
+            'superadmin:staff-login': self._credentials('kitchen'),
+        }
+        if self.users['owner'] is not None:
+            owner = self.users['owner']
+            # Logout blacklists the refresh token, which needs simplejwt's blacklist app
+            if apps.is_installed('rest_framework_simplejwt.token_blacklist'):
+                bodies['superadmin:logout'] = lambda: {'refresh_token': str(ScopedRefreshToken.for_user(owner))}
+            bodies['owner_dashboard:create-expense'] = lambda: {
+                'description': 'Benchmark expense', 'amount': '10.00', 'category': 'other',
+                'date': timezone.localdate().isoformat(),
+            }
+
+        def new_restaurant():
+            key = uuid.uuid4().hex[:12]
+            return {
+                'name': f'Benchmark {key}', 'email': f'benchmark-{key}@example.com',
+                'address': '1 Benchmark Street', 'phone': '9800000000',
+                'owner': {'name': f'Owner {key}', 'email': f'benchmark-owner-{key}@example.com',
+                          'password': DEFAULT_PASSWORD},
+            }
+        bodies['superadmin:restaurant-create'] = new_restaurant
+
+        if 'table_id' in parameters:
+            # Setting the current status again keeps the floor plan unchanged
+            table_status = Table.objects.values_list('status', flat=True).get(pk=parameters['table_id'])
+            bodies['staff_dashboard:update-table-status'] = lambda: {'status': table_status}
+            if 'menu_item_id' in parameters:
+                bodies['staff_dashboard:submit-order'] = lambda: {
+                    'table_id': parameters['table_id'],
+                    'items': [{'menu_item_id': parameters['menu_item_id'], 'quantity': 2}],
+                }
+        if 'order_id' in parameters:
+            bodies['kitchen_dashboard:bulk-item-status'] = lambda: {
+                'status': 'preparing', 'order_id': parameters['order_id'],
+            }
+        return {name: body for name, body in bodies.items() if body is not None}
+
+    def skip_reason(self, endpoint):
+        if endpoint['name'] in STREAMING_ENDPOINTS:
+            return 'streaming response'
+        if endpoint['name'] == 'metrics' and not metrics.ENABLED:
+            return 'METRICS_ENABLED is off'
+        missing = [name for name in endpoint['parameters'] if name not in self.parameters]
+        if missing:
+            return f"no data for {', '.join(missing)}"
+        if endpoint['namespace'] in ADMIN_NAMESPACES and not self.headers['admin']:
+            return 'no administrator'
+        if _method(endpoint) != 'GET':
+            if self.read_only:
+                return 'mutating endpoint'
+            if endpoint['name'] not in self.bodies:
+                return 'no request body'
+        return None
+
+    def _request(self, method, path, headers, body=None):
+        if self.cold:
+            cache.clear()
+        started = time.perf_counter()
+        if method == 'GET':
+            response = self.client.get(path, **headers)
+        else:
+            with rolled_back():
+                response = self.client.generic(method, path, json.dumps(body), 'application/json', **headers)
+        return response, (time.perf_counter() - started) * 1000
+
+    def measure(self, endpoint):
+        """Timings and per-request costs of one endpoint"""
+        path = reverse(endpoint['name'], kwargs={name: self.parameters[name] for name in endpoint['parameters']})
+        headers = self.headers['admin' if endpoint['namespace'] in ADMIN_NAMESPACES else 'owner']
+        method = _method(endpoint)
+        body = self.bodies.get(endpoint['name'], dict)
+
+        for _ in range(self.warmup):
+            self._request(method, path, headers, body())
+
+        latencies, queries, rows = [], [], []
+        for _ in range(self.runs):
+            # Bodies are built outside the counters and timer
+            data = body()
+            with count_queries() as query_counter, count_fetched_rows() as row_counter:
+                response, elapsed_ms = self._request(method, path, headers, data)
+            latencies.append(elapsed_ms)
+            queries.append(query_counter['queries'])
+            rows.append(row_counter['rows'])
+
+        # Memory is traced on a separate request; tracemalloc slows everything down
+        data = body()
+        tracemalloc.start()
+        try:
+            self._request(method, path, headers, data)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'path': path,
+            'method': method,
+            'status': response.status_code,
+            'p50_ms': round(_percentile(latencies, 50), 3),
+            'p95_ms': round(_percentile(latencies, 95), 3),
+            'mean_ms': round(statistics.fmean(latencies), 3),
+            'queries': max(queries),
+            'rows': max(rows),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    def run(self, names=None):
+        """Benchmark every discovered endpoint, or those whose name contains one of ``names``"""
+        results, skipped = {}, {}
+        # Writes go last so they cannot change what the GET endpoints read
+        endpoints = sorted(discover_endpoints(), key=lambda endpoint: _method(endpoint) != 'GET')
+        for endpoint in endpoints:
+            if names and not any(name in endpoint['name'] for name in names):
+                continue
+            reason = self.skip_reason(endpoint)
+            if reason:
+                skipped[endpoint['name']] = reason
+            else:
+                results[endpoint['name']] = self.measure(endpoint)
+        return results, skipped
+
+
+def check_budgets(report, budgets=None):
+    """Human-readable budget violations in a report"""
+    budgets = ENDPOINT_BUDGETS if budgets is None else budgets
+    violations = []
+    for name, budget in sorted(budgets.items()):
+        result = report['endpoints'].get(name)
+        if result is None:
+            continue
+        for metric, limit in sorted(budget.items()):
+            if metric in result and result[metric] > limit:
+                violations.append(f'{name}: {metric} {result[metric]} exceeds budget {limit}')
+    return violations
+
+
+def compare_reports(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """Human-readable regressions of ``current`` against ``baseline``"""
+    regressions = []
+    for name, result in sorted(current['endpoints'].items()):
+        before = baseline['endpoints'].get(name)
+        if before is None:
+            continue
+        if result['status'] >= 400 and before['status'] < 400:
+            regressions.append(f"{name}: status {before['status']} -> {result['status']}")
+        if result['queries'] > before['queries']:
+            regressions.append(f"{name}: queries {before['queries']} -> {result['queries']}")
+        if result['rows'] > before['rows'] * (1 + tolerance):
+            regressions.append(f"{name}: rows {before['rows']} -> {result['rows']}")
+        for metric in ('p50_ms', 'p95_ms'):
+            if (result[metric] > before[metric] * (1 + tolerance)
+                    and result[metric] - before[metric] >= MIN_LATENCY_DELTA_MS):
+                regressions.append(f'{name}: {metric} {before[metric]} -> {result[metric]}')
+        if (result['peak_memory_kb'] > before['peak_memory_kb'] * (1 + tolerance)
+                and result['peak_memory_kb'] - before['peak_memory_kb'] >= MIN_MEMORY_DELTA_KB):
+            regressions.append(
+                f"{name}: peak_memory_kb {before['peak_memory_kb']} -> {result['peak_memory_kb']}"
+            )
+    return regressions
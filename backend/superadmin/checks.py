@@ -0,0 +1,37 @@
+"""
+System checks for settings the superadmin app relies on.
+
+Restaurant access maps, token versions, user roles and dashboard payloads
+are cached and invalidated by model signals. A per-process cache only sees
+the invalidations of the process that handled the write, so every other
+worker keeps serving stale access and revoked tokens until the entries
+expire. Deployments must use a cache shared by all workers, which
+``manage.py check --deploy`` enforces.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+# Cache backends that keep their entries in the memory of one process
+PROCESS_LOCAL_CACHE_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+}
+
+
+def is_shared_cache(alias='default'):
+    """Whether every worker process sees the same entries in this cache"""
+    backend = settings.CACHES.get(alias, {}).get('BACKEND', '')
+    return backend not in PROCESS_LOCAL_CACHE_BACKENDS
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if settings.DEBUG or is_shared_cache():
+        return []
+    return [Error(
+        'The default cache is local to each process.',
+        hint='Access maps, token versions and dashboards are invalidated through the cache, so other '
+             'workers would keep granting revoked access. Use Redis, Memcached or DatabaseCache.',
+        obj='CACHES',
+        id='superadmin.E001',
+    )]
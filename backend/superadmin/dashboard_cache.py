@@ -0,0 +1,103 @@
+"""
+Versioned per-restaurant cache for dashboard payloads.
+
+Every restaurant has a version counter in the cache. Payloads are stored
+under keys that include the version, and model signals bump the version
+whenever data behind the dashboards changes, so a stale payload is never
+read again and simply expires.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+CACHE_TIMEOUT = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300)
+
+VERSION_KEY = 'dashboard:version:{}'
+PAYLOAD_KEY = 'dashboard:{namespace}:{restaurant_id}:v{version}:{variant}'
+COUNTER_KEY = 'dashboard:stats:{namespace}:{outcome}'
+
+# Dashboards served through this cache
+NAMESPACES = ('owner', 'staff', 'kitchen', 'eta')
+
+
+def _initial_version():
+    # Time-based so a version key lost to eviction never restarts at a
+    # number that older payloads were stored under.
+    return int(time.time() * 1000)
+
+
+def get_restaurant_version(restaurant_id):
+    key = VERSION_KEY.format(restaurant_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_restaurant_version(restaurant_id):
+    """Invalidate every cached dashboard payload of a restaurant"""
+    key = VERSION_KEY.format(restaurant_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), timeout=None)
+        return cache.get(key)
+
+
+def _count(namespace, outcome):
+    key = COUNTER_KEY.format(namespace=namespace, outcome=outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def cached_dashboard(namespace, restaurant_id, builder, variant='', timeout=None):
+    """
+    Return ``(payload, hit)`` for a restaurant dashboard.
+
+    ``builder`` is called on a miss and its result cached until the
+    restaurant's version changes or ``timeout`` (DASHBOARD_CACHE_TIMEOUT by
+    default) seconds pass. ``variant`` separates payloads of the same
+    version, e.g. by day.
+    """
+    key = PAYLOAD_KEY.format(
+        namespace=namespace,
+        restaurant_id=restaurant_id,
+        version=get_restaurant_version(restaurant_id),
+        variant=variant
+    )
+    payload = cache.get(key)
+    if payload is not None:
+        _count(namespace, 'hits')
+        return payload, True
+
+    _count(namespace, 'misses')
+    payload = builder()
+    cache.set(key, payload, timeout=CACHE_TIMEOUT if timeout is None else timeout)
+    return payload, False
+
+
+def get_cache_stats():
+    """Hit/miss counters and hit ratio per dashboard namespace"""
+    keys = [
+        COUNTER_KEY.format(namespace=namespace, outcome=outcome)
+        for namespace in NAMESPACES for outcome in ('hits', 'misses')
+    ]
+    counters = cache.get_many(keys)
+
+    stats = {}
+    for namespace in NAMESPACES:
+        hits = counters.get(COUNTER_KEY.format(namespace=namespace, outcome='hits'), 0)
+        misses = counters.get(COUNTER_KEY.format(namespace=namespace, outcome='misses'), 0)
+        total = hits + misses
+        stats[namespace] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else 0.0
+        }
+    return stats
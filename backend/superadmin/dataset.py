@@ -0,0 +1,482 @@
+"""
+Synthetic, production-shaped datasets for load and query-plan testing.
+
+Every restaurant is generated from its own ``random.Random(seed, index)``
+stream and all timestamps are relative to one ``as_of`` moment, so a
+dataset generated with the same seed and as_of is identical whatever the
+number of worker processes or the day it is generated on. Platform rows
+(the administrator login and the vendors) come from one more stream.
+Rows are written with ``bulk_create`` in batches and carry
+historical timestamps; model ``save()`` hooks and signals do not run, so
+business dates are filled in here and rollups are rebuilt afterwards by
+the ``generate_dataset`` command.
+"""
+import random
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from .models import (
+    Chair, Customer, Employee, Expense, InventoryCategory, InventoryItem, KitchenStation, MenuCategory,
+    MenuItem, Notification, Order, OrderItem, OrderItemTransition, Restaurant, Staff, Table, User, Vendor,
+    WasteEntry
+)
+
+
+# Scale tiers: restaurant count, days of history, orders per restaurant per day and vendors
+TIERS = {
+    'small': {'restaurants': 10, 'days': 30, 'orders_per_day': 20, 'vendors': 20},
+    'medium': {'restaurants': 1000, 'days': 60, 'orders_per_day': 20, 'vendors': 500},
+    'large': {'restaurants': 10000, 'days': 60, 'orders_per_day': 25, 'vendors': 2000},
+}
+
+# Password of every generated login
+DEFAULT_PASSWORD = 'password123'
+
+TIMEZONES = ['UTC', 'Asia/Kathmandu', 'Asia/Kolkata', 'Europe/London', 'America/New_York']
+
+STAFF_ROLES = ['owner', 'manager', 'kitchen', 'kitchen', 'staff', 'staff', 'staff', 'waiter']
+LOGIN_ROLES = {'owner', 'manager', 'kitchen', 'staff'}
+
+MENU = {
+    'Starters': ['Momo', 'Spring Roll', 'Garlic Bread', 'Soup of the Day', 'Chicken Wings', 'Bruschetta'],
+    'Mains': ['Dal Bhat', 'Butter Chicken', 'Margherita Pizza', 'Burger', 'Fish Curry', 'Pad Thai',
+              'Lasagna', 'Biryani'],
+    'Desserts': ['Brownie', 'Cheesecake', 'Ice Cream', 'Kheer', 'Tiramisu'],
+    'Drinks': ['Masala Tea', 'Coffee', 'Lemonade', 'Lassi', 'Soda', 'Mojito'],
+}
+
+# Kitchen station (name, type) each menu category is routed to
+STATIONS = {
+    'Starters': ('Fryer', 'fry'),
+    'Mains': ('Grill', 'grill'),
+    'Desserts': ('Cold Kitchen', 'cold'),
+    'Drinks': ('Bar', 'bar'),
+}
+
+INVENTORY = {
+    'Produce': [('Tomatoes', 'kg'), ('Onions', 'kg'), ('Potatoes', 'kg'), ('Garlic', 'kg'), ('Lettuce', 'pcs')],
+    'Dairy': [('Milk', 'l'), ('Butter', 'kg'), ('Cheese', 'kg'), ('Yogurt', 'l'), ('Cream', 'l')],
+    'Meat': [('Chicken', 'kg'), ('Mutton', 'kg'), ('Fish', 'kg'), ('Eggs', 'dozen')],
+    'Dry Goods': [('Rice', 'kg'), ('Flour', 'kg'), ('Lentils', 'kg'), ('Sugar', 'kg'), ('Oil', 'l')],
+}
+
+EXPENSE_CATEGORIES = [choice for choice, _ in Expense.CATEGORY_CHOICES]
+WASTE_REASONS = [choice for choice, _ in WasteEntry.REASON_CHOICES]
+ORDER_TYPES = ['dine-in'] * 6 + ['takeaway'] * 2 + ['delivery'] * 2 + ['room-service']
+PAYMENT_METHODS = [choice for choice, _ in Order.PAYMENT_METHOD_CHOICES]
+VENDOR_TYPES = [choice for choice, _ in Vendor.TYPE_CHOICES]
+
+# (type, title, message) of the notifications a restaurant's managers get
+NOTIFICATIONS = [
+    ('warning', 'Low stock', '{item} is running low.'),
+    ('success', 'Daily summary', 'Sales for {day} are in.'),
+    ('info', 'Large order', 'A table ordered {count} dishes.'),
+    ('error', 'Payment failed', 'A card payment was declined.'),
+]
+NOTIFICATIONS_PER_DAY = 2
+
+TABLES_PER_RESTAURANT = 15
+CHAIRS_PER_TABLE = 4
+CUSTOMERS_PER_RESTAURANT = 100
+TAX_RATE = Decimal('0.13')
+SERVICE_CHARGE_RATE = Decimal('0.10')
+
+# Models whose created_at/updated_at/added_at get historical values
+TIMESTAMPED_MODELS = [Restaurant, Employee, User, Staff, KitchenStation, MenuCategory, MenuItem,
+                      InventoryCategory, InventoryItem, Table, Chair, Customer, Order, OrderItem, Expense,
+                      WasteEntry, Notification, Vendor]
+
+
+@contextmanager
+def historical_timestamps():
+    """Let bulk_create keep explicit values in auto_now/auto_now_add fields"""
+    saved = []
+    for model in TIMESTAMPED_MODELS:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _money(value):
+    return Decimal(value).quantize(Decimal('0.01'))
+
+
+def dataset_password_hash(seed):
+    """Hash of DEFAULT_PASSWORD, salted from the seed so datasets stay identical"""
+    return make_password(DEFAULT_PASSWORD, salt=f'rmsdataset{seed}')
+
+
+class RestaurantGenerator:
+    """Builds the complete history of one restaurant"""
+
+    def __init__(self, index, spec, password_hash, now):
+        self.index = index
+        self.spec = spec
+        self.password_hash = password_hash
+        self.now = now
+        self.batch_size = spec['batch_size']
+        self.rng = random.Random(f"{spec['seed']}:{index}")
+        self.tz = ZoneInfo(self.rng.choice(TIMEZONES))
+        self.today = timezone.localtime(now, self.tz).date()
+        self.first_day = self.today - timedelta(days=spec['days'] - 1)
+        self.opened_at = self._moment(self.first_day - timedelta(days=self.rng.randint(30, 365)), 9)
+        self.counts = {}
+
+    def _moment(self, day, hour, minute=0):
+        """Aware datetime for a local wall-clock time at this restaurant"""
+        return datetime.combine(day, time(hour, minute), tzinfo=self.tz)
+
+    def _create(self, model, rows):
+        created = model.objects.bulk_create(rows, batch_size=self.batch_size)
+        self.counts[model._meta.model_name] = self.counts.get(model._meta.model_name, 0) + len(created)
+        return created
+
+    def _insert(self, model, field_names, rows):
+        """
+        Insert value tuples with executemany, for rows nothing reads back.
+
+        Skips building model instances and preparing every value through
+        its field, which is most of bulk_create's cost on the largest
+        tables; only datetimes need adapting for the database.
+        """
+        fields = [model._meta.get_field(name) for name in field_names]
+        adapt = [
+            connection.ops.adapt_datetimefield_value if isinstance(field, models.DateTimeField) else None
+            for field in fields
+        ]
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            connection.ops.quote_name(model._meta.db_table),
+            ', '.join(connection.ops.quote_name(field.column) for field in fields),
+            ', '.join(['%s'] * len(fields)),
+        )
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), self.batch_size):
+                cursor.executemany(sql, [
+                    tuple(value if prepare is None else prepare(value) for prepare, value in zip(adapt, row))
+                    for row in rows[start:start + self.batch_size]
+                ])
+        self.counts[model._meta.model_name] = self.counts.get(model._meta.model_name, 0) + len(rows)
+
+    def generate(self):
+        prefix = self.spec['prefix']
+        self.restaurant = self._create(Restaurant, [Restaurant(
+            name=f'Restaurant {self.index}',
+            email=f'{prefix}-restaurant-{self.index}@example.com',
+            address=f'{self.rng.randint(1, 999)} Market Street, Block {self.index}',
+            phone=f'98{self.index:08d}',
+            timezone=str(self.tz),
+            created_at=self.opened_at,
+        )])[0]
+        self._people()
+        self._menu()
+        self._inventory()
+        self._floor()
+        self._customers()
+        self._orders()
+        self._expenses_and_waste()
+        self._notifications()
+        return self.counts
+
+    def _people(self):
+        prefix = self.spec['prefix']
+        employees = [
+            Employee(
+                name=f'{role.title()} {self.index}-{number}',
+                email=f'{prefix}-{role}-{self.index}-{number}@example.com',
+                phone=f'97{self.index:06d}{number:02d}',
+                role=role,
+                password=self.password_hash,
+                created_at=self.opened_at,
+            )
+            for number, role in enumerate(STAFF_ROLES)
+        ]
+        self.employees = self._create(Employee, employees)
+        self._create(Employee.restaurants.through, [
+            Employee.restaurants.through(employee_id=employee.pk, restaurant_id=self.restaurant.pk)
+            for employee in self.employees
+        ])
+        self._create(User, [
+            User(email=employee.email, name=employee.name, role=employee.role, password=self.password_hash,
+                 created_at=self.opened_at, updated_at=self.opened_at)
+            for employee in self.employees if employee.role in LOGIN_ROLES
+        ])
+        self._create(Staff, [
+            Staff(employee=employee, salary=_money(self.rng.randint(15000, 60000)),
+                  status=self.rng.choice(['active'] * 9 + ['on-leave']),
+                  shift=self.rng.choice(['morning', 'afternoon', 'night']),
+                  hire_date=self.opened_at.date(), created_at=self.opened_at, updated_at=self.opened_at)
+            for employee in self.employees if employee.role != 'owner'
+        ])
+        self.waiters = [employee for employee in self.employees if employee.role in ('staff', 'waiter')]
+        self.managers = [employee for employee in self.employees if employee.role in ('owner', 'manager')]
+
+    def _menu(self):
+        stations = self._create(KitchenStation, [
+            KitchenStation(name=name, type=station_type, restaurant=self.restaurant, display_order=order,
+                           created_at=self.opened_at, updated_at=self.opened_at)
+            for order, (name, station_type) in enumerate(STATIONS.values())
+        ])
+        categories = self._create(MenuCategory, [
+            MenuCategory(name=name, restaurant=self.restaurant, display_order=order, station=station,
+                         created_at=self.opened_at, updated_at=self.opened_at)
+            for order, (name, station) in enumerate(zip(MENU, stations))
+        ])
+        self.menu_items = self._create(MenuItem, [
+            MenuItem(name=item, category=category, restaurant=self.restaurant,
+                     price=_money(self.rng.randint(120, 1500)),
+                     preparation_time=self.rng.randint(5, 30),
+                     created_at=self.opened_at, updated_at=self.opened_at)
+            for category in categories for item in MENU[category.name]
+        ])
+        # A few dishes sell far more than the rest
+        self.menu_weights = [self.rng.paretovariate(1.5) for _ in self.menu_items]
+
+    def _inventory(self):
+        categories = self._create(InventoryCategory, [
+            InventoryCategory(name=name, restaurant=self.restaurant, created_at=self.opened_at)
+            for name in INVENTORY
+        ])
+        items = []
+        for category in categories:
+            for name, unit in INVENTORY[category.name]:
+                min_stock = self.rng.randint(5, 20)
+                current = self.rng.choice([0, self.rng.randint(1, min_stock), self.rng.randint(min_stock + 1, 100)])
+                status = 'out-of-stock' if current == 0 else 'low-stock' if current <= min_stock else 'in-stock'
+                items.append(InventoryItem(
+                    name=name, category=category, restaurant=self.restaurant, unit=unit,
+                    current_stock=_money(current), min_stock=_money(min_stock), max_stock=_money(min_stock * 6),
+                    cost_per_unit=_money(self.rng.randint(20, 900)), status=status,
+                    created_at=self.opened_at, updated_at=self.now,
+                ))
+        self._create(InventoryItem, items)
+
+    def _floor(self):
+        self.tables = self._create(Table, [
+            Table(number=str(number), restaurant=self.restaurant, capacity=CHAIRS_PER_TABLE,
+                  section=self.rng.choice(['Main', 'Patio', 'Upstairs']),
+                  waiter_assigned=self.rng.choice(self.waiters),
+                  position_x=float((number - 1) % 5 * 120), position_y=float((number - 1) // 5 * 120),
+                  created_at=self.opened_at, updated_at=self.now)
+            for number in range(1, TABLES_PER_RESTAURANT + 1)
+        ])
+        self._create(Chair, [
+            Chair(number=str(number), table=table, created_at=self.opened_at, updated_at=self.now)
+            for table in self.tables for number in range(1, CHAIRS_PER_TABLE + 1)
+        ])
+
+    def _customers(self):
+        customers = []
+        for number in range(CUSTOMERS_PER_RESTAURANT):
+            day = self.first_day + timedelta(days=self.rng.randrange(self.spec['days']))
+            created_at = self._moment(day, self.rng.randint(10, 21), self.rng.randrange(60))
+            customers.append(Customer(
+                name=f'Customer {self.index}-{number}',
+                phone=f'96{self.index:05d}{number:03d}',
+                restaurant=self.restaurant,
+                membership_tier=self.rng.choice(['bronze'] * 6 + ['silver'] * 3 + ['gold']),
+                business_date=day, created_at=created_at, updated_at=created_at,
+            ))
+        self.customers = self._create(Customer, customers)
+
+    def _orders(self):
+        orders, order_lines = [], []
+        for offset in range(self.spec['days']):
+            day = self.first_day + timedelta(days=offset)
+            is_today = day == self.today
+            # Weekends are busier; every day varies a little
+            volume = self.spec['orders_per_day'] * (1.3 if day.weekday() >= 5 else 1.0)
+            for _ in range(max(0, round(self.rng.gauss(volume, volume * 0.15)))):
+                created_at = self._moment(day, self.rng.choice([12, 13, 13, 14, 19, 20, 20, 21]),
+                                          self.rng.randrange(60))
+                if is_today and created_at > self.now:
+                    continue
+                order, lines = self._order(day, created_at, is_today)
+                orders.append(order)
+                order_lines.append(lines)
+                if len(orders) >= self.batch_size:
+                    self._flush_orders(orders, order_lines)
+                    orders, order_lines = [], []
+        self._flush_orders(orders, order_lines)
+
+    def _order(self, day, created_at, is_today):
+        order_type = self.rng.choice(ORDER_TYPES)
+        if is_today and created_at > self.now - timedelta(hours=2):
+            status = self.rng.choice(['active'] * 4 + ['payment-pending'])
+        else:
+            status = self.rng.choices(['completed', 'cancelled'], weights=[95, 5])[0]
+
+        lines = []
+        for menu_item in self.rng.choices(self.menu_items, weights=self.menu_weights, k=self.rng.randint(1, 5)):
+            if status == 'active':
+                item_status = self.rng.choice(['pending', 'preparing', 'ready', 'served'])
+            else:
+                item_status = 'served'
+            added_at = created_at + timedelta(minutes=self.rng.randint(0, 5))
+            line = OrderItem(
+                menu_item=menu_item, quantity=self.rng.choices([1, 2, 3], weights=[75, 20, 5])[0],
+                unit_price=menu_item.price, status=item_status, added_at=added_at, updated_at=added_at,
+                station_id=menu_item.routed_station_id,
+            )
+            line.history = self._item_history(line, menu_item)
+            lines.append(line)
+
+        subtotal = sum(line.quantity * line.unit_price for line in lines)
+        tax = _money(subtotal * TAX_RATE)
+        service_charge = _money(subtotal * SERVICE_CHARGE_RATE) if order_type == 'dine-in' else Decimal('0.00')
+        discount = _money(subtotal * Decimal('0.1')) if self.rng.random() < 0.1 else Decimal('0.00')
+        order = Order(
+            restaurant=self.restaurant,
+            table=self.rng.choice(self.tables) if order_type == 'dine-in' else None,
+            customer=self.rng.choice(self.customers) if self.rng.random() < 0.4 else None,
+            status=status, order_type=order_type,
+            subtotal=subtotal, tax=tax, service_charge=service_charge, discount=discount,
+            total=subtotal + tax + service_charge - discount,
+            payment_method=self.rng.choice(PAYMENT_METHODS) if status == 'completed' else '',
+            waiter_assigned=self.rng.choice(self.waiters),
+            business_date=day, created_at=created_at,
+            updated_at=created_at + timedelta(minutes=self.rng.randint(20, 90)),
+        )
+        return order, lines
+
+    def _item_history(self, line, menu_item):
+        """Stamp the status timestamps of a generated item; returns its transitions"""
+        started_at = line.added_at + timedelta(minutes=self.rng.randint(0, 8))
+        ready_at = started_at + timedelta(minutes=max(1, round(self.rng.gauss(menu_item.preparation_time, 4))))
+        served_at = ready_at + timedelta(minutes=self.rng.randint(1, 4))
+        steps = [('pending', 'preparing', started_at), ('preparing', 'ready', ready_at), ('ready', 'served', served_at)]
+        reached = ['pending', 'preparing', 'ready', 'served'].index(line.status)
+        history = []
+        for from_status, to_status, at in steps[:reached]:
+            at = min(at, self.now)
+            setattr(line, OrderItem.STATUS_TIMESTAMPS[to_status], at)
+            line.updated_at = at
+            history.append((from_status, to_status, at))
+        return history
+
+    def _flush_orders(self, orders, order_lines):
+        if not orders:
+            return
+        created = self._create(Order, orders)
+        items = []
+        for order, lines in zip(created, order_lines):
+            for line in lines:
+                line.order = order
+                items.append(line)
+        items = self._create(OrderItem, items)
+        self._insert(OrderItemTransition, ('item', 'from_status', 'to_status', 'at'), [
+            (item.pk, from_status, to_status, at)
+            for item in items
+            for from_status, to_status, at in item.history
+        ])
+
+    def _expenses_and_waste(self):
+        expenses, waste = [], []
+        for offset in range(self.spec['days']):
+            day = self.first_day + timedelta(days=offset)
+            created_at = self._moment(day, 18)
+            if self.rng.random() < 0.35:
+                expenses.append(Expense(
+                    description=f'{self.rng.choice(EXPENSE_CATEGORIES).title()} expense',
+                    amount=_money(self.rng.randint(500, 25000)),
+                    category=self.rng.choice(EXPENSE_CATEGORIES), restaurant=self.restaurant, date=day,
+                    payment_method=self.rng.choice(['cash', 'card', 'bank-transfer']),
+                    approved=self.rng.random() < 0.8, added_by=self.rng.choice(self.managers),
+                    created_at=created_at,
+                ))
+            if self.rng.random() < 0.5:
+                name, unit = self.rng.choice(self.rng.choice(list(INVENTORY.values())))
+                waste.append(WasteEntry(
+                    item_name=name, quantity=_money(self.rng.uniform(0.2, 5)), unit=unit,
+                    reason=self.rng.choice(WASTE_REASONS), estimated_cost=_money(self.rng.randint(50, 3000)),
+                    restaurant=self.restaurant, date=day, reported_by=self.rng.choice(self.employees),
+                    created_at=created_at,
+                ))
+        self._create(Expense, expenses)
+        self._create(WasteEntry, waste)
+
+    def _notifications(self):
+        notifications = []
+        for offset in range(self.spec['days']):
+            day = self.first_day + timedelta(days=offset)
+            for _ in range(NOTIFICATIONS_PER_DAY):
+                created_at = self._moment(day, self.rng.randint(9, 22), self.rng.randrange(60))
+                if created_at > self.now:
+                    continue
+                kind, title, message = self.rng.choice(NOTIFICATIONS)
+                notifications.append(Notification(
+                    title=title, type=kind, restaurant=self.restaurant, user=self.rng.choice(self.managers),
+                    message=message.format(item=self.rng.choice(INVENTORY['Produce'])[0], day=day,
+                                           count=self.rng.randint(8, 20)),
+                    # Older notifications have mostly been read
+                    read=day < self.today - timedelta(days=1) and self.rng.random() < 0.9,
+                    created_at=created_at,
+                ))
+        self._create(Notification, notifications)
+
+
+def generate_platform(spec, password_hash, now):
+    """
+    The administrator login and the vendors of a dataset.
+
+    The administrator is ``{prefix}-admin@example.com``. Returns row
+    counts per model name.
+    """
+    rng = random.Random(f"{spec['seed']}:platform")
+    prefix = spec['prefix']
+    created_at = now - timedelta(days=spec['days'] + 365)
+    email = f'{prefix}-admin@example.com'
+    counts = {}
+    with historical_timestamps(), transaction.atomic():
+        Employee.objects.create(name='Platform Admin', email=email, role='admin', password=password_hash,
+                                created_at=created_at)
+        User.objects.bulk_create([User(
+            email=email, name='Platform Admin', role='admin', password=password_hash, status='active',
+            is_staff=True, is_superuser=True, created_at=created_at, updated_at=created_at,
+        )])
+        vendors = []
+        for number in range(1, spec['vendors'] + 1):
+            joined = now - timedelta(days=rng.randint(1, spec['days'] + 365))
+            vendors.append(Vendor(
+                name=f'Vendor {number}', type=rng.choice(VENDOR_TYPES),
+                email=f'{prefix}-vendor-{number}@example.com', phone=f'95{number:08d}',
+                address=f'{rng.randint(1, 999)} Supply Road, Block {number}',
+                status=rng.choice(['active'] * 7 + ['inactive', 'pending-approval', 'pending-approval']),
+                rating=_money(rng.uniform(2.5, 5)), total_orders=rng.randint(0, 2000),
+                revenue=_money(rng.randint(0, 5_000_000)), commission=_money(rng.choice([5, 7.5, 10, 12.5])),
+                delivery_radius=rng.choice([None, 5, 10, 20]),
+                minimum_order=rng.choice([None, _money(500), _money(1000)]),
+                created_at=joined, updated_at=joined,
+            ))
+        counts['vendor'] = len(Vendor.objects.bulk_create(vendors, batch_size=spec['batch_size']))
+    counts.update(employee=1, user=1)
+    return counts
+
+
+def generate_restaurants(spec, indexes, password_hash=None, now=None):
+    """
+    Generate the restaurants with the given indexes, one transaction each.
+
+    Returns row counts per model name.
+    """
+    password_hash = password_hash or dataset_password_hash(spec['seed'])
+    now = now or timezone.now()
+    totals = {}
+    with historical_timestamps():
+        for index in indexes:
+            with transaction.atomic():
+                counts = RestaurantGenerator(index, spec, password_hash, now).generate()
+            for name, count in counts.items():
+                totals[name] = totals.get(name, 0) + count
+    return totals
@@ -0,0 +1,168 @@
+"""
+Background system-health sampling.
+
+A daemon thread samples CPU, memory, disk and database connectivity every
+SYSTEM_HEALTH_SAMPLE_INTERVAL seconds and appends the result to a ring
+buffer of SYSTEM_HEALTH_HISTORY_SIZE slots in the shared cache. Request
+handlers only read the buffer, so they never block on psutil.
+"""
+import logging
+import os
+import threading
+import time
+
+import psutil
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL = getattr(settings, 'SYSTEM_HEALTH_SAMPLE_INTERVAL', 5)
+HISTORY_SIZE = getattr(settings, 'SYSTEM_HEALTH_HISTORY_SIZE', 120)
+
+HEAD_KEY = 'system_health:head'
+SLOT_KEY = 'system_health:slot:{}'
+LEASE_KEY = 'system_health:lease'
+
+
+def health_score(cpu_usage, memory_usage, disk_usage, database_ok):
+    """Score out of 100, docked for each resource under pressure"""
+    score = 100
+    if cpu_usage > 80:
+        score -= 10
+    if memory_usage > 80:
+        score -= 10
+    if disk_usage > 90:
+        score -= 10
+    if not database_ok:
+        score -= 30
+    return max(0, min(score, 100))
+
+
+def format_change(current, previous):
+    """Signed percentage-point change, e.g. '+10%', '-5%' or '0%'"""
+    if previous is None:
+        return "0%"
+    change = current - previous
+    return f"{'+' if change > 0 else ''}{change}%" if change != 0 else "0%"
+
+
+def _probe_database():
+    started = time.perf_counter()
+    try:
+        with connections['default'].cursor() as cursor:
+            cursor.execute('SELECT 1')
+        return True, round((time.perf_counter() - started) * 1000, 2)
+    except DatabaseError:
+        return False, None
+
+
+def take_sample():
+    """Probe the host and database once without blocking on CPU measurement"""
+    cpu_usage = psutil.cpu_percent(interval=None)
+    memory_usage = psutil.virtual_memory().percent
+    disk_usage = psutil.disk_usage('/').percent
+    database_ok, database_latency_ms = _probe_database()
+
+    return {
+        'timestamp': timezone.now().isoformat(),
+        'score': health_score(cpu_usage, memory_usage, disk_usage, database_ok),
+        'cpu_usage': cpu_usage,
+        'memory_usage': memory_usage,
+        'disk_usage': disk_usage,
+        'database_ok': database_ok,
+        'database_latency_ms': database_latency_ms,
+    }
+
+
+def record_sample(sample):
+    """Append a sample to the ring buffer, overwriting the oldest slot"""
+    try:
+        head = cache.incr(HEAD_KEY)
+    except ValueError:
+        cache.add(HEAD_KEY, 0, timeout=None)
+        head = cache.incr(HEAD_KEY)
+    cache.set(SLOT_KEY.format(head % HISTORY_SIZE), sample, timeout=None)
+    return head
+
+
+def get_history(limit=HISTORY_SIZE):
+    """Up to ``limit`` most recent samples, oldest first"""
+    head = cache.get(HEAD_KEY)
+    if not head:
+        return []
+    limit = max(1, min(limit, HISTORY_SIZE, head))
+    keys = [SLOT_KEY.format(index % HISTORY_SIZE) for index in range(head - limit + 1, head + 1)]
+    samples = cache.get_many(keys)
+    return [samples[key] for key in keys if key in samples]
+
+
+def get_latest_sample():
+    """
+    The most recent sample.
+
+    Starts this process's sampler on first use; if the buffer is still
+    empty, records one sample inline so callers always get a value.
+    """
+    ensure_sampler_running()
+    history = get_history(1)
+    if history:
+        return history[-1]
+    sample = take_sample()
+    record_sample(sample)
+    return sample
+
+
+def get_rolling_average(window=HISTORY_SIZE):
+    """Mean score over the last ``window`` samples, or None without history"""
+    history = get_history(window)
+    if not history:
+        return None
+    return round(sum(sample['score'] for sample in history) / len(history), 1)
+
+
+class HealthSampler(threading.Thread):
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(name='system-health-sampler', daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        # The first non-blocking cpu_percent() call only primes the counter
+        psutil.cpu_percent(interval=None)
+        while not self._stop_event.wait(self.interval):
+            # Several worker processes may run a sampler; the lease lets only
+            # one of them write per interval.
+            if not cache.add(LEASE_KEY, os.getpid(), timeout=max(self.interval - 0.5, 0.5)):
+                continue
+            try:
+                record_sample(take_sample())
+            except Exception:
+                # Keep sampling; a failed probe must not kill the thread
+                logger.exception('System health sample failed')
+            finally:
+                connections.close_all()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_sampler = None
+_sampler_pid = None
+_sampler_lock = threading.Lock()
+
+
+def ensure_sampler_running():
+    """Start the sampler thread once per process"""
+    global _sampler, _sampler_pid
+    if _sampler is not None and _sampler_pid == os.getpid() and _sampler.is_alive():
+        return _sampler
+    with _sampler_lock:
+        if _sampler is None or _sampler_pid != os.getpid() or not _sampler.is_alive():
+            _sampler = HealthSampler()
+            _sampler_pid = os.getpid()
+            _sampler.start()
+    return _sampler
@@ -0,0 +1,134 @@
+"""
+Idempotency-Key support for POST endpoints.
+
+A client that may retry (tablets on flaky Wi-Fi) sends the same
+``Idempotency-Key`` header with every attempt. The first attempt runs the
+view and stores its response; later attempts with the same key and body
+get the stored response back without running the view again. Keys expire
+after IDEMPOTENCY_KEY_TTL seconds and expired rows are purged lazily, at
+most once per IDEMPOTENCY_PURGE_INTERVAL across all processes.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import IdempotencyKey
+
+
+KEY_TTL = getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 3600)
+PURGE_INTERVAL = getattr(settings, 'IDEMPOTENCY_PURGE_INTERVAL', 3600)
+# Seconds after which an attempt that never stored a response (its worker
+# died) stops blocking retries
+LOCK_TIMEOUT = getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 60)
+
+HEADER = 'Idempotency-Key'
+REPLAY_HEADER = 'Idempotent-Replayed'
+PURGE_LEASE_KEY = 'idempotency:purge_lease'
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def purge_expired_keys(now=None):
+    """Delete expired keys; returns the number removed"""
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
+
+
+def _maybe_purge(now):
+    # Only one process per interval pays for the DELETE
+    if cache.add(PURGE_LEASE_KEY, 1, timeout=PURGE_INTERVAL):
+        purge_expired_keys(now)
+
+
+def _claim(scope, key, fingerprint, now):
+    """
+    Return ``(record, created)`` for a key.
+
+    A new placeholder row is inserted when the key is unknown, expired or
+    held by an attempt that was abandoned.
+    """
+    record = IdempotencyKey.objects.filter(scope=scope, key=key).first()
+    abandoned = (
+        record is not None and record.status_code is None
+        and record.created_at <= now - timedelta(seconds=LOCK_TIMEOUT)
+    )
+    if record is not None and record.expires_at > now and not abandoned:
+        return record, False
+    if record is not None:
+        record.delete()
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                scope=scope, key=key, request_hash=fingerprint, expires_at=now + timedelta(seconds=KEY_TTL)
+            ), True
+    except IntegrityError:
+        # A concurrent attempt with the same key got there first
+        return IdempotencyKey.objects.filter(scope=scope, key=key).first(), False
+
+
+def idempotent(view):
+    """
+    Make a DRF function view replay-safe under an Idempotency-Key header.
+
+    Apply it below ``@api_view`` and ``@permission_classes``, so the
+    request is authenticated before a key is looked up. Requests without
+    the header run as usual. Server errors are not stored, so a retry after
+    a 5xx runs the view again.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({
+                'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        _maybe_purge(now)
+        scope = str(getattr(request.user, 'email', '') or request.user.pk)
+        fingerprint = request_fingerprint(request)
+        record, created = _claim(scope, key, fingerprint, now)
+
+        if not created:
+            if record is not None and record.request_hash != fingerprint:
+                return Response({
+                    'error': f'{HEADER} was already used for a different request'
+                }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            if record is None or record.status_code is None:
+                return Response({
+                    'error': 'A request with this Idempotency-Key is still being processed'
+                }, status=status.HTTP_409_CONFLICT)
+            return Response(record.response_body, status=record.status_code, headers={REPLAY_HEADER: 'true'})
+
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        if response.status_code >= 500:
+            record.delete()
+        else:
+            # Stored as DRF renders it, so a replay matches the first response
+            body = json.loads(json.dumps(response.data, cls=JSONEncoder))
+            IdempotencyKey.objects.filter(pk=record.pk).update(
+                status_code=response.status_code, response_body=body
+            )
+        return response
+
+    return wrapper
@@ -0,0 +1,144 @@
+"""
+Per-request measurements: SQL queries, duplicate queries and serializer time.
+
+A ``RequestProfile`` is active for the duration of one sampled request (see
+``superadmin.middleware.RequestInstrumentationMiddleware``). Queries are
+recorded by one execute wrapper installed on every database connection,
+which hands them to the recorders active in the current context. Context
+variables follow a request into the worker threads async views and
+middleware run their ORM calls in, so async requests are measured too.
+Serializer time is collected by ``TimedSerializerMixin``, which the
+project's serializers include. Both cost a context-variable lookup when
+nothing is being measured.
+"""
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+_current_profile = ContextVar('request_profile', default=None)
+# Everything recording queries in this context, outermost first
+_query_recorders = ContextVar('query_recorders', default=())
+
+# Statements kept in a profile's query log
+MAX_LOGGED_QUERIES = 500
+
+
+class RequestProfile:
+    """Costs accumulated while handling one request"""
+
+    def __init__(self, log_queries=False):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_time = 0.0
+        self.statements = Counter()
+        # (sql, seconds) in execution order, when requested
+        self.query_log = [] if log_queries else None
+        self.serializer_time = 0.0
+        self._serializer_depth = 0
+
+    def record_query(self, sql, duration):
+        self.queries += 1
+        self.query_time += duration
+        self.statements[sql] += 1
+        if self.query_log is not None and len(self.query_log) < MAX_LOGGED_QUERIES:
+            self.query_log.append((sql, duration))
+
+    def duplicate_queries(self, threshold=2):
+        """(sql, count) of statements run at least ``threshold`` times, most repeated first"""
+        return [(sql, count) for sql, count in self.statements.most_common() if count >= threshold]
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+class QueryCounter(dict):
+    """``{'queries': n}``, counted while active"""
+
+    def __init__(self):
+        super().__init__(queries=0)
+
+    def record_query(self, sql, duration):
+        self['queries'] += 1
+
+
+def _record_queries(execute, sql, params, many, context):
+    recorders = _query_recorders.get()
+    if not recorders:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        # The same SQL text with different parameters is the N+1 signature
+        duration = time.perf_counter() - started
+        for recorder in recorders:
+            recorder.record_query(sql, duration)
+
+
+def _install_query_recording(connection, **kwargs):
+    if _record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_queries)
+
+
+def install_query_recording():
+    """Record queries on this thread's connections and on every connection opened from now on"""
+    connection_created.connect(_install_query_recording, dispatch_uid='superadmin.instrumentation')
+    for connection in connections.all(initialized_only=True):
+        _install_query_recording(connection)
+
+
+@contextmanager
+def recording_queries(recorder):
+    """Pass every SQL statement of the enclosed code, in any thread, to ``recorder``"""
+    install_query_recording()
+    token = _query_recorders.set(_query_recorders.get() + (recorder,))
+    try:
+        yield recorder
+    finally:
+        _query_recorders.reset(token)
+
+
+def count_queries():
+    """Count SQL statements executed on any connection"""
+    return recording_queries(QueryCounter())
+
+
+def current_profile():
+    """Profile of the request being handled, or None when it is not sampled"""
+    return _current_profile.get()
+
+
+@contextmanager
+def profile_request(log_queries=False):
+    """Collect query and serializer costs of the enclosed code"""
+    profile = RequestProfile(log_queries=log_queries)
+    token = _current_profile.set(profile)
+    try:
+        with recording_queries(profile):
+            yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+class TimedSerializerMixin:
+    """Adds the time spent representing instances to the active profile"""
+
+    def to_representation(self, instance):
+        profile = _current_profile.get()
+        if profile is None:
+            return super().to_representation(instance)
+        # Nested serializers are already covered by the outermost one
+        profile._serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            profile._serializer_depth -= 1
+            if profile._serializer_depth == 0:
+                profile.serializer_time += time.perf_counter() - started
@@ -0,0 +1,48 @@
+"""
+Fill Order.business_date and Customer.business_date from created_at
+"""
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from superadmin.business_dates import backfill_business_dates
+from superadmin.models import Customer, Order, Restaurant
+
+
+class Command(BaseCommand):
+    help = 'Backfill restaurant-local business dates in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurant', type=int, action='append', dest='restaurants',
+                            help='Restaurant id to backfill; repeat for several. Defaults to all.')
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Rows updated per statement (default: 5000)')
+        parser.add_argument('--recompute', action='store_true',
+                            help='Recompute every row, e.g. after changing a restaurant timezone, '
+                                 'and rebuild the affected daily rollups')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        restaurants = Restaurant.objects.order_by('id')
+        if options['restaurants']:
+            restaurants = restaurants.filter(id__in=options['restaurants'])
+
+        for restaurant_id, tz_name in restaurants.values_list('id', 'timezone'):
+            counts = {
+                model._meta.verbose_name_plural: backfill_business_dates(
+                    model, restaurant_id, tz_name,
+                    chunk_size=options['chunk_size'],
+                    recompute=options['recompute']
+                )
+                for model in (Order, Customer)
+            }
+            self.stdout.write(
+                f'Restaurant {restaurant_id} ({tz_name}): '
+                + ', '.join(f'{count} {name}' for name, count in counts.items())
+            )
+
+            if options['recompute'] and counts[Order._meta.verbose_name_plural]:
+                call_command('rebuild_daily_rollups', restaurants=[restaurant_id], stdout=self.stdout)
+
+        self.stdout.write(self.style.SUCCESS('Business dates backfilled.'))
@@ -0,0 +1,115 @@
+"""
+Benchmark every API endpoint and compare against a saved report.
+
+Load a dataset first (see ``generate_dataset``), then keep the JSON report
+of a known-good run as the baseline for --compare. POST endpoints run in
+transactions that are rolled back, so the dataset is left unchanged; use
+--read-only to skip them. The command fails when an endpoint exceeds its
+ENDPOINT_BUDGETS entry or, with --fail-on-regression, when the comparison
+finds a regression.
+"""
+import json
+import platform
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+from superadmin.benchmarks import DEFAULT_TOLERANCE, EndpointBenchmark, check_budgets, compare_reports
+from superadmin.models import Order, OrderItem, Restaurant
+
+
+class Command(BaseCommand):
+    help = 'Measure latency, SQL queries, rows fetched and peak memory of every API endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurant', type=int,
+                            help='Restaurant to request. Defaults to the one with the most orders.')
+        parser.add_argument('--runs', type=int, default=20, help='Timed requests per endpoint (default: 20)')
+        parser.add_argument('--warmup', type=int, default=2,
+                            help='Untimed requests per endpoint before measuring (default: 2)')
+        parser.add_argument('--cold', action='store_true',
+                            help='Clear the cache before every request to measure uncached responses')
+        parser.add_argument('--read-only', action='store_true',
+                            help='Skip endpoints that write to the database')
+        parser.add_argument('--endpoint', action='append', dest='endpoints',
+                            help='Only benchmark endpoints whose name contains this text; repeat for several')
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument('--compare', help='Baseline JSON report to compare against')
+        parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                            help='Relative growth allowed before flagging a regression (default: 0.2)')
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help='Exit with an error when --compare finds a regression')
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1 or options['warmup'] < 0:
+            raise CommandError('--runs must be at least 1 and --warmup not negative')
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read baseline report: {e}")
+
+        restaurant_id = options['restaurant'] or (
+            Restaurant.objects.annotate(order_count=Count('orders'))
+            .order_by('-order_count').values_list('id', flat=True).first()
+        )
+        if restaurant_id is None:
+            raise CommandError('No restaurants found; load a dataset with generate_dataset first.')
+
+        benchmark = EndpointBenchmark(restaurant_id, runs=options['runs'], warmup=options['warmup'],
+                                      cold=options['cold'], read_only=options['read_only'])
+        results, skipped = benchmark.run(options['endpoints'])
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'environment': {
+                'database': connection.vendor,
+                'python': platform.python_version(),
+            },
+            'dataset': {
+                'restaurant_id': restaurant_id,
+                'restaurants': Restaurant.objects.count(),
+                'orders': Order.objects.count(),
+                'order_items': OrderItem.objects.count(),
+            },
+            'runs': options['runs'],
+            'cold': options['cold'],
+            'endpoints': results,
+            'skipped': skipped,
+        }
+
+        self.stdout.write(f"{'endpoint':45} {'method':6} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} "
+                          f"{'queries':>7} {'rows':>7} {'peak KB':>9}")
+        for name, result in sorted(results.items()):
+            self.stdout.write(
+                f"{name:45} {result['method']:6} {result['status']:>6} "
+                f"{result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['queries']:>7} {result['rows']:>7} {result['peak_memory_kb']:>9.1f}"
+            )
+        for name, reason in sorted(skipped.items()):
+            self.stdout.write(f'{name:45} skipped: {reason}')
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+
+        failures = check_budgets(report)
+        for violation in failures:
+            self.stderr.write(f'Budget exceeded: {violation}')
+
+        if baseline is not None:
+            regressions = compare_reports(baseline, report, tolerance=options['tolerance'])
+            for regression in regressions:
+                self.stderr.write(f'Regression: {regression}')
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
+            if options['fail_on_regression']:
+                failures += regressions
+
+        if failures:
+            raise CommandError(f'{len(failures)} endpoint benchmark check(s) failed')
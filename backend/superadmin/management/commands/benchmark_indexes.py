@@ -0,0 +1,154 @@
+"""
+EXPLAIN plans and timings of the hot dashboard filters.
+
+Run it against a database loaded with a realistic dataset. With --compare
+the dashboard indexes are dropped, the queries measured, and the indexes
+recreated, giving a before/after view on the same data. Dropping indexes
+blocks writers on most databases, so never use --compare in production.
+"""
+import json
+import statistics
+import time
+from datetime import datetime, time as dt_time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+from superadmin.models import (
+    Customer, Employee, InventoryItem, Notification, Order, OrderItem, Restaurant, Table
+)
+
+
+# (model, index name) pairs measured by --compare
+BENCHMARK_INDEXES = [
+    (Order, 'order_rest_status_created_idx'),
+    (OrderItem, 'orderitem_order_status_idx'),
+    (InventoryItem, 'inventory_rest_status_idx'),
+    (Table, 'table_rest_status_idx'),
+    (Notification, 'notification_user_unread_idx'),
+    (Customer, 'customer_rest_created_idx'),
+]
+
+
+def benchmark_queries(restaurant_id, employee_id, day_start):
+    """(label, queryset, how to evaluate it) for each dashboard filter"""
+    return [
+        ('orders_active_today', Order.objects.filter(
+            restaurant_id=restaurant_id, status='active', created_at__gte=day_start), 'count'),
+        ('kitchen_pending_items', OrderItem.objects.filter(
+            order__restaurant_id=restaurant_id, order__status='active', status='pending'), 'count'),
+        ('inventory_low_stock', InventoryItem.objects.filter(
+            restaurant_id=restaurant_id, status='low-stock'), 'count'),
+        ('tables_occupied', Table.objects.filter(
+            restaurant_id=restaurant_id, status='occupied'), 'count'),
+        ('notifications_unread', Notification.objects.filter(
+            user_id=employee_id, read=False).order_by('-created_at')[:20], 'list'),
+        ('customers_today', Customer.objects.filter(
+            restaurant_id=restaurant_id, created_at__gte=day_start), 'count'),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Show EXPLAIN plans and timings for the indexed dashboard filters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurant', type=int,
+                            help='Restaurant to query. Defaults to the one with the most orders.')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Timed runs per query (default: 5)')
+        parser.add_argument('--compare', action='store_true',
+                            help='Also measure with the dashboard indexes dropped, then recreate them')
+        parser.add_argument('--json', dest='json_path',
+                            help='Write the results to this file as JSON')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+
+        restaurant_id = options['restaurant'] or (
+            Restaurant.objects.annotate(order_count=Count('orders'))
+            .order_by('-order_count').values_list('id', flat=True).first()
+        )
+        if restaurant_id is None:
+            raise CommandError('No restaurants found; load a dataset first.')
+        employee_id = (
+            Employee.objects.annotate(notification_count=Count('notifications'))
+            .order_by('-notification_count').values_list('id', flat=True).first()
+        )
+        day_start = timezone.make_aware(datetime.combine(timezone.localdate(), dt_time.min))
+
+        self.stdout.write(
+            f'Benchmarking restaurant {restaurant_id} on {connection.vendor} '
+            f'({Order.objects.count()} orders, {OrderItem.objects.count()} order items)'
+        )
+
+        results = {}
+        if options['compare']:
+            self._drop_indexes()
+            try:
+                results['without_indexes'] = self._run(restaurant_id, employee_id, day_start, options['repeat'])
+            finally:
+                self._create_indexes()
+        results['with_indexes'] = self._run(restaurant_id, employee_id, day_start, options['repeat'])
+
+        for phase, rows in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n=== {phase.replace("_", " ")} ==='))
+            for label, row in rows.items():
+                self.stdout.write(self.style.SUCCESS(
+                    f"{label}: median {row['median_ms']} ms, min {row['min_ms']} ms"
+                ))
+                self.stdout.write(row['plan'])
+
+        if 'without_indexes' in results:
+            self.stdout.write(self.style.MIGRATE_HEADING('\n=== speedup ==='))
+            for label, row in results['with_indexes'].items():
+                before = results['without_indexes'][label]['median_ms']
+                speedup = round(before / row['median_ms'], 1) if row['median_ms'] else None
+                self.stdout.write(f'{label}: {before} ms -> {row["median_ms"]} ms ({speedup}x)')
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(f'Results written to {options["json_path"]}')
+
+    def _run(self, restaurant_id, employee_id, day_start, repeat):
+        rows = {}
+        for label, queryset, evaluation in benchmark_queries(restaurant_id, employee_id, day_start):
+            if evaluation == 'count':
+                # COUNT ignores ordering; explain the query count() actually runs
+                queryset = queryset.order_by()
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                if evaluation == 'count':
+                    queryset.count()
+                else:
+                    list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            rows[label] = {
+                'plan': queryset.explain(),
+                'median_ms': round(statistics.median(timings), 3),
+                'min_ms': round(min(timings), 3),
+            }
+        return rows
+
+    def _indexes(self):
+        for model, name in BENCHMARK_INDEXES:
+            index = next((index for index in model._meta.indexes if index.name == name), None)
+            if index is None:
+                raise CommandError(f'{model.__name__} has no index named {name}')
+            yield model, index
+
+    def _drop_indexes(self):
+        self.stdout.write(self.style.WARNING('Dropping dashboard indexes...'))
+        with connection.schema_editor() as editor:
+            for model, index in self._indexes():
+                editor.remove_index(model, index)
+
+    def _create_indexes(self):
+        self.stdout.write('Recreating dashboard indexes...')
+        with connection.schema_editor() as editor:
+            for model, index in self._indexes():
+                editor.add_index(model, index)
@@ -0,0 +1,44 @@
+"""
+Fit per-menu-item preparation time estimates from served history
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from kitchen_dashboard.prep_estimates import MIN_SAMPLES, WINDOW_DAYS, fit_restaurant
+from superadmin.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = 'Fit robust cook time estimates per menu item from the order item transition log'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurant', type=int, action='append', dest='restaurants',
+                            help='Restaurant id to fit; repeat for several. Defaults to all.')
+        parser.add_argument('--days', type=int, default=WINDOW_DAYS,
+                            help=f'Business days of history to fit on (default: {WINDOW_DAYS})')
+        parser.add_argument('--min-samples', type=int, default=MIN_SAMPLES,
+                            help=f'Fewest measured items needed for an estimate (default: {MIN_SAMPLES})')
+        parser.add_argument('--apply', action='store_true',
+                            help='Also write the recommended minutes to MenuItem.preparation_time')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+        if options['min_samples'] < 1:
+            raise CommandError('--min-samples must be at least 1')
+
+        restaurant_ids = options['restaurants'] or Restaurant.objects.order_by('id').values_list('id', flat=True)
+        fitted = applied = 0
+        for restaurant_id in restaurant_ids:
+            restaurant_fitted, restaurant_applied = fit_restaurant(
+                restaurant_id,
+                window_days=options['days'],
+                min_samples=options['min_samples'],
+                apply=options['apply']
+            )
+            fitted += restaurant_fitted
+            applied += restaurant_applied
+
+        message = f'Fitted {fitted} menu item estimates'
+        if options['apply']:
+            message += f', updated preparation_time of {applied} menu items'
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,152 @@
+"""
+Generate a synthetic, production-scale dataset
+"""
+import time
+from datetime import datetime, timezone as dt_timezone
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from superadmin.dashboard_cache import bump_restaurant_version
+from superadmin.dataset import DEFAULT_PASSWORD, TIERS, dataset_password_hash, generate_platform, generate_restaurants
+from superadmin.models import Order, Restaurant
+from superadmin.rollups import rebuild_daily_rollups
+from superadmin.stats import invalidate_platform_counters
+
+
+def _init_worker():
+    import django
+    django.setup()
+    # Never share the parent's database connections
+    connections.close_all()
+
+
+def _as_of(value):
+    """Aware datetime from an ISO 8601 datetime, or a date meaning its midnight UTC"""
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            moment = day and datetime.combine(day, datetime.min.time())
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise CommandError(f'--as-of must be an ISO 8601 date or datetime, not {value!r}')
+    return moment if timezone.is_aware(moment) else moment.replace(tzinfo=dt_timezone.utc)
+
+
+def _generate_chunk(spec, indexes, password_hash, now):
+    try:
+        return generate_restaurants(spec, indexes, password_hash, now)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Generate deterministic synthetic restaurants, menus, staff and order history at a scale tier'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tier', choices=sorted(TIERS), default='small',
+                            help='Scale tier (default: small)')
+        parser.add_argument('--restaurants', type=int, help='Override the number of restaurants')
+        parser.add_argument('--days', type=int, help='Override the days of order history')
+        parser.add_argument('--orders-per-day', type=int, help='Override the average orders per restaurant per day')
+        parser.add_argument('--vendors', type=int, help='Override the number of vendors')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+        parser.add_argument('--as-of', type=_as_of,
+                            help='Moment the history ends, as an ISO 8601 date or datetime (default: now). '
+                                 'The same seed and --as-of always generate the same data.')
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Rows per bulk insert (default: 2000)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Worker processes (default: 1). SQLite always uses one.')
+        parser.add_argument('--prefix', default='gen',
+                            help='Prefix of generated e-mail addresses; use a new one to add another dataset')
+        parser.add_argument('--skip-rollups', action='store_true',
+                            help='Do not rebuild daily rollups afterwards')
+
+    def handle(self, *args, **options):
+        spec = dict(TIERS[options['tier']])
+        for option in ('restaurants', 'days', 'orders_per_day', 'vendors'):
+            if options[option] is not None:
+                spec[option] = options[option]
+        if spec['restaurants'] < 1 or spec['days'] < 1 or spec['orders_per_day'] < 0 or spec['vendors'] < 0:
+            raise CommandError(
+                '--restaurants and --days must be at least 1, --orders-per-day and --vendors at least 0'
+            )
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        spec.update(seed=options['seed'], batch_size=options['batch_size'], prefix=options['prefix'])
+
+        if Restaurant.objects.filter(email__startswith=f"{options['prefix']}-restaurant-").exists():
+            raise CommandError(f"A dataset with prefix '{options['prefix']}' already exists; pick another --prefix")
+
+        workers = max(1, options['workers'])
+        if workers > 1 and connection.vendor == 'sqlite':
+            self.stderr.write('SQLite allows a single writer; generating with one worker.')
+            workers = 1
+
+        self.stdout.write(
+            f"Generating {spec['restaurants']} restaurants x {spec['days']} days x "
+            f"~{spec['orders_per_day']} orders/day with {workers} worker(s)..."
+        )
+        started = time.perf_counter()
+        password_hash = dataset_password_hash(spec['seed'])
+        now = options['as_of'] or timezone.now()
+        indexes = list(range(1, spec['restaurants'] + 1))
+
+        platform = generate_platform(spec, password_hash, now)
+        if workers == 1:
+            totals = generate_restaurants(spec, indexes, password_hash, now)
+        else:
+            # Every restaurant seeds its own generator, so how they are split
+            # between workers does not change the data.
+            chunk = max(1, min(100, len(indexes) // (workers * 4) or 1))
+            chunks = [indexes[i:i + chunk] for i in range(0, len(indexes), chunk)]
+            connections.close_all()
+            totals = {}
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+                futures = [executor.submit(_generate_chunk, spec, part, password_hash, now) for part in chunks]
+                for done, future in enumerate(futures, start=1):
+                    for name, count in future.result().items():
+                        totals[name] = totals.get(name, 0) + count
+                    self.stdout.write(f'  {done}/{len(chunks)} chunks written')
+
+        for name, count in platform.items():
+            totals[name] = totals.get(name, 0) + count
+        elapsed = time.perf_counter() - started
+        rows = sum(totals.values())
+        for name in sorted(totals):
+            self.stdout.write(f'  {name}: {totals[name]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Inserted {rows} rows in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/s). '
+            f'Generated logins, including the administrator {options["prefix"]}-admin@example.com, '
+            f'use the password "{DEFAULT_PASSWORD}".'
+        ))
+
+        if not options['skip_rollups']:
+            # A subquery rather than one parameter per restaurant keeps large
+            # tiers under the database's bound-parameter limit.
+            restaurant_ids = Restaurant.objects.filter(
+                email__startswith=f"{options['prefix']}-restaurant-"
+            ).values('id')
+            bounds = Order.objects.filter(restaurant_id__in=restaurant_ids).aggregate(
+                first=Min('business_date'), last=Max('business_date')
+            )
+            if bounds['first'] is None:
+                self.stdout.write('No orders to roll up.')
+            else:
+                # Restaurants east of the server may already be on tomorrow
+                end = max(bounds['last'], timezone.localdate())
+                written = rebuild_daily_rollups(bounds['first'], end, restaurant_ids=restaurant_ids)
+                # bulk_create skips signals, so drop cached dashboards explicitly
+                for restaurant_id in restaurant_ids.values_list('id', flat=True):
+                    bump_restaurant_version(restaurant_id)
+                self.stdout.write(self.style.SUCCESS(
+                    f"Rebuilt {written} daily rollup rows for {bounds['first'].isoformat()} to {end.isoformat()}"
+                ))
+        invalidate_platform_counters()
@@ -0,0 +1,65 @@
+"""
+Rebuild RestaurantDailyRollup rows from Order history
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from superadmin.dashboard_cache import bump_restaurant_version
+from superadmin.models import Order, Restaurant
+from superadmin.rollups import rebuild_daily_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-restaurant daily sales rollups in chunks of days'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First business day to rebuild (YYYY-MM-DD). Defaults to the oldest order.')
+        parser.add_argument('--end', help='Last business day to rebuild (YYYY-MM-DD). Defaults to today or the newest order.')
+        parser.add_argument('--restaurant', type=int, action='append', dest='restaurants',
+                            help='Restaurant id to rebuild; repeat for several. Defaults to all.')
+        parser.add_argument('--chunk-days', type=int, default=31,
+                            help='Number of days aggregated per query (default: 31)')
+
+    def handle(self, *args, **options):
+        if options['chunk_days'] < 1:
+            raise CommandError('--chunk-days must be at least 1')
+
+        orders = Order.objects.all()
+        if options['restaurants']:
+            orders = orders.filter(restaurant_id__in=options['restaurants'])
+        bounds = orders.aggregate(first=Min('business_date'), last=Max('business_date'))
+
+        try:
+            start = date.fromisoformat(options['start']) if options['start'] else None
+            end = date.fromisoformat(options['end']) if options['end'] else None
+        except ValueError as e:
+            raise CommandError(f'Invalid date: {e}')
+
+        if start is None:
+            if bounds['first'] is None:
+                self.stdout.write('No orders to roll up.')
+                return
+            start = bounds['first']
+        if end is None:
+            # Restaurants east of the server may already be on tomorrow
+            end = max(filter(None, (bounds['last'], timezone.localdate())))
+        if start > end:
+            raise CommandError('--start must not be after --end')
+
+        written = rebuild_daily_rollups(
+            start, end,
+            restaurant_ids=options['restaurants'],
+            chunk_days=options['chunk_days']
+        )
+
+        # bulk_create skips signals, so drop cached dashboards explicitly
+        restaurant_ids = options['restaurants'] or Restaurant.objects.values_list('id', flat=True)
+        for restaurant_id in restaurant_ids:
+            bump_restaurant_version(restaurant_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {written} daily rollup rows for {start.isoformat()} to {end.isoformat()}'
+        ))
@@ -0,0 +1,25 @@
+"""
+Write today's DailyStats snapshot and backfill missing days
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from superadmin.snapshots import backfill_daily_stats, store_daily_stats
+
+
+class Command(BaseCommand):
+    help = "Snapshot today's platform statistics; schedule it (e.g. hourly cron) instead of writing on reads"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backfill-days', type=int, default=7,
+                            help='Also create missing rows for this many past days from created_at history (default: 7, 0 to skip)')
+
+    def handle(self, *args, **options):
+        if options['backfill_days'] < 0:
+            raise CommandError('--backfill-days must not be negative')
+
+        if options['backfill_days']:
+            created = backfill_daily_stats(days=options['backfill_days'])
+            self.stdout.write(f'Backfilled {created} missing day(s)')
+
+        stats = store_daily_stats()
+        self.stdout.write(self.style.SUCCESS(f'Stored {stats}'))
@@ -0,0 +1,314 @@
+"""
+Request metrics in the Prometheus text format.
+
+Each server process counts requests, errors, latency and SQL queries per
+resolved view name in memory and writes them to its own JSON file in
+METRICS_DIR at most every METRICS_FLUSH_INTERVAL seconds. The /metrics
+endpoint sums the files of all processes, so it reports the whole server
+whichever worker answers. Like prometheus_client's multiprocess mode, the
+files of processes that have exited are folded into one aggregate file and
+deleted, so counters never go backwards and the directory holds one file
+per live process.
+
+The endpoint is off unless METRICS_ENABLED, and then answers only
+METRICS_ALLOWED_IPS and requests with ``Authorization: Bearer
+<METRICS_TOKEN>``.
+"""
+import hmac
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import psutil
+from django.conf import settings
+
+from .dashboard_cache import get_cache_stats
+
+
+logger = logging.getLogger(__name__)
+
+METRICS_DIR = getattr(settings, 'METRICS_DIR', os.path.join(tempfile.gettempdir(), 'rms-metrics'))
+FLUSH_INTERVAL = getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0)
+ENABLED = getattr(settings, 'METRICS_ENABLED', False)
+ALLOWED_IPS = frozenset(getattr(settings, 'METRICS_ALLOWED_IPS', ('127.0.0.1', '::1')))
+TOKEN = getattr(settings, 'METRICS_TOKEN', '')
+
+# Numbers of exited processes, and the lock held while folding files into it
+AGGREGATE_FILE = 'aggregate.json'
+MERGE_LOCK_FILE = 'merge.lock'
+# A merge lock older than this was left by a process that died mid-merge
+MERGE_LOCK_TIMEOUT = 60
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# name: (type, help, histogram buckets)
+METRICS = {
+    'rms_http_requests_total': ('counter', 'Requests handled, by view, method and status.', None),
+    'rms_http_errors_total': ('counter', 'Requests answered with a 5xx status, by view.', None),
+    'rms_http_request_duration_seconds': ('histogram', 'Request latency in seconds, by view.', LATENCY_BUCKETS),
+    'rms_db_queries_per_request': ('histogram', 'SQL queries executed per request, by view.', QUERY_BUCKETS),
+}
+
+
+class ProcessMetrics:
+    """Counters and histograms of this process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.path = os.path.join(METRICS_DIR, f'{self.pid}-{time.time_ns()}.json')
+        self.counters = {}
+        self.histograms = {}
+        self.last_flush = 0.0
+
+    def _check_fork(self):
+        # A forked worker must not report its parent's numbers as its own
+        if os.getpid() != self.pid:
+            self._reset()
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self._check_fork()
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self._check_fork()
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                # One slot per bucket plus +Inf, then the sum
+                histogram = self.histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    break
+            else:
+                index = len(buckets)
+            histogram[index] += 1
+            histogram[-1] += value
+
+    def flush(self, force=False):
+        """Write this process's numbers to its file if the interval has passed"""
+        now = time.monotonic()
+        with self.lock:
+            self._check_fork()
+            if not force and now - self.last_flush < FLUSH_INTERVAL:
+                return
+            self.last_flush = now
+            data = _dump(self.counters, self.histograms)
+        _write(self.path, data)
+
+
+process_metrics = ProcessMetrics()
+
+
+def record_request(view, method, status, duration, queries):
+    labels = {'view': view}
+    process_metrics.inc('rms_http_requests_total', {'view': view, 'method': method, 'status': str(status)})
+    if status >= 500:
+        process_metrics.inc('rms_http_errors_total', labels)
+    process_metrics.observe('rms_http_request_duration_seconds', labels, duration)
+    process_metrics.observe('rms_db_queries_per_request', labels, queries)
+    process_metrics.flush()
+
+
+def _dump(counters, histograms, **extra):
+    return {
+        'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [[name, list(labels), values] for (name, labels), values in histograms.items()],
+        **extra,
+    }
+
+
+def _write(path, data):
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(data, f)
+    os.replace(temporary, path)
+
+
+def _read(filename):
+    try:
+        with open(os.path.join(METRICS_DIR, filename)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _add(counters, histograms, data):
+    """Sum one file's numbers into ``counters`` and ``histograms``"""
+    for name, labels, value in data['counters']:
+        key = (name, tuple(tuple(label) for label in labels))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, values in data['histograms']:
+        key = (name, tuple(tuple(label) for label in labels))
+        if key in histograms:
+            histograms[key] = [total + value for total, value in zip(histograms[key], values)]
+        else:
+            histograms[key] = list(values)
+
+
+def _remove(filename):
+    try:
+        os.remove(os.path.join(METRICS_DIR, filename))
+    except FileNotFoundError:
+        pass
+
+
+def _process_files():
+    try:
+        names = os.listdir(METRICS_DIR)
+    except FileNotFoundError:
+        return []
+    return [name for name in names if name.endswith('.json') and name != AGGREGATE_FILE]
+
+
+def _is_dead(filename):
+    """Whether the process that wrote a '{pid}-{started_ns}.json' file has exited"""
+    try:
+        pid, started_ns = (int(part) for part in filename[:-len('.json')].split('-'))
+    except ValueError:
+        return False
+    if pid == os.getpid():
+        return False
+    try:
+        # A process created after the file was started reuses a dead one's pid
+        return psutil.Process(pid).create_time() > started_ns / 1e9 + 1
+    except psutil.NoSuchProcess:
+        return True
+    except psutil.Error:
+        return False
+
+
+def _acquire_merge_lock():
+    path = os.path.join(METRICS_DIR, MERGE_LOCK_FILE)
+    try:
+        if time.time() - os.path.getmtime(path) > MERGE_LOCK_TIMEOUT:
+            os.remove(path)
+    except OSError:
+        pass
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        return False
+    return True
+
+
+def merge_dead_processes():
+    """Fold the files of exited processes into the aggregate file and delete them"""
+    dead = [filename for filename in _process_files() if _is_dead(filename)]
+    if not dead or not _acquire_merge_lock():
+        return 0
+    try:
+        aggregate = _read(AGGREGATE_FILE) or {'counters': [], 'histograms': [], 'merged': []}
+        # Files merged by an earlier run that died before deleting them
+        merged = set(aggregate['merged'])
+        counters, histograms = {}, {}
+        _add(counters, histograms, aggregate)
+        for filename in dead:
+            data = None if filename in merged else _read(filename)
+            if data is not None:
+                _add(counters, histograms, data)
+                merged.add(filename)
+        existing = set(_process_files())
+        _write(os.path.join(METRICS_DIR, AGGREGATE_FILE),
+               _dump(counters, histograms, merged=sorted(merged & existing)))
+        for filename in merged:
+            _remove(filename)
+    except OSError:
+        logger.exception('Could not merge metrics of exited processes')
+        return 0
+    finally:
+        _remove(MERGE_LOCK_FILE)
+    return len(dead)
+
+
+def collect():
+    """Counters and histograms summed over the aggregate and every process file"""
+    process_metrics.flush(force=True)
+    merge_dead_processes()
+    counters, histograms = {}, {}
+    # The aggregate lists files it already includes that are not deleted yet
+    aggregate = _read(AGGREGATE_FILE)
+    merged = set()
+    if aggregate is not None:
+        _add(counters, histograms, aggregate)
+        merged = set(aggregate['merged'])
+    for filename in _process_files():
+        data = None if filename in merged else _read(filename)
+        if data is not None:
+            _add(counters, histograms, data)
+    return counters, histograms
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format"""
+    counters, histograms = collect()
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+            continue
+        for (metric, labels), values in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), values[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels + (("le", bound),))} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(values[-1])}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+
+    # The dashboard cache counters already live in the shared cache
+    cache_stats = get_cache_stats()
+    lines.append('# HELP rms_dashboard_cache_requests_total Dashboard cache lookups, by dashboard and outcome.')
+    lines.append('# TYPE rms_dashboard_cache_requests_total counter')
+    for namespace, stats in cache_stats.items():
+        for outcome in ('hits', 'misses'):
+            lines.append(
+                f'rms_dashboard_cache_requests_total{_labels((("namespace", namespace), ("outcome", outcome)))} '
+                f'{stats[outcome]}'
+            )
+    lines.append('# HELP rms_dashboard_cache_hit_ratio Share of dashboard cache lookups that were hits.')
+    lines.append('# TYPE rms_dashboard_cache_hit_ratio gauge')
+    for namespace, stats in cache_stats.items():
+        lines.append(f'rms_dashboard_cache_hit_ratio{_labels((("namespace", namespace),))} {stats["hit_ratio"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def scrape_allowed(request):
+    """Whether a request may read the metrics: from an allowed address or with the scrape token"""
+    if request.META.get('REMOTE_ADDR') in ALLOWED_IPS:
+        return True
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    return bool(TOKEN) and scheme.lower() == 'bearer' and hmac.compare_digest(token.encode(), TOKEN.encode())
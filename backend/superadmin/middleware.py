@@ -0,0 +1,203 @@
+"""
+Request instrumentation and metrics.
+
+Set REQUEST_INSTRUMENTATION_SAMPLE_RATE above zero to measure that fraction
+of requests. Sampled responses get a ``Server-Timing`` header and one JSON
+log line on the ``superadmin.requests`` logger with the query count, SQL
+time, repeated statements, serializer time and total latency.
+
+MetricsMiddleware feeds every request into the /metrics counters
+(METRICS_ENABLED), and SlowRequestProfilerMiddleware captures stack samples
+of slow dashboard requests (SLOW_REQUEST_PROFILING_ENABLED).
+
+All three run natively under ASGI as well as WSGI. For a streaming
+response (the kitchen stream) they measure the view up to the moment the
+response is returned, not the lifetime of the stream.
+"""
+import json
+import logging
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .instrumentation import count_queries, profile_request
+from .metrics import record_request
+from .profiling import get_sampler, save_profile, should_keep
+
+
+logger = logging.getLogger('superadmin.requests')
+
+SAMPLE_RATE = getattr(settings, 'REQUEST_INSTRUMENTATION_SAMPLE_RATE', 0.0)
+
+# A statement run this many times in one request is reported as a duplicate
+DUPLICATE_THRESHOLD = getattr(settings, 'REQUEST_INSTRUMENTATION_DUPLICATE_THRESHOLD', 3)
+
+METRICS_ENABLED = getattr(settings, 'METRICS_ENABLED', False)
+
+SLOW_REQUEST_PROFILING_ENABLED = getattr(settings, 'SLOW_REQUEST_PROFILING_ENABLED', False)
+
+# Longest SQL text included in the log line for each duplicate
+MAX_LOGGED_SQL = 300
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+class RequestInstrumentationMiddleware:
+    """Measure a sample of requests"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if SAMPLE_RATE <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if random.random() >= SAMPLE_RATE:
+            return self.get_response(request)
+
+        with profile_request() as profile:
+            response = self.get_response(request)
+        return self.report(request, response, profile)
+
+    async def __acall__(self, request):
+        if random.random() >= SAMPLE_RATE:
+            return await self.get_response(request)
+
+        with profile_request() as profile:
+            response = await self.get_response(request)
+        return self.report(request, response, profile)
+
+    def report(self, request, response, profile):
+        """Add the Server-Timing header and log the request's costs"""
+        total = profile.elapsed
+        duplicates = profile.duplicate_queries(DUPLICATE_THRESHOLD)
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={_ms(profile.query_time)};desc="{profile.queries} queries"',
+            f'dup;desc="{sum(count for _, count in duplicates)} repeated queries"',
+            f'ser;dur={_ms(profile.serializer_time)};desc="serializers"',
+            f'total;dur={_ms(total)}',
+        ])
+
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'restaurant_id': match.kwargs.get('restaurant_id') if match else None,
+            'status': response.status_code,
+            'duration_ms': _ms(total),
+            'db_queries': profile.queries,
+            'db_time_ms': _ms(profile.query_time),
+            'serializer_ms': _ms(profile.serializer_time),
+            'duplicate_queries': [
+                {'sql': sql[:MAX_LOGGED_SQL], 'count': count} for sql, count in duplicates
+            ],
+        }))
+        return response
+
+
+class MetricsMiddleware:
+    """Count requests, errors, latency and queries per resolved view"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        started = time.perf_counter()
+        with count_queries() as counter:
+            response = self.get_response(request)
+        self.record(request, response, started, counter)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with count_queries() as counter:
+            response = await self.get_response(request)
+        self.record(request, response, started, counter)
+        return response
+
+    def record(self, request, response, started, counter):
+        match = request.resolver_match
+        record_request(
+            view=match.view_name if match else 'unmatched',
+            method=request.method,
+            status=response.status_code,
+            duration=time.perf_counter() - started,
+            queries=counter['queries'],
+        )
+
+
+class SlowRequestProfilerMiddleware:
+    """Keep a stack-sampled profile of dashboard requests over the threshold"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not SLOW_REQUEST_PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        sampler = get_sampler()
+        thread_id = threading.get_ident()
+        samples = sampler.watch(thread_id)
+        started = time.perf_counter()
+        try:
+            with profile_request(log_queries=True) as query_profile:
+                response = self.get_response(request)
+        finally:
+            sampler.unwatch(thread_id)
+        self.keep_if_slow(request, response, started, samples, query_profile)
+        return response
+
+    async def __acall__(self, request):
+        # Samples the event loop thread: the request's awaits, and whatever
+        # else the loop runs meanwhile. Its ORM work is in the query log.
+        sampler = get_sampler()
+        thread_id = threading.get_ident()
+        samples = sampler.watch(thread_id)
+        started = time.perf_counter()
+        try:
+            with profile_request(log_queries=True) as query_profile:
+                response = await self.get_response(request)
+        finally:
+            sampler.unwatch(thread_id)
+        self.keep_if_slow(request, response, started, samples, query_profile)
+        return response
+
+    def keep_if_slow(self, request, response, started, samples, query_profile):
+        duration_ms = (time.perf_counter() - started) * 1000
+        if should_keep(request.resolver_match, duration_ms):
+            try:
+                save_profile(request, response, duration_ms, samples, query_profile)
+            except OSError:
+                logger.exception('Could not save slow request profile')
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:24
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superadmin', '0009_alter_employee_role'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestaurantDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('orders_total', models.IntegerField(default=0)),
+                ('orders_active', models.IntegerField(default=0)),
+                ('orders_completed', models.IntegerField(default=0)),
+                ('orders_cancelled', models.IntegerField(default=0)),
+                ('orders_payment_pending', models.IntegerField(default=0)),
+                ('dine_in_orders', models.IntegerField(default=0)),
+                ('takeaway_orders', models.IntegerField(default=0)),
+                ('delivery_orders', models.IntegerField(default=0)),
+                ('room_service_orders', models.IntegerField(default=0)),
+                ('tax', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('discount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('service_charge', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('items_sold', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='superadmin.restaurant')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'unique_together': {('restaurant', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superadmin', '0010_restaurantdailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superadmin', '0011_employee_token_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['restaurant', '-created_at', '-id'], name='order_history_keyset_idx'),
+        ),
+    ]
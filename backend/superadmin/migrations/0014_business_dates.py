@@ -0,0 +1,46 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:38
+
+import superadmin.business_dates
+from django.db import migrations, models
+
+
+def fill_business_dates(apps, schema_editor):
+    Restaurant = apps.get_model('superadmin', 'Restaurant')
+    for model_name in ('Order', 'Customer'):
+        model = apps.get_model('superadmin', model_name)
+        for restaurant_id, tz_name in Restaurant.objects.values_list('id', 'timezone'):
+            superadmin.business_dates.backfill_business_dates(model, restaurant_id, tz_name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superadmin', '0013_dashboard_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='business_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='business_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='timezone',
+            field=models.CharField(default='UTC', max_length=64, validators=[superadmin.business_dates.validate_timezone]),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['restaurant', 'business_date'], name='customer_rest_bdate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['restaurant', 'business_date'], name='order_rest_bdate_idx'),
+        ),
+        migrations.RunPython(fill_business_dates, migrations.RunPython.noop),
+    ]
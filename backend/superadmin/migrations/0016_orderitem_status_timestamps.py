@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superadmin', '0015_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='preparing_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='ready_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='served_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:56
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superadmin', '0016_orderitem_status_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderItemTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(choices=[('pending', 'Pending'), ('preparing', 'Preparing'), ('ready', 'Ready'), ('served', 'Served')], max_length=20)),
+                ('to_status', models.CharField(choices=[('pending', 'Pending'), ('preparing', 'Preparing'), ('ready', 'Ready'), ('served', 'Served')], max_length=20)),
+                ('at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transitions', to='superadmin.orderitem')),
+            ],
+            options={
+                'ordering': ['at'],
+                'indexes': [models.Index(fields=['item', 'to_status', 'at'], name='itemtransition_item_to_idx')],
+            },
+        ),
+    ]
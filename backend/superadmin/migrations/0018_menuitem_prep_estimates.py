@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-17 07:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superadmin', '0017_orderitem_transitions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuItemPrepEstimate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sample_count', models.IntegerField(help_text='Measured items in the fitting window')),
+                ('outlier_count', models.IntegerField(default=0, help_text='Samples dropped as outliers')),
+                ('median_minutes', models.FloatField()),
+                ('mad_minutes', models.FloatField(help_text='Median absolute deviation, scaled to a standard deviation')),
+                ('p90_minutes', models.FloatField()),
+                ('recommended_minutes', models.IntegerField()),
+                ('window_start', models.DateField()),
+                ('window_end', models.DateField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('menu_item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='prep_estimate', to='superadmin.menuitem')),
+            ],
+        ),
+    ]
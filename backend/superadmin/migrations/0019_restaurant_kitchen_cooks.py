@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 07:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superadmin', '0018_menuitem_prep_estimates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='kitchen_cooks',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+    ]
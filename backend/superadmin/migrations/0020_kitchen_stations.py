@@ -0,0 +1,53 @@
+# Generated by Django 5.2.3 on 2026-10-17 07:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superadmin', '0019_restaurant_kitchen_cooks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KitchenStation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('type', models.CharField(choices=[('grill', 'Grill'), ('fry', 'Fry'), ('cold', 'Cold'), ('bar', 'Bar')], max_length=20)),
+                ('display_order', models.IntegerField(default=0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kitchen_stations', to='superadmin.restaurant')),
+            ],
+            options={
+                'ordering': ['display_order', 'name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='menucategory',
+            name='station',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='menu_categories', to='superadmin.kitchenstation'),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='station',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='menu_items', to='superadmin.kitchenstation'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='station',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_items', to='superadmin.kitchenstation'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['station', 'status', 'added_at'], name='orderitem_station_queue_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='kitchenstation',
+            unique_together={('restaurant', 'name')},
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def route_existing_items(apps, schema_editor):
+    MenuItem = apps.get_model('superadmin', 'MenuItem')
+    OrderItem = apps.get_model('superadmin', 'OrderItem')
+    # Same routing as OrderItem.save(): the menu item's station, else its category's
+    menu_items = MenuItem.objects.filter(pk=OuterRef('menu_item_id'))
+    OrderItem.objects.filter(station__isnull=True).update(station_id=Coalesce(
+        Subquery(menu_items.values('station_id')[:1]),
+        Subquery(menu_items.values('category__station_id')[:1]),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superadmin', '0020_kitchen_stations'),
+    ]
+
+    operations = [
+        migrations.RunPython(route_existing_items, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 07:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superadmin', '0021_backfill_order_item_stations'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailystats',
+            name='system_health_avg',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
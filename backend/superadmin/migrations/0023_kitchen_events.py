@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-17 08:09
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superadmin', '0022_daily_stats_health_nullable'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KitchenEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kitchen_events', to='superadmin.restaurant')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+from django.db.models import Max, Min
+
+import superadmin.rollups
+
+
+def fill_daily_rollups(apps, schema_editor):
+    # Dashboards read only the rollup; fill it from the orders already placed
+    Order = apps.get_model('superadmin', 'Order')
+    bounds = Order.objects.aggregate(first=Min('business_date'), last=Max('business_date'))
+    if bounds['first'] is not None:
+        superadmin.rollups.rebuild_daily_rollups(bounds['first'], bounds['last'], apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superadmin', '0023_kitchen_events'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_daily_rollups, migrations.RunPython.noop),
+    ]
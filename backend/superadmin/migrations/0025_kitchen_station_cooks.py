@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 08:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superadmin', '0024_backfill_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kitchenstation',
+            name='cooks',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -1,9 +1,16 @@
 from django.db import models
+from django.db.models import F, Sum
+from django.db.models.signals import post_init
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.utils import timezone
 from decimal import Decimal
 
+from .business_dates import set_business_date, validate_timezone
+
 
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -157,6 +164,11 @@ class Restaurant(models.Model):
     email = models.EmailField(unique=True)
     address = models.TextField()
     phone = models.CharField(max_length=20)
+    # IANA name; decides which calendar day an order counts towards
+    timezone = models.CharField(max_length=64, default=settings.TIME_ZONE, validators=[validate_timezone])
+    # Cooks shared by the kitchen stations without cooks of their own, for
+    # order ETAs; KITCHEN_DEFAULT_COOKS when empty
+    kitchen_cooks = models.PositiveSmallIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
 
     def __str__(self):
@@ -181,6 +193,8 @@ class Employee(models.Model):
     restaurants = models.ManyToManyField(Restaurant, related_name='employees')
     password = models.CharField(max_length=128)
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
+    # Bumped to revoke access tokens carrying this employee's restaurant scope
+    token_version = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"{self.name} - {self.role}"
@@ -192,7 +206,8 @@ class DailyStats(models.Model):
     restaurant_count = models.IntegerField(default=0)
     employee_count = models.IntegerField(default=0)
     vendor_count = models.IntegerField(default=0)
-    system_health_avg = models.FloatField(default=0.0)
+    # Unknown (null) for days backfilled from created_at history
+    system_health_avg = models.FloatField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -206,6 +221,40 @@ class DailyStats(models.Model):
 
 
 # === MENU MANAGEMENT MODELS ===
+class KitchenStation(models.Model):
+    """A kitchen section with its own display that order items are routed to"""
+    TYPE_CHOICES = [
+        ('grill', 'Grill'),
+        ('fry', 'Fry'),
+        ('cold', 'Cold'),
+        ('bar', 'Bar'),
+    ]
+
+    name = models.CharField(max_length=100)
+    type = models.CharField(max_length=20, choices=TYPE_CHOICES)
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='kitchen_stations')
+    display_order = models.IntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+    # Cooks working this station in parallel, for order ETAs; when empty the
+    # station shares Restaurant.kitchen_cooks with the other stations
+    cooks = models.PositiveSmallIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['display_order', 'name']
+        unique_together = ['restaurant', 'name']
+
+    def __str__(self):
+        return f"{self.restaurant.name} - {self.name}"
+
+
+def validate_station_restaurant(station, restaurant_id):
+    """Menu entries may only route to their own restaurant's stations"""
+    if station is not None and restaurant_id is not None and station.restaurant_id != restaurant_id:
+        raise ValidationError({'station': 'Station belongs to another restaurant.'})
+
+
 class MenuCategory(models.Model):
     """Categories for menu items"""
     name = models.CharField(max_length=100)
@@ -213,6 +262,9 @@ class MenuCategory(models.Model):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='menu_categories')
     display_order = models.IntegerField(default=0)
     is_active = models.BooleanField(default=True)
+    # Default station for the category's items
+    station = models.ForeignKey(KitchenStation, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='menu_categories')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -223,6 +275,9 @@ class MenuCategory(models.Model):
     def __str__(self):
         return f"{self.restaurant.name} - {self.name}"
 
+    def clean(self):
+        validate_station_restaurant(self.station, self.restaurant_id)
+
 
 class MenuItem(models.Model):
     """Menu items for restaurants"""
@@ -240,6 +295,9 @@ class MenuItem(models.Model):
     is_vegan = models.BooleanField(default=False)
     is_gluten_free = models.BooleanField(default=False)
     tags = models.JSONField(default=list, blank=True)
+    # Overrides the category's station
+    station = models.ForeignKey(KitchenStation, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='menu_items')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -249,6 +307,31 @@ class MenuItem(models.Model):
     def __str__(self):
         return f"{self.restaurant.name} - {self.name}"
 
+    def clean(self):
+        validate_station_restaurant(self.station, self.restaurant_id)
+
+    @property
+    def routed_station_id(self):
+        """Station the item's order lines go to: its own, else its category's"""
+        return self.station_id or self.category.station_id
+
+
+class MenuItemPrepEstimate(models.Model):
+    """Cook time fitted from served history by `manage.py fit_prep_estimates`"""
+    menu_item = models.OneToOneField(MenuItem, on_delete=models.CASCADE, related_name='prep_estimate')
+    sample_count = models.IntegerField(help_text="Measured items in the fitting window")
+    outlier_count = models.IntegerField(default=0, help_text="Samples dropped as outliers")
+    median_minutes = models.FloatField()
+    mad_minutes = models.FloatField(help_text="Median absolute deviation, scaled to a standard deviation")
+    p90_minutes = models.FloatField()
+    recommended_minutes = models.IntegerField()
+    window_start = models.DateField()
+    window_end = models.DateField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.menu_item_id}: {self.recommended_minutes} min from {self.sample_count} samples"
+
 
 # === INVENTORY MANAGEMENT MODELS ===
 class InventoryCategory(models.Model):
@@ -309,6 +392,9 @@ class InventoryItem(models.Model):
     class Meta:
         ordering = ['name']
         unique_together = ['restaurant', 'name']
+        indexes = [
+            models.Index(fields=['restaurant', 'status'], name='inventory_rest_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.restaurant.name} - {self.name}"
@@ -357,6 +443,9 @@ class Table(models.Model):
     class Meta:
         ordering = ['number']
         unique_together = ['restaurant', 'number']
+        indexes = [
+            models.Index(fields=['restaurant', 'status'], name='table_rest_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.restaurant.name} - Table {self.number}"
@@ -410,18 +499,42 @@ class Customer(models.Model):
     dietary_restrictions = models.JSONField(default=list, blank=True)
     birthday = models.DateField(null=True, blank=True)
     address = models.TextField(blank=True)
+    # Restaurant-local day the customer was added; see superadmin.business_dates
+    business_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-total_spent']
+        indexes = [
+            models.Index(fields=['restaurant', 'created_at'], name='customer_rest_created_idx'),
+            models.Index(fields=['restaurant', 'business_date'], name='customer_rest_bdate_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.restaurant.name}"
 
+    def save(self, *args, **kwargs):
+        set_business_date(self, kwargs)
+        super().save(*args, **kwargs)
+
 
 # === ORDER MANAGEMENT MODELS ===
-class Order(models.Model):
+class ReloadedStateMixin:
+    """
+    Send post_init again after a full refresh_from_db().
+
+    Signal handlers compare saved values with the ones snapshotted when the
+    instance was loaded, and a reload replaces what was loaded. Partial
+    reloads (deferred field access) keep the snapshot.
+    """
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None:
+            post_init.send(sender=self.__class__, instance=self)
+
+
+class Order(ReloadedStateMixin, models.Model):
     """Orders placed by customers"""
     id = models.AutoField(primary_key=True)
     STATUS_CHOICES = [
@@ -461,23 +574,40 @@ class Order(models.Model):
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHOD_CHOICES, blank=True)
     waiter_assigned = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_orders')
     notes = models.TextField(blank=True)
+    # Restaurant-local day the order was placed; see superadmin.business_dates
+    business_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Day filters and rollups: WHERE restaurant = ? AND business_date BETWEEN ...
+            models.Index(fields=['restaurant', 'business_date'], name='order_rest_bdate_idx'),
+            # Keyset pagination of a restaurant's order history
+            models.Index(fields=['restaurant', '-created_at', '-id'], name='order_history_keyset_idx'),
+            # Dashboard counts by status over a time window
+            models.Index(fields=['restaurant', 'status', 'created_at'], name='order_rest_status_created_idx'),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} - {self.restaurant.name}"
 
+    def save(self, *args, **kwargs):
+        set_business_date(self, kwargs)
+        super().save(*args, **kwargs)
+
     def calculate_total(self):
-        """Calculate order total"""
-        self.subtotal = sum(item.quantity * item.unit_price for item in OrderItem.objects.filter(order=self))
+        """Calculate order total from its items with one aggregate query"""
+        subtotal = self.order_items.aggregate(
+            subtotal=Sum(F('quantity') * F('unit_price'), output_field=models.DecimalField(max_digits=10, decimal_places=2))
+        )['subtotal']
+        self.subtotal = subtotal if subtotal is not None else Decimal('0.00')
         self.total = self.subtotal + self.tax + self.service_charge - self.discount
         self.save()
 
 
-class OrderItem(models.Model):
+class OrderItem(ReloadedStateMixin, models.Model):
     """Individual items in an order"""
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -485,6 +615,12 @@ class OrderItem(models.Model):
         ('ready', 'Ready'),
         ('served', 'Served'),
     ]
+    # Status -> field stamped when an item enters it
+    STATUS_TIMESTAMPS = {
+        'preparing': 'preparing_at',
+        'ready': 'ready_at',
+        'served': 'served_at',
+    }
 
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='order_items')
     menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='order_items')
@@ -496,18 +632,87 @@ class OrderItem(models.Model):
     chair = models.ForeignKey(Chair, on_delete=models.SET_NULL, null=True, blank=True, related_name='order_items')
     added_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # When the item last entered each kitchen status; see kitchen_dashboard.transitions
+    preparing_at = models.DateTimeField(null=True, blank=True)
+    ready_at = models.DateTimeField(null=True, blank=True)
+    served_at = models.DateTimeField(null=True, blank=True)
+    # Copied from the menu item when the line is created, so a station's
+    # queue is read without joining the menu
+    station = models.ForeignKey(KitchenStation, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='order_items')
 
     class Meta:
         ordering = ['added_at']
+        indexes = [
+            # Kitchen queues join through order__restaurant, then filter on status
+            models.Index(fields=['order', 'status'], name='orderitem_order_status_idx'),
+            # Station displays read one station's open items
+            models.Index(fields=['station', 'status', 'added_at'], name='orderitem_station_queue_idx'),
+        ]
 
     def __str__(self):
         return f"{self.menu_item.name} x{self.quantity} - Order #{self.order.pk}"
 
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.station_id is None:
+            self.station_id = self.menu_item.routed_station_id
+        changes = {}
+        timestamp_field = self.STATUS_TIMESTAMPS.get(self.status)
+        if timestamp_field and getattr(self, timestamp_field) is None:
+            changes[timestamp_field] = timezone.now()
+        if self.status == 'pending' and self.preparing_at is not None:
+            # An undone start, as in kitchen_dashboard.transitions
+            changes['preparing_at'] = None
+        if changes:
+            for field, value in changes.items():
+                setattr(self, field, value)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *changes}
+        super().save(*args, **kwargs)
+
     @property
     def total_price(self):
         return self.quantity * self.unit_price
 
 
+class OrderItemTransition(models.Model):
+    """Append-only log of order item kitchen status changes"""
+    item = models.ForeignKey(OrderItem, on_delete=models.CASCADE, related_name='transitions')
+    from_status = models.CharField(max_length=20, choices=OrderItem.STATUS_CHOICES)
+    to_status = models.CharField(max_length=20, choices=OrderItem.STATUS_CHOICES)
+    at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['at']
+        indexes = [
+            # Prep-time aggregates look up each item's entries into a status
+            models.Index(fields=['item', 'to_status', 'at'], name='itemtransition_item_to_idx'),
+        ]
+
+    def __str__(self):
+        return f"Item #{self.item_id}: {self.from_status} -> {self.to_status}"
+
+
+class KitchenEvent(models.Model):
+    """
+    Kitchen display event waiting to be streamed.
+
+    Rows are the channel between the process that changed an order and the
+    processes holding stream connections; they are pruned after
+    KITCHEN_EVENT_RETENTION_SECONDS.
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='kitchen_events')
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.payload.get('type')} for restaurant #{self.restaurant_id}"
+
+
 # === VENDOR MANAGEMENT MODELS ===
 class Vendor(models.Model):
     """External vendors/suppliers"""
@@ -604,6 +809,9 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'read', '-created_at'], name='notification_user_unread_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.type}"
@@ -668,3 +876,55 @@ class WasteEntry(models.Model):
     def __str__(self):
         return f"{self.item_name} - {self.quantity} {self.unit}"
 
+
+
+# === REPORTING MODELS ===
+class RestaurantDailyRollup(models.Model):
+    """Per-restaurant daily sales totals, maintained from Order changes"""
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='daily_rollups')
+    date = models.DateField()
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    orders_total = models.IntegerField(default=0)
+    orders_active = models.IntegerField(default=0)
+    orders_completed = models.IntegerField(default=0)
+    orders_cancelled = models.IntegerField(default=0)
+    orders_payment_pending = models.IntegerField(default=0)
+    dine_in_orders = models.IntegerField(default=0)
+    takeaway_orders = models.IntegerField(default=0)
+    delivery_orders = models.IntegerField(default=0)
+    room_service_orders = models.IntegerField(default=0)
+    tax = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    discount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    service_charge = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    items_sold = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date']
+        unique_together = ['restaurant', 'date']
+
+    def __str__(self):
+        return f"{self.restaurant_id} - {self.date}: {self.revenue}"
+
+
+# === API IDEMPOTENCY ===
+class IdempotencyKey(models.Model):
+    """Stored outcome of a POST sent with an Idempotency-Key header"""
+    key = models.CharField(max_length=255)
+    # Who sent the request; keys only collide within one user
+    scope = models.CharField(max_length=254)
+    # SHA-256 of method, path and body, so a key cannot be reused for another request
+    request_hash = models.CharField(max_length=64)
+    # Empty while the first request is still being handled
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='idempotency_scope_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}: {self.key}"
@@ -0,0 +1,182 @@
+"""
+Stack-sampling profiles of slow dashboard requests.
+
+While a request is handled, one shared sampler thread records the handling
+thread's Python stack every SLOW_REQUEST_SAMPLE_INTERVAL_MS. If the request
+belongs to a profiled namespace and took longer than
+SLOW_REQUEST_THRESHOLD_MS, the collapsed stacks (flame graph input), the
+view name, restaurant id and SQL log are written to PROFILE_DIR as JSON;
+otherwise the samples are dropped. Only the newest PROFILE_MAX_FILES
+profiles are kept.
+"""
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.utils import timezone
+
+
+PROFILE_DIR = getattr(settings, 'PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'rms-profiles'))
+THRESHOLD_MS = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', 1000)
+SAMPLE_INTERVAL_MS = getattr(settings, 'SLOW_REQUEST_SAMPLE_INTERVAL_MS', 5)
+PROFILED_NAMESPACES = getattr(settings, 'SLOW_REQUEST_PROFILE_NAMESPACES', (
+    'owner_dashboard', 'staff_dashboard', 'kitchen_dashboard', 'vendor_dashboard',
+))
+MAX_FILES = getattr(settings, 'PROFILE_MAX_FILES', 200)
+
+# Frames kept per sampled stack, innermost last
+MAX_STACK_DEPTH = 64
+
+PROFILE_ID_PATTERN = re.compile(r'^[\w.-]+$')
+
+
+def _collapse(frame):
+    """'module.function;module.function' from the outermost frame inwards"""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        names.append(f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler(threading.Thread):
+    """Samples the stacks of watched threads while any are watched"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL_MS / 1000):
+        super().__init__(name='slow-request-sampler', daemon=True)
+        self.interval = interval
+        self._watched = {}
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+
+    def watch(self, thread_id):
+        samples = Counter()
+        with self._lock:
+            self._watched[thread_id] = samples
+            self._active.set()
+        return samples
+
+    def unwatch(self, thread_id):
+        with self._lock:
+            self._watched.pop(thread_id, None)
+            if not self._watched:
+                self._active.clear()
+
+    def run(self):
+        while True:
+            self._active.wait()
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._watched.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[_collapse(frame)] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+_sampler = None
+_sampler_pid = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler():
+    """The sampler thread of this process, started on first use"""
+    global _sampler, _sampler_pid
+    with _sampler_lock:
+        if _sampler is None or _sampler_pid != os.getpid() or not _sampler.is_alive():
+            _sampler = StackSampler()
+            _sampler_pid = os.getpid()
+            _sampler.start()
+    return _sampler
+
+
+def should_keep(match, duration_ms):
+    return (
+        match is not None
+        and match.namespace in PROFILED_NAMESPACES
+        and duration_ms >= THRESHOLD_MS
+    )
+
+
+def save_profile(request, response, duration_ms, samples, query_profile):
+    """Write a captured profile and prune old ones; returns its id"""
+    match = request.resolver_match
+    now = timezone.now()
+    profile_id = f"{now:%Y%m%dT%H%M%S}-{match.view_name.replace(':', '.')}-{uuid.uuid4().hex[:8]}"
+    data = {
+        'id': profile_id,
+        'captured_at': now.isoformat(),
+        'method': request.method,
+        'path': request.path,
+        'view': match.view_name,
+        'restaurant_id': match.kwargs.get('restaurant_id'),
+        'status': response.status_code,
+        'duration_ms': round(duration_ms, 2),
+        'threshold_ms': THRESHOLD_MS,
+        'sample_interval_ms': SAMPLE_INTERVAL_MS,
+        'samples': sum(samples.values()),
+        'stacks': dict(samples.most_common()),
+        'queries': {
+            'count': query_profile.queries,
+            'time_ms': round(query_profile.query_time * 1000, 2),
+            'log': [
+                {'sql': sql, 'duration_ms': round(duration * 1000, 3)}
+                for sql, duration in query_profile.query_log
+            ],
+        },
+    }
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(PROFILE_DIR, f'{profile_id}.json'), 'w') as f:
+        json.dump(data, f)
+    prune_profiles()
+    return profile_id
+
+
+def _profile_files():
+    try:
+        names = [name for name in os.listdir(PROFILE_DIR) if name.endswith('.json')]
+    except FileNotFoundError:
+        return []
+    # Ids start with the capture time, so names sort oldest first
+    return sorted(names)
+
+
+def prune_profiles(keep=MAX_FILES):
+    for name in _profile_files()[:-keep or None]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, name))
+        except FileNotFoundError:
+            pass
+
+
+def list_profiles(limit=50):
+    """Summaries of the newest profiles, newest first"""
+    summaries = []
+    for name in reversed(_profile_files()[-limit:]):
+        try:
+            with open(os.path.join(PROFILE_DIR, name)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        summaries.append({
+            field: data.get(field)
+            for field in ('id', 'captured_at', 'method', 'path', 'view', 'restaurant_id',
+                          'status', 'duration_ms', 'samples')
+        } | {'query_count': data.get('queries', {}).get('count')})
+    return summaries
+
+
+def profile_path(profile_id):
+    """Path of a stored profile, or None for unknown or malformed ids"""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, f'{profile_id}.json')
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,186 @@
+"""
+Maintenance of the RestaurantDailyRollup fact table.
+
+Rows are keyed by the orders' restaurant-local business_date. Money
+columns and items_sold cover completed orders only; the order counters
+cover every order placed that day.
+
+Model signals keep rows current by adding each saved or deleted order's
+and order item's difference with F() expressions (``apply_rollup_delta``).
+Writes that skip signals (queryset ``update()``, ``bulk_create``) must call
+``refresh_daily_rollup`` or ``rebuild_daily_rollups`` for the days they
+touch, unless they cannot change a rollup column.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import Order, OrderItem, RestaurantDailyRollup
+
+
+COMPLETED = Q(status='completed')
+
+
+def _order_aggregates():
+    """Aggregate expressions for one rollup row over a set of orders"""
+    return {
+        'revenue': Sum('total', filter=COMPLETED),
+        'orders_total': Count('id'),
+        'orders_active': Count('id', filter=Q(status='active')),
+        'orders_completed': Count('id', filter=COMPLETED),
+        'orders_cancelled': Count('id', filter=Q(status='cancelled')),
+        'orders_payment_pending': Count('id', filter=Q(status='payment-pending')),
+        'dine_in_orders': Count('id', filter=Q(order_type='dine-in')),
+        'takeaway_orders': Count('id', filter=Q(order_type='takeaway')),
+        'delivery_orders': Count('id', filter=Q(order_type='delivery')),
+        'room_service_orders': Count('id', filter=Q(order_type='room-service')),
+        'tax': Sum('tax', filter=COMPLETED),
+        'discount': Sum('discount', filter=COMPLETED),
+        'service_charge': Sum('service_charge', filter=COMPLETED),
+    }
+
+
+ROLLUP_FIELDS = list(_order_aggregates()) + ['items_sold']
+
+MONEY_FIELDS = ('revenue', 'tax', 'discount', 'service_charge')
+
+ORDER_TYPE_FIELDS = {
+    'dine-in': 'dine_in_orders',
+    'takeaway': 'takeaway_orders',
+    'delivery': 'delivery_orders',
+    'room-service': 'room_service_orders',
+}
+
+ORDER_STATUS_FIELDS = {
+    'active': 'orders_active',
+    'completed': 'orders_completed',
+    'cancelled': 'orders_cancelled',
+    'payment-pending': 'orders_payment_pending',
+}
+
+
+def _clean(values):
+    """Replace NULL aggregates with zeros of the right type"""
+    row = {}
+    for field in ROLLUP_FIELDS:
+        value = values.get(field)
+        if value is None:
+            value = Decimal('0.00') if field in MONEY_FIELDS else 0
+        row[field] = value
+    return row
+
+
+def order_contribution(status, order_type, total, tax, discount, service_charge, sign=1):
+    """Rollup columns one order adds to its day, items_sold aside; ``sign=-1`` removes them"""
+    contribution = {'orders_total': sign}
+    if status in ORDER_STATUS_FIELDS:
+        contribution[ORDER_STATUS_FIELDS[status]] = sign
+    if order_type in ORDER_TYPE_FIELDS:
+        contribution[ORDER_TYPE_FIELDS[order_type]] = sign
+    if status == 'completed':
+        for field, value in (('revenue', total), ('tax', tax), ('discount', discount),
+                             ('service_charge', service_charge)):
+            contribution[field] = sign * (value or Decimal('0.00'))
+    return contribution
+
+
+def merge_deltas(*deltas):
+    merged = {}
+    for delta in deltas:
+        for field, value in delta.items():
+            merged[field] = merged.get(field, 0) + value
+    return merged
+
+
+def apply_rollup_delta(restaurant_id, day, delta):
+    """Add ``delta`` (field -> amount) to a restaurant/day row, creating it at zero"""
+    delta = {field: value for field, value in delta.items() if value}
+    if restaurant_id is None or day is None or not delta:
+        return
+    with transaction.atomic():
+        RestaurantDailyRollup.objects.get_or_create(restaurant_id=restaurant_id, date=day)
+        RestaurantDailyRollup.objects.filter(restaurant_id=restaurant_id, date=day).update(
+            updated_at=timezone.now(), **{field: F(field) + value for field, value in delta.items()}
+        )
+
+
+def get_daily_rollup(restaurant_id, day):
+    """Return the rollup row for a restaurant/day, or an unsaved zero row"""
+    rollup = RestaurantDailyRollup.objects.filter(restaurant_id=restaurant_id, date=day).first()
+    return rollup or RestaurantDailyRollup(restaurant_id=restaurant_id, date=day)
+
+
+def refresh_daily_rollup(restaurant_id, day):
+    """Recompute a single restaurant/day row from its orders"""
+    orders = Order.objects.filter(restaurant_id=restaurant_id, business_date=day)
+    values = orders.aggregate(**_order_aggregates())
+    values['items_sold'] = OrderItem.objects.filter(
+        order__in=orders.filter(COMPLETED)
+    ).aggregate(total=Sum('quantity'))['total']
+
+    rollup, _ = RestaurantDailyRollup.objects.update_or_create(
+        restaurant_id=restaurant_id,
+        date=day,
+        defaults=_clean(values)
+    )
+    return rollup
+
+
+def rebuild_daily_rollups(start_date, end_date, restaurant_ids=None, chunk_days=31, apps=None):
+    """
+    Rebuild rollups for a date range, one chunk of days at a time.
+
+    Each chunk costs two grouped queries and one bulk insert regardless of
+    how many orders it covers. Migrations pass their ``apps`` registry so
+    historical models are used. Returns the number of rows written.
+    """
+    if apps is None:
+        models = (Order, OrderItem, RestaurantDailyRollup)
+    else:
+        models = tuple(apps.get_model('superadmin', name) for name in ('Order', 'OrderItem', 'RestaurantDailyRollup'))
+    written = 0
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+        written += _rebuild_chunk(chunk_start, chunk_end, restaurant_ids, *models)
+        chunk_start = chunk_end + timedelta(days=1)
+    return written
+
+
+def _rebuild_chunk(start_date, end_date, restaurant_ids, Order, OrderItem, RestaurantDailyRollup):
+    orders = Order.objects.filter(business_date__gte=start_date, business_date__lte=end_date)
+    items = OrderItem.objects.filter(
+        order__business_date__gte=start_date,
+        order__business_date__lte=end_date,
+        order__status='completed'
+    )
+    existing = RestaurantDailyRollup.objects.filter(date__gte=start_date, date__lte=end_date)
+    if restaurant_ids is not None:
+        orders = orders.filter(restaurant_id__in=restaurant_ids)
+        items = items.filter(order__restaurant_id__in=restaurant_ids)
+        existing = existing.filter(restaurant_id__in=restaurant_ids)
+
+    rows = {}
+    for values in (orders.values('restaurant_id', 'business_date')
+                   .annotate(**_order_aggregates())
+                   .order_by()):
+        rows[(values['restaurant_id'], values['business_date'])] = values
+
+    for values in (items.values('order__restaurant_id', 'order__business_date')
+                   .annotate(items_sold=Sum('quantity'))
+                   .order_by()):
+        key = (values['order__restaurant_id'], values['order__business_date'])
+        if key in rows:
+            rows[key]['items_sold'] = values['items_sold']
+
+    rollups = [
+        RestaurantDailyRollup(restaurant_id=restaurant_id, date=day, **_clean(values))
+        for (restaurant_id, day), values in rows.items()
+    ]
+    with transaction.atomic():
+        existing.delete()
+        RestaurantDailyRollup.objects.bulk_create(rollups, batch_size=500)
+    return len(rollups)
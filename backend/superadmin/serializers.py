@@ -1,14 +1,16 @@
 from rest_framework import serializers
 from django.contrib.auth.hashers import make_password
+from .instrumentation import TimedSerializerMixin
 from .models import (
     User, UserSession, LoginAttempt, Permission, RolePermission,
     Restaurant, Employee, DailyStats, MenuCategory, MenuItem,
     InventoryCategory, InventoryItem, Table, Chair, Customer,
-    Order, OrderItem, Vendor, Staff, Notification, Expense, WasteEntry
+    Order, OrderItem, Vendor, Staff, Notification, Expense, WasteEntry,
+    validate_station_restaurant
 )
 
 # === USER & AUTHENTICATION SERIALIZERS ===
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=False)
 
     class Meta:
@@ -32,7 +34,7 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
-class UserSessionSerializer(serializers.ModelSerializer):
+class UserSessionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user_email = serializers.CharField(source='user.email', read_only=True)
     user_name = serializers.CharField(source='user.name', read_only=True)
 
@@ -44,7 +46,7 @@ class UserSessionSerializer(serializers.ModelSerializer):
         ]
 
 
-class LoginAttemptSerializer(serializers.ModelSerializer):
+class LoginAttemptSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = LoginAttempt
         fields = [
@@ -53,13 +55,13 @@ class LoginAttemptSerializer(serializers.ModelSerializer):
         ]
 
 
-class PermissionSerializer(serializers.ModelSerializer):
+class PermissionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Permission
         fields = ['id', 'name', 'codename', 'description', 'module']
 
 
-class RolePermissionSerializer(serializers.ModelSerializer):
+class RolePermissionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     permission_name = serializers.CharField(source='permission.name', read_only=True)
     restaurant_name = serializers.CharField(source='restaurant.name', read_only=True)
 
@@ -68,7 +70,7 @@ class RolePermissionSerializer(serializers.ModelSerializer):
         fields = ['id', 'role', 'permission', 'permission_name', 'restaurant', 'restaurant_name']
 
 
-class EmployeeSerializer(serializers.ModelSerializer):
+class EmployeeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, min_length=6)
     phone = serializers.CharField(required=False, allow_blank=True, default='')
     restaurants = serializers.StringRelatedField(many=True, read_only=True)
@@ -87,7 +89,7 @@ class EmployeeSerializer(serializers.ModelSerializer):
             'created_at': {'read_only': True}
         }
 
-class OwnerSerializer(serializers.ModelSerializer):
+class OwnerSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Simplified serializer for creating restaurant owners"""
     password = serializers.CharField(write_only=True, required=True, min_length=6)
     phone = serializers.CharField(required=False, allow_blank=True, default='')
@@ -97,12 +99,12 @@ class OwnerSerializer(serializers.ModelSerializer):
         fields = ['name', 'email', 'phone', 'password']
 
 
-class RestaurantSerializer(serializers.ModelSerializer):
+class RestaurantSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     owner = OwnerSerializer(write_only=True)
 
     class Meta:
         model = Restaurant
-        fields = ['name', 'email', 'address', 'phone', 'owner']
+        fields = ['name', 'email', 'address', 'phone', 'timezone', 'owner']
 
     def create(self, validated_data):
         owner_data = validated_data.pop('owner')
@@ -125,18 +127,28 @@ class RestaurantSerializer(serializers.ModelSerializer):
 
 
 # === MENU SERIALIZERS ===
-class MenuCategorySerializer(serializers.ModelSerializer):
+def validate_menu_station(instance, attrs):
+    station = attrs.get('station', getattr(instance, 'station', None))
+    restaurant = attrs.get('restaurant', getattr(instance, 'restaurant', None))
+    validate_station_restaurant(station, restaurant.pk if restaurant else None)
+
+
+class MenuCategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     items_count = serializers.SerializerMethodField()
 
     class Meta:
         model = MenuCategory
-        fields = ['id', 'name', 'description', 'restaurant', 'display_order', 'is_active', 'items_count', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'description', 'restaurant', 'display_order', 'is_active', 'station', 'items_count', 'created_at', 'updated_at']
 
     def get_items_count(self, obj):
         return obj.items.count()
 
+    def validate(self, attrs):
+        validate_menu_station(self.instance, attrs)
+        return attrs
 
-class MenuItemSerializer(serializers.ModelSerializer):
+
+class MenuItemSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     restaurant_name = serializers.CharField(source='restaurant.name', read_only=True)
 
@@ -146,12 +158,16 @@ class MenuItemSerializer(serializers.ModelSerializer):
             'id', 'name', 'description', 'price', 'category', 'category_name',
             'restaurant', 'restaurant_name', 'image_url', 'available',
             'preparation_time', 'allergens', 'ingredients', 'calories',
-            'is_vegan', 'is_gluten_free', 'tags', 'created_at', 'updated_at'
+            'is_vegan', 'is_gluten_free', 'tags', 'station', 'created_at', 'updated_at'
         ]
 
+    def validate(self, attrs):
+        validate_menu_station(self.instance, attrs)
+        return attrs
+
 
 # === INVENTORY SERIALIZERS ===
-class InventoryCategorySerializer(serializers.ModelSerializer):
+class InventoryCategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     items_count = serializers.SerializerMethodField()
 
     class Meta:
@@ -162,7 +178,7 @@ class InventoryCategorySerializer(serializers.ModelSerializer):
         return obj.items.count()
 
 
-class InventoryItemSerializer(serializers.ModelSerializer):
+class InventoryItemSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     restaurant_name = serializers.CharField(source='restaurant.name', read_only=True)
     stock_value = serializers.SerializerMethodField()
@@ -181,13 +197,13 @@ class InventoryItemSerializer(serializers.ModelSerializer):
 
 
 # === TABLE SERIALIZERS ===
-class ChairSerializer(serializers.ModelSerializer):
+class ChairSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Chair
         fields = ['id', 'number', 'table', 'status', 'customer_name', 'created_at', 'updated_at']
 
 
-class TableSerializer(serializers.ModelSerializer):
+class TableSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     chairs = ChairSerializer(many=True, read_only=True)
     restaurant_name = serializers.CharField(source='restaurant.name', read_only=True)
     waiter_name = serializers.CharField(source='waiter_assigned.name', read_only=True)
@@ -203,12 +219,36 @@ class TableSerializer(serializers.ModelSerializer):
         ]
 
     def get_current_order_id(self, obj):
+        # Querysets from staff_dashboard.floor annotate it with a subquery
+        if hasattr(obj, 'current_order_id'):
+            return obj.current_order_id
         current_order = obj.orders.filter(status='active').first()
         return current_order.id if current_order else None
 
 
+class FloorPlanChairSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Chair
+        fields = ['id', 'number', 'status', 'customer_name']
+
+
+class FloorPlanTableSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Compact table payload for the floor plan; expects staff_dashboard.floor querysets"""
+    chairs = FloorPlanChairSerializer(many=True, read_only=True)
+    waiter_name = serializers.CharField(source='waiter_assigned.name', read_only=True, default=None)
+    current_order_id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Table
+        fields = [
+            'id', 'number', 'capacity', 'status', 'section', 'shape',
+            'position_x', 'position_y', 'waiter_assigned', 'waiter_name',
+            'reservation_time', 'current_order_id', 'chairs'
+        ]
+
+
 # === CUSTOMER SERIALIZERS ===
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     restaurant_name = serializers.CharField(source='restaurant.name', read_only=True)
     orders_count = serializers.SerializerMethodField()
 
@@ -226,7 +266,7 @@ class CustomerSerializer(serializers.ModelSerializer):
 
 
 # === ORDER SERIALIZERS ===
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     menu_item_name = serializers.CharField(source='menu_item.name', read_only=True)
     menu_item_price = serializers.DecimalField(source='menu_item.price', max_digits=10, decimal_places=2, read_only=True)
     chair_number = serializers.CharField(source='chair.number', read_only=True)
@@ -237,11 +277,13 @@ class OrderItemSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'order', 'menu_item', 'menu_item_name', 'menu_item_price',
             'quantity', 'unit_price', 'total_price', 'notes', 'status',
-            'customizations', 'chair', 'chair_number', 'added_at', 'updated_at'
+            'customizations', 'chair', 'chair_number', 'station', 'added_at', 'updated_at'
         ]
+        # Routed from the menu item on creation
+        read_only_fields = ['station']
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     order_items = OrderItemSerializer(many=True, read_only=True)
     restaurant_name = serializers.CharField(source='restaurant.name', read_only=True)
     table_number = serializers.CharField(source='table.number', read_only=True)
@@ -260,11 +302,14 @@ class OrderSerializer(serializers.ModelSerializer):
         ]
 
     def get_items_count(self, obj):
+        # Reuse prefetched items (see owner_dashboard.history) instead of a COUNT
+        if 'order_items' in getattr(obj, '_prefetched_objects_cache', {}):
+            return len(obj.order_items.all())
         return obj.order_items.count()
 
 
 # === VENDOR SERIALIZERS ===
-class VendorSerializer(serializers.ModelSerializer):
+class VendorSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Vendor
         fields = [
@@ -275,7 +320,7 @@ class VendorSerializer(serializers.ModelSerializer):
 
 
 # === STAFF SERIALIZERS ===
-class StaffSerializer(serializers.ModelSerializer):
+class StaffSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     employee_name = serializers.CharField(source='employee.name', read_only=True)
     employee_email = serializers.CharField(source='employee.email', read_only=True)
     employee_phone = serializers.CharField(source='employee.phone', read_only=True)
@@ -292,7 +337,7 @@ class StaffSerializer(serializers.ModelSerializer):
 
 
 # === NOTIFICATION SERIALIZERS ===
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user_name = serializers.CharField(source='user.name', read_only=True)
     restaurant_name = serializers.CharField(source='restaurant.name', read_only=True)
 
@@ -305,7 +350,7 @@ class NotificationSerializer(serializers.ModelSerializer):
 
 
 # === EXPENSE SERIALIZERS ===
-class ExpenseSerializer(serializers.ModelSerializer):
+class ExpenseSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     restaurant_name = serializers.CharField(source='restaurant.name', read_only=True)
     added_by_name = serializers.CharField(source='added_by.name', read_only=True)
 
@@ -319,7 +364,7 @@ class ExpenseSerializer(serializers.ModelSerializer):
 
 
 # === WASTE TRACKING SERIALIZERS ===
-class WasteEntrySerializer(serializers.ModelSerializer):
+class WasteEntrySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     restaurant_name = serializers.CharField(source='restaurant.name', read_only=True)
     reported_by_name = serializers.CharField(source='reported_by.name', read_only=True)
 
@@ -333,7 +378,7 @@ class WasteEntrySerializer(serializers.ModelSerializer):
 
 
 # === ANALYTICS SERIALIZERS ===
-class AnalyticsSerializer(serializers.Serializer):
+class AnalyticsSerializer(TimedSerializerMixin, serializers.Serializer):
     """Serializer for analytics data"""
     total_revenue = serializers.DecimalField(max_digits=12, decimal_places=2)
     total_orders = serializers.IntegerField()
@@ -0,0 +1,326 @@
+"""
+Model signal handlers that keep derived data in sync with source rows
+"""
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from .access import invalidate_access
+from .business_dates import forget_restaurant_timezone
+from .dashboard_cache import bump_restaurant_version
+from .models import (
+    Customer, Employee, InventoryItem, KitchenStation, MenuItem, Order, OrderItem, Restaurant,
+    RestaurantDailyRollup, Staff, Table, User, Vendor
+)
+from .rollups import apply_rollup_delta, merge_deltas, order_contribution, refresh_daily_rollup
+from .stats import invalidate_platform_counters
+from .tokens import forget_token_version, forget_user_role, revoke_employee_tokens
+
+
+# Order fields that feed RestaurantDailyRollup
+ROLLUP_TRACKED_FIELDS = ('status', 'order_type', 'total', 'tax', 'discount', 'service_charge', 'business_date')
+
+# Stands in for a field that was deferred (.only()/.defer()) when the
+# instance was loaded. Reading it would call refresh_from_db(), whose new
+# instance runs post_init again, so snapshots never touch deferred fields.
+DEFERRED = object()
+
+
+def loaded_values(instance, fields):
+    """Values of ``fields`` without loading deferred ones; those are DEFERRED"""
+    deferred = instance.get_deferred_fields()
+    return tuple(DEFERRED if field in deferred else getattr(instance, field) for field in fields)
+
+
+def _rollup_state(order):
+    return loaded_values(order, ROLLUP_TRACKED_FIELDS)
+
+
+def _schedule_rollup_refresh(order, day=None):
+    day = day or order.business_date
+    if order.restaurant_id is None or day is None:
+        return
+    restaurant_id = order.restaurant_id
+    transaction.on_commit(lambda: refresh_daily_rollup(restaurant_id, day))
+
+
+def _items_sold(order_id):
+    return OrderItem.objects.filter(order_id=order_id).aggregate(total=Sum('quantity'))['total'] or 0
+
+
+# === DAILY ROLLUPS ===
+@receiver(post_init, sender=Order)
+def remember_order_rollup_state(sender, instance, **kwargs):
+    instance._rollup_state = _rollup_state(instance)
+
+
+@receiver(post_save, sender=Order)
+def update_rollup_on_order_save(sender, instance, created, **kwargs):
+    """Move the order's contribution from its previous state to its current one"""
+    previous, state = instance._rollup_state, _rollup_state(instance)
+    instance._rollup_state = state
+    if created:
+        apply_rollup_delta(instance.restaurant_id, instance.business_date, order_contribution(*state[:-1]))
+        return
+    if state == previous:
+        return
+    if DEFERRED in previous or DEFERRED in state:
+        # Without the loaded values the old contribution is unknown; recount the days
+        _schedule_rollup_refresh(instance)
+        if previous[-1] not in (None, DEFERRED, instance.business_date):
+            _schedule_rollup_refresh(instance, previous[-1])
+        return
+
+    previous_day, day = previous[-1], state[-1]
+    removed = order_contribution(*previous[:-1], sign=-1)
+    added = order_contribution(*state[:-1])
+    was_completed, completed = previous[0] == 'completed', state[0] == 'completed'
+    if was_completed or completed:
+        items_sold = _items_sold(instance.pk)
+        removed['items_sold'] = -items_sold if was_completed else 0
+        added['items_sold'] = items_sold if completed else 0
+    if previous_day == day:
+        apply_rollup_delta(instance.restaurant_id, day, merge_deltas(removed, added))
+    else:
+        apply_rollup_delta(instance.restaurant_id, previous_day, removed)
+        apply_rollup_delta(instance.restaurant_id, day, added)
+
+
+@receiver(post_delete, sender=Order)
+def update_rollup_on_order_delete(sender, instance, **kwargs):
+    # Its items were deleted first and took their quantities with them
+    state = instance._rollup_state
+    if DEFERRED in state:
+        _schedule_rollup_refresh(instance)
+    else:
+        apply_rollup_delta(instance.restaurant_id, state[-1], order_contribution(*state[:-1], sign=-1))
+
+
+@receiver(post_init, sender=OrderItem)
+def remember_item_rollup_state(sender, instance, **kwargs):
+    instance._rollup_state = loaded_values(instance, ('order_id', 'quantity'))
+
+
+def _completed_order_day(order_id):
+    """(restaurant id, business date) of a completed order, or None"""
+    return Order.objects.filter(pk=order_id, status='completed').values_list(
+        'restaurant_id', 'business_date'
+    ).first()
+
+
+def _add_items_sold(order_id, quantity):
+    day = _completed_order_day(order_id)
+    if day is not None:
+        apply_rollup_delta(*day, {'items_sold': quantity})
+
+
+def _schedule_item_refresh(order_id):
+    day = _completed_order_day(order_id)
+    if day is not None:
+        transaction.on_commit(lambda: refresh_daily_rollup(*day))
+
+
+@receiver(post_save, sender=OrderItem)
+def update_rollup_on_item_save(sender, instance, created, **kwargs):
+    """items_sold counts completed orders, so only their items move it"""
+    previous = instance._rollup_state
+    current = instance._rollup_state = (instance.order_id, instance.quantity)
+    if created:
+        _add_items_sold(*current)
+    elif DEFERRED in previous:
+        # The loaded quantity is unknown; recount the day
+        _schedule_item_refresh(instance.order_id)
+    elif previous[0] != current[0]:
+        _add_items_sold(previous[0], -previous[1])
+        _add_items_sold(*current)
+    elif previous != current:
+        _add_items_sold(instance.order_id, current[1] - previous[1])
+
+
+@receiver(post_delete, sender=OrderItem)
+def update_rollup_on_item_delete(sender, instance, **kwargs):
+    if DEFERRED in instance._rollup_state:
+        _schedule_item_refresh(instance.order_id)
+    else:
+        order_id, quantity = instance._rollup_state
+        _add_items_sold(order_id, -quantity)
+
+
+# === PLATFORM COUNTERS ===
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+@receiver(post_save, sender=Vendor)
+@receiver(post_delete, sender=Vendor)
+def invalidate_counters_on_change(sender, **kwargs):
+    invalidate_platform_counters()
+
+
+# === DASHBOARD CACHE VERSIONS ===
+def _schedule_version_bump(restaurant_ids):
+    restaurant_ids = [restaurant_id for restaurant_id in restaurant_ids if restaurant_id is not None]
+    if not restaurant_ids:
+        return
+
+    def bump():
+        for restaurant_id in restaurant_ids:
+            bump_restaurant_version(restaurant_id)
+    transaction.on_commit(bump)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+@receiver(post_save, sender=Table)
+@receiver(post_delete, sender=Table)
+@receiver(post_save, sender=InventoryItem)
+@receiver(post_delete, sender=InventoryItem)
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+@receiver(post_save, sender=KitchenStation)
+@receiver(post_delete, sender=KitchenStation)
+@receiver(post_save, sender=RestaurantDailyRollup)
+def bump_dashboard_version(sender, instance, **kwargs):
+    _schedule_version_bump([instance.restaurant_id])
+
+
+@receiver(post_save, sender=Restaurant)
+def bump_dashboard_version_on_restaurant_save(sender, instance, **kwargs):
+    _schedule_version_bump([instance.pk])
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def bump_dashboard_version_on_order_item_change(sender, instance, **kwargs):
+    try:
+        restaurant_id = instance.order.restaurant_id
+    except ObjectDoesNotExist:
+        return
+    _schedule_version_bump([restaurant_id])
+
+
+@receiver(post_save, sender=Staff)
+@receiver(post_delete, sender=Staff)
+def bump_dashboard_version_on_staff_change(sender, instance, **kwargs):
+    try:
+        employee = instance.employee
+    except ObjectDoesNotExist:
+        return
+    _schedule_version_bump(list(employee.restaurants.values_list('id', flat=True)))
+
+
+@receiver(pre_delete, sender=Employee)
+def bump_dashboard_version_on_employee_delete(sender, instance, **kwargs):
+    # Deleting an employee drops its restaurant links without m2m_changed
+    _schedule_version_bump(list(instance.restaurants.values_list('id', flat=True)))
+
+
+@receiver(m2m_changed, sender=Employee.restaurants.through)
+def bump_dashboard_version_on_assignment(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # restaurant.employees.add(...): the instance is the restaurant
+        _schedule_version_bump([instance.pk])
+    elif action == 'pre_clear':
+        _schedule_version_bump(list(instance.restaurants.values_list('id', flat=True)))
+    else:
+        _schedule_version_bump(list(pk_set or ()))
+
+
+# === ACCESS MAPS ===
+@receiver(post_init, sender=Employee)
+def remember_employee_email(sender, instance, **kwargs):
+    instance._access_email = loaded_values(instance, ('email',))[0]
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_access_on_employee_change(sender, instance, **kwargs):
+    previous = instance._access_email
+    invalidate_access(instance.email, *([] if previous is DEFERRED else [previous]))
+    instance._access_email = instance.email
+
+
+@receiver(m2m_changed, sender=Employee.restaurants.through)
+def invalidate_access_on_assignment(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_access(instance.email)
+    elif action == 'pre_clear':
+        invalidate_access(*instance.employees.values_list('email', flat=True))
+    else:
+        invalidate_access(*Employee.objects.filter(pk__in=pk_set or ()).values_list('email', flat=True))
+
+
+@receiver(pre_delete, sender=Restaurant)
+def invalidate_access_on_restaurant_delete(sender, instance, **kwargs):
+    # The restaurant's employee links are deleted without m2m_changed
+    invalidate_access(*instance.employees.values_list('email', flat=True))
+
+
+# === TOKEN REVOCATION ===
+def _revoke_tokens(employee):
+    revoke_employee_tokens(employee.pk)
+    # Keep the in-memory copy current so a later save() doesn't roll it back;
+    # a deferred version is not saved back at all
+    if 'token_version' not in employee.get_deferred_fields():
+        employee.token_version += 1
+
+
+@receiver(post_init, sender=Employee)
+def remember_employee_role(sender, instance, **kwargs):
+    instance._token_role = loaded_values(instance, ('role',))[0]
+
+
+@receiver(post_save, sender=Employee)
+def revoke_tokens_on_role_change(sender, instance, created, **kwargs):
+    role = loaded_values(instance, ('role',))[0]
+    # A role assigned on an instance loaded without it may be a change
+    if not created and role is not DEFERRED and role != instance._token_role:
+        _revoke_tokens(instance)
+    instance._token_role = role
+
+
+@receiver(post_delete, sender=Employee)
+def forget_token_version_on_delete(sender, instance, **kwargs):
+    forget_token_version(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_role_on_change(sender, instance, **kwargs):
+    # Tokens are checked against the User's role and is_active flag
+    forget_user_role(instance.pk)
+
+
+@receiver(m2m_changed, sender=Employee.restaurants.through)
+def revoke_tokens_on_assignment(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        _revoke_tokens(instance)
+    elif action == 'pre_clear':
+        for employee_id in instance.employees.values_list('id', flat=True):
+            revoke_employee_tokens(employee_id)
+    else:
+        for employee_id in pk_set or ():
+            revoke_employee_tokens(employee_id)
+
+
+@receiver(pre_delete, sender=Restaurant)
+def revoke_tokens_on_restaurant_delete(sender, instance, **kwargs):
+    for employee_id in instance.employees.values_list('id', flat=True):
+        revoke_employee_tokens(employee_id)
+
+
+# === RESTAURANT TIMEZONES ===
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def forget_timezone_on_restaurant_change(sender, instance, **kwargs):
+    forget_restaurant_timezone(instance.pk)
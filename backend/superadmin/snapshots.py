@@ -0,0 +1,146 @@
+"""
+Daily platform statistics snapshots.
+
+Snapshots are written by the ``snapshot_daily_stats`` management command
+(run it from cron) or by the in-process scheduler enabled with
+DAILY_STATS_SCHEDULER_ENABLED. Read paths never write to DailyStats.
+"""
+import logging
+import os
+import threading
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .health import get_rolling_average
+from .models import DailyStats, Employee, Restaurant, Vendor
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_INTERVAL = getattr(settings, 'DAILY_STATS_SNAPSHOT_INTERVAL', 3600)
+
+LEASE_KEY = 'daily_stats:scheduler_lease'
+
+# Models counted in each snapshot, keyed by their DailyStats column
+COUNTED_MODELS = {
+    'restaurant_count': Restaurant,
+    'employee_count': Employee,
+    'vendor_count': Vendor,
+}
+
+
+def store_daily_stats(day=None):
+    """Store current statistics for future weekly comparisons"""
+    day = day or timezone.localdate()
+
+    defaults = {field: model.objects.count() for field, model in COUNTED_MODELS.items()}
+    # Unknown (None) until the sampler has recorded a history; sampling here
+    # would start a sampler thread and report a single unprimed CPU reading
+    defaults['system_health_avg'] = get_rolling_average()
+
+    daily_stats, _ = DailyStats.objects.update_or_create(date=day, defaults=defaults)
+    return daily_stats
+
+
+def _day_end(day):
+    return timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def counts_as_of(day):
+    """Row counts as they stood at the end of ``day``, from created_at"""
+    end = _day_end(day)
+    return {
+        field: model.objects.filter(created_at__lt=end).count()
+        for field, model in COUNTED_MODELS.items()
+    }
+
+
+def backfill_daily_stats(days=30, end=None):
+    """
+    Create DailyStats rows for missing days from created_at history.
+
+    Covers the ``days`` days up to and including ``end`` (default:
+    yesterday). Existing rows are left alone. Health is unknown for past
+    days, so backfilled rows have no system_health_avg.
+    Returns the number of rows created.
+    """
+    end = end or timezone.localdate() - timedelta(days=1)
+    start = end - timedelta(days=days - 1)
+
+    existing = set(DailyStats.objects.filter(date__gte=start, date__lte=end).values_list('date', flat=True))
+    missing = [start + timedelta(days=offset) for offset in range(days)
+               if start + timedelta(days=offset) not in existing]
+    if not missing:
+        return 0
+
+    # One baseline count plus one grouped count per model, then a running sum
+    running = counts_as_of(start - timedelta(days=1))
+    created_per_day = {}
+    for field, model in COUNTED_MODELS.items():
+        created_per_day[field] = dict(
+            model.objects
+            .filter(created_at__gte=_day_end(start - timedelta(days=1)), created_at__lt=_day_end(end))
+            .annotate(day=TruncDate('created_at'))
+            .values('day')
+            .annotate(total=Count('id'))
+            .order_by()
+            .values_list('day', 'total')
+        )
+
+    missing_days = set(missing)
+    rows = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        for field in COUNTED_MODELS:
+            running[field] += created_per_day[field].get(day, 0)
+        if day in missing_days:
+            rows.append(DailyStats(date=day, **running))
+
+    DailyStats.objects.bulk_create(rows)
+    return len(rows)
+
+
+class DailyStatsScheduler(threading.Thread):
+    """Snapshot today's statistics every SNAPSHOT_INTERVAL seconds"""
+
+    def __init__(self, interval=SNAPSHOT_INTERVAL):
+        super().__init__(name='daily-stats-scheduler', daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while True:
+            # Only one process per interval takes the snapshot
+            if cache.add(LEASE_KEY, os.getpid(), timeout=max(self.interval - 1, 1)):
+                try:
+                    backfill_daily_stats(days=7)
+                    store_daily_stats()
+                except Exception:
+                    logger.exception('Daily stats snapshot failed')
+                finally:
+                    connections.close_all()
+            if self._stop_event.wait(self.interval):
+                break
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_scheduler():
+    """Start the in-process snapshot scheduler once per process"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None or not _scheduler.is_alive():
+            _scheduler = DailyStatsScheduler()
+            _scheduler.start()
+    return _scheduler
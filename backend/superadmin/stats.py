@@ -0,0 +1,73 @@
+"""
+Platform-wide counters for the admin dashboards
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import CharField, Count, F, Q, Value
+from django.utils import timezone
+
+from .models import Employee, Restaurant, Vendor
+
+
+CACHE_KEY = 'platform_counters'
+CACHE_TIMEOUT = getattr(settings, 'PLATFORM_COUNTERS_CACHE_TIMEOUT', 30)
+
+
+def _counter_rows(model, role, week_ago):
+    """(source, role_name, total, week_ago) rows for one model"""
+    return (
+        model.objects.order_by()
+        .annotate(source=Value(model._meta.model_name, output_field=CharField()), role_name=role)
+        .values('source', 'role_name')
+        .annotate(total=Count('id'), week_ago=Count('id', filter=Q(created_at__lt=week_ago)))
+    )
+
+
+def compute_platform_counters(now=None):
+    """
+    Restaurant, vendor and per-role employee counts, now and a week ago.
+
+    All counters come from a single UNION ALL of conditional aggregates.
+    """
+    now = now or timezone.now()
+    week_ago = now - timedelta(days=7)
+    no_role = Value('', output_field=CharField())
+
+    rows = _counter_rows(Employee, F('role'), week_ago).union(
+        _counter_rows(Restaurant, no_role, week_ago),
+        _counter_rows(Vendor, no_role, week_ago),
+        all=True
+    )
+
+    counters = {
+        'restaurants': {'total': 0, 'week_ago': 0},
+        'employees': {'total': 0, 'week_ago': 0},
+        'vendors': {'total': 0, 'week_ago': 0},
+        'employees_by_role': {role: {'total': 0, 'week_ago': 0} for role, _ in Employee.ROLE_CHOICES},
+        'week_ago': week_ago.isoformat(),
+        'computed_at': now.isoformat(),
+    }
+    for row in rows:
+        counts = {'total': row['total'], 'week_ago': row['week_ago']}
+        if row['source'] == 'employee':
+            counters['employees_by_role'][row['role_name']] = counts
+            counters['employees']['total'] += row['total']
+            counters['employees']['week_ago'] += row['week_ago']
+        else:
+            counters[f"{row['source']}s"] = counts
+    return counters
+
+
+def get_platform_counters():
+    """Cached platform counters; invalidated when the counted models change"""
+    counters = cache.get(CACHE_KEY)
+    if counters is None:
+        counters = compute_platform_counters()
+        cache.set(CACHE_KEY, counters, timeout=CACHE_TIMEOUT)
+    return counters
+
+
+def invalidate_platform_counters():
+    cache.delete(CACHE_KEY)
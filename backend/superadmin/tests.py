@@ -1,3 +1,641 @@
-from django.test import TestCase
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.serializers import BaseSerializer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from . import checks, metrics, middleware, profiling
+from .access import get_restaurant_roles
+from .authentication import ScopedJWTAuthentication
+from .benchmarks import EndpointBenchmark
+from .business_dates import TIMEZONE_KEY, business_date_for, restaurant_timezone
+from .dashboard_cache import cached_dashboard, get_restaurant_version
+from .health import record_sample
+from .instrumentation import profile_request
+from .models import (
+    Customer, DailyStats, Employee, MenuCategory, MenuItem, Notification, Order, OrderItem, Restaurant,
+    RestaurantDailyRollup, User, Vendor,
+)
+from .rollups import ROLLUP_FIELDS, refresh_daily_rollup
+from .serializers import RestaurantSerializer
+from .snapshots import backfill_daily_stats, store_daily_stats
+from .stats import get_platform_counters
+from .tokens import TOKEN_VERSION_KEY, ScopedRefreshToken, revoke_employee_tokens
+
+
+def create_restaurant(name='Test Restaurant'):
+    return Restaurant.objects.create(
+        name=name, email=f"{name.lower().replace(' ', '-')}@example.com", address='1 Main Street', phone='9800000000'
+    )
+
+
+class DeferredFieldSignalTests(TestCase):
+    """post_init handlers must not load deferred fields"""
+
+    def setUp(self):
+        self.restaurant = create_restaurant()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order = Order.objects.create(
+                restaurant=self.restaurant, order_type='takeaway', subtotal=Decimal('100.00'), total=Decimal('100.00')
+            )
+
+    def test_only_and_defer_querysets_load(self):
+        self.assertEqual([order.pk for order in Order.objects.only('id')], [self.order.pk])
+        self.assertEqual(Order.objects.defer('status').get().pk, self.order.pk)
+
+    def test_deferred_order_save_refreshes_rollup(self):
+        order = Order.objects.only('id', 'restaurant', 'business_date').get()
+        order.total = Decimal('250.00')
+        order.status = 'completed'
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save()
+        rollup = RestaurantDailyRollup.objects.get(restaurant=self.restaurant)
+        self.assertEqual(rollup.revenue, Decimal('250.00'))
+        self.assertEqual(rollup.orders_completed, 1)
+
+    def test_only_employee_queryset_loads(self):
+        employee = Employee.objects.create(name='Cook', email='cook@example.com', role='kitchen', password='x')
+        self.assertEqual([row.pk for row in Employee.objects.only('id')], [employee.pk])
+
+    def test_deferred_employee_role_change_revokes_tokens(self):
+        employee = Employee.objects.create(name='Cook', email='cook@example.com', role='kitchen', password='x')
+        deferred = Employee.objects.only('id', 'name', 'email', 'password').get()
+        deferred.role = 'manager'
+        deferred.save()
+        employee.refresh_from_db()
+        self.assertEqual(employee.role, 'manager')
+        self.assertEqual(employee.token_version, 1)
+
+
+
+class DailyRollupTests(TestCase):
+    """RestaurantDailyRollup follows order creates, updates and deletes"""
+
+    def setUp(self):
+        self.restaurant = create_restaurant()
+
+    def create_order(self, total, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Order.objects.create(
+                restaurant=self.restaurant, subtotal=Decimal(total), total=Decimal(total), **fields
+            )
+
+    def rollup(self):
+        return RestaurantDailyRollup.objects.get(restaurant=self.restaurant)
+
+    def test_rollup_tracks_order_changes(self):
+        first = self.create_order('40.00', order_type='takeaway')
+        second = self.create_order('60.00', order_type='delivery')
+        rollup = self.rollup()
+        self.assertEqual((rollup.orders_total, rollup.orders_active), (2, 2))
+        self.assertEqual((rollup.takeaway_orders, rollup.delivery_orders), (1, 1))
+
+        first.status = 'completed'
+        with self.captureOnCommitCallbacks(execute=True):
+            first.save()
+        rollup = self.rollup()
+        self.assertEqual((rollup.orders_active, rollup.orders_completed), (1, 1))
+        self.assertEqual(rollup.revenue, Decimal('40.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        rollup = self.rollup()
+        self.assertEqual((rollup.orders_total, rollup.orders_active, rollup.delivery_orders), (1, 0, 0))
+
+    def assertMatchesRecount(self):
+        rollup = self.rollup()
+        recounted = refresh_daily_rollup(self.restaurant.pk, rollup.date)
+        self.assertEqual(
+            {field: getattr(rollup, field) for field in ROLLUP_FIELDS},
+            {field: getattr(recounted, field) for field in ROLLUP_FIELDS},
+        )
+        return rollup
+
+    def test_items_sold_follows_item_changes(self):
+        category = MenuCategory.objects.create(name='Mains', restaurant=self.restaurant)
+        burger = MenuItem.objects.create(name='Burger', price=Decimal('10.00'), category=category,
+                                         restaurant=self.restaurant)
+        order = self.create_order('30.00', status='completed')
+        item = OrderItem.objects.create(order=order, menu_item=burger, unit_price=burger.price, quantity=2)
+        OrderItem.objects.create(order=order, menu_item=burger, unit_price=burger.price, quantity=1)
+        self.assertEqual(self.assertMatchesRecount().items_sold, 3)
+
+        item.quantity = 5
+        item.save()
+        self.assertEqual(self.assertMatchesRecount().items_sold, 6)
+        item.delete()
+        self.assertEqual(self.assertMatchesRecount().items_sold, 1)
+
+        # Reopening the order takes its items out of items_sold
+        order.status = 'active'
+        order.save()
+        self.assertEqual(self.assertMatchesRecount().items_sold, 0)
+
+    def test_order_moved_to_another_day_leaves_both_days_exact(self):
+        order = self.create_order('25.00', status='completed', order_type='takeaway')
+        day = order.business_date
+        order.business_date = day - timedelta(days=1)
+        order.total = Decimal('30.00')
+        order.save()
+        old, new = (RestaurantDailyRollup.objects.get(restaurant=self.restaurant, date=d)
+                    for d in (day, day - timedelta(days=1)))
+        self.assertEqual((old.orders_total, old.revenue, old.takeaway_orders), (0, Decimal('0.00'), 0))
+        self.assertEqual((new.orders_total, new.revenue, new.takeaway_orders), (1, Decimal('30.00'), 1))
+
+    def test_reloaded_order_is_removed_from_the_day_it_was_reloaded_with(self):
+        order = self.create_order('25.00')
+        earlier = order.business_date - timedelta(days=3)
+        Order.objects.filter(pk=order.pk).update(business_date=earlier)
+        refresh_daily_rollup(self.restaurant.pk, earlier)
+        order.refresh_from_db()
+        order.delete()
+        self.assertEqual(
+            RestaurantDailyRollup.objects.get(restaurant=self.restaurant, date=earlier).orders_total, 0
+        )
+
+    def test_migration_backfills_existing_orders(self):
+        self.create_order('40.00', status='completed')
+        RestaurantDailyRollup.objects.all().delete()
+        migration = import_module('superadmin.migrations.0024_backfill_daily_rollups')
+        migration.fill_daily_rollups(django_apps, None)
+        self.assertEqual((self.rollup().orders_completed, self.rollup().revenue), (1, Decimal('40.00')))
+
+
+class DashboardVersionTests(TestCase):
+    """Saving a restaurant's data retires its cached dashboards"""
+
+    def setUp(self):
+        self.restaurant = create_restaurant()
+
+    def test_saves_bump_the_version(self):
+        version = get_restaurant_version(self.restaurant.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            MenuCategory.objects.create(name='Mains', restaurant=self.restaurant)
+            Order.objects.create(restaurant=self.restaurant, order_type='takeaway')
+        self.assertGreater(get_restaurant_version(self.restaurant.pk), version)
+
+    def test_cached_payload_is_rebuilt_after_a_change(self):
+        builds = []
+
+        def build():
+            builds.append(1)
+            return {'orders': Order.objects.filter(restaurant=self.restaurant).count()}
+
+        self.assertEqual(cached_dashboard('owner', self.restaurant.pk, build), ({'orders': 0}, False))
+        self.assertEqual(cached_dashboard('owner', self.restaurant.pk, build), ({'orders': 0}, True))
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.create(restaurant=self.restaurant, order_type='takeaway')
+        self.assertEqual(cached_dashboard('owner', self.restaurant.pk, build), ({'orders': 1}, False))
+        self.assertEqual(len(builds), 2)
+
+
+class BusinessDateTests(TestCase):
+    """Orders are dated by the restaurant's local calendar, not UTC"""
+
+    # 20:00 UTC is already the next day in Kathmandu (+05:45)
+    LATE_UTC = datetime(2025, 3, 1, 20, 0, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        cache.clear()
+        self.restaurant = create_restaurant()
+        self.restaurant.timezone = 'Asia/Kathmandu'
+        self.restaurant.save()
+
+    def create_order(self, moment, **fields):
+        with mock.patch('django.utils.timezone.now', return_value=moment):
+            return Order.objects.create(restaurant=self.restaurant, order_type='takeaway', **fields)
+
+    def test_date_follows_the_restaurant_timezone_across_utc_midnight(self):
+        self.assertEqual(business_date_for(self.restaurant.pk, self.LATE_UTC), date(2025, 3, 2))
+        self.assertEqual(self.create_order(self.LATE_UTC).business_date, date(2025, 3, 2))
+
+        west = create_restaurant('West')
+        west.timezone = 'America/New_York'
+        west.save()
+        # 03:00 UTC is still the evening before in New York
+        self.assertEqual(business_date_for(west.pk, datetime(2025, 3, 2, 3, 0, tzinfo=dt_timezone.utc)),
+                         date(2025, 3, 1))
+
+    def test_timezone_is_cached_until_the_restaurant_is_saved(self):
+        self.assertEqual(restaurant_timezone(self.restaurant.pk).key, 'Asia/Kathmandu')
+        self.assertEqual(cache.get(TIMEZONE_KEY.format(self.restaurant.pk)), 'Asia/Kathmandu')
+
+        # A queryset update bypasses the signals, so the cached zone stays
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(timezone='UTC')
+        self.assertEqual(restaurant_timezone(self.restaurant.pk).key, 'Asia/Kathmandu')
+
+        self.restaurant.timezone = 'UTC'
+        self.restaurant.save()
+        self.assertIsNone(cache.get(TIMEZONE_KEY.format(self.restaurant.pk)))
+        self.assertEqual(business_date_for(self.restaurant.pk, self.LATE_UTC), date(2025, 3, 1))
+
+    def test_recompute_moves_orders_and_their_rollups(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = self.create_order(self.LATE_UTC, total=Decimal('12.00'), status='completed')
+        self.restaurant.timezone = 'UTC'
+        self.restaurant.save()
+
+        # Without --recompute dated rows are left alone
+        call_command('backfill_business_dates', stdout=StringIO())
+        order.refresh_from_db()
+        self.assertEqual(order.business_date, date(2025, 3, 2))
+
+        out = StringIO()
+        call_command('backfill_business_dates', '--recompute', '--chunk-size', '1', stdout=out)
+        self.assertIn('1 orders', out.getvalue())
+        order.refresh_from_db()
+        self.assertEqual(order.business_date, date(2025, 3, 1))
+        self.assertEqual(
+            list(RestaurantDailyRollup.objects.filter(restaurant=self.restaurant, orders_total__gt=0)
+                 .values_list('date', 'revenue')),
+            [(date(2025, 3, 1), Decimal('12.00'))]
+        )
+
+    def test_migration_fills_missing_dates(self):
+        order = self.create_order(self.LATE_UTC)
+        customer = Customer.objects.create(name='Guest', restaurant=self.restaurant)
+        Customer.objects.filter(pk=customer.pk).update(created_at=self.LATE_UTC)
+        Order.objects.update(business_date=None)
+        Customer.objects.update(business_date=None)
+        migration = import_module('superadmin.migrations.0014_business_dates')
+        migration.fill_business_dates(django_apps, None)
+        order.refresh_from_db()
+        customer.refresh_from_db()
+        self.assertEqual((order.business_date, customer.business_date), (date(2025, 3, 2), date(2025, 3, 2)))
+
+
+class PlatformCounterTests(TestCase):
+    """Admin dashboard counters, cached until a counted model changes"""
+
+    def setUp(self):
+        cache.clear()
+        create_restaurant()
+        Vendor.objects.create(name='Greens', type='supplier', email='greens@example.com', phone='1', address='a')
+        for index, role in enumerate(('kitchen', 'kitchen', 'staff', 'waiter', 'owner')):
+            Employee.objects.create(name=f'E{index}', email=f'e{index}@example.com', role=role, password='x')
+        # One cook has been around for longer than a week
+        Employee.objects.filter(email='e0@example.com').update(created_at=timezone.now() - timedelta(days=10))
+
+    def test_counts_are_keyed_by_employee_role(self):
+        counters = get_platform_counters()
+        by_role = counters['employees_by_role']
+        self.assertEqual(set(by_role), {role for role, _ in Employee.ROLE_CHOICES})
+        self.assertEqual(by_role['kitchen'], {'total': 2, 'week_ago': 1})
+        self.assertEqual((by_role['staff']['total'], by_role['waiter']['total']), (1, 1))
+        self.assertEqual(by_role['manager'], {'total': 0, 'week_ago': 0})
+        self.assertEqual(counters['employees'], {'total': 5, 'week_ago': 1})
+        self.assertEqual((counters['restaurants']['total'], counters['vendors']['total']), (1, 1))
+
+    def test_dashboard_breakdown_uses_the_role_counts(self):
+        admin = User.objects.create_user(email='admin@example.com', password='pw', role='admin')
+        client = APIClient()
+        client.force_authenticate(admin)
+        sample = {'score': 90, 'timestamp': None, 'cpu_usage': 1, 'memory_usage': 1, 'disk_usage': 1,
+                  'database_ok': True}
+        with mock.patch('superadmin.views.get_latest_sample', return_value=sample):
+            response = client.get('/api/superadmin/dashboard-stats/')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['users']['breakdown'], {
+            'owners': 1, 'managers': 0, 'kitchen_staff': 2, 'restaurant_staff': 1, 'waiters': 1,
+        })
+
+    def test_cache_is_dropped_when_counted_models_change(self):
+        get_platform_counters()
+        with self.assertNumQueries(0):
+            get_platform_counters()
+
+        employee = Employee.objects.create(name='Chef', email='chef@example.com', role='kitchen', password='x')
+        self.assertEqual(get_platform_counters()['employees_by_role']['kitchen']['total'], 3)
+        employee.delete()
+        self.assertEqual(get_platform_counters()['employees_by_role']['kitchen']['total'], 2)
+
+        Vendor.objects.get().delete()
+        self.assertEqual(get_platform_counters()['vendors']['total'], 0)
+        create_restaurant('Second')
+        self.assertEqual(get_platform_counters()['restaurants']['total'], 2)
+
+
+class ScopedTokenRevocationTests(TestCase):
+    """Scoped access tokens stop authenticating once the claims they carry go stale"""
+
+    def setUp(self):
+        self.restaurant = create_restaurant()
+        self.authenticator = ScopedJWTAuthentication()
+
+    def authenticate(self, user):
+        token = ScopedRefreshToken.for_user(user).access_token
+        return self.authenticator.get_user(self.authenticator.get_validated_token(str(token)))
+
+    def test_employee_role_change_revokes_token(self):
+        user = User.objects.create_user(email='cook@example.com', password='pw', role='kitchen')
+        employee = Employee.objects.create(name='Cook', email=user.email, role='kitchen', password='x')
+        employee.restaurants.add(self.restaurant)
+        token = str(ScopedRefreshToken.for_user(user).access_token)
+        self.assertEqual(self.authenticator.get_user(self.authenticator.get_validated_token(token)).restaurant_ids,
+                         {self.restaurant.pk})
+
+        employee.role = 'staff'
+        employee.save()
+        with self.assertRaises(InvalidToken):
+            self.authenticator.get_user(self.authenticator.get_validated_token(token))
+
+    def test_admin_role_change_revokes_token(self):
+        admin = User.objects.create_user(email='admin@example.com', password='pw', role='admin')
+        token = str(ScopedRefreshToken.for_user(admin).access_token)
+        self.assertEqual(self.authenticator.get_user(self.authenticator.get_validated_token(token)).role, 'admin')
+
+        admin.role = 'staff'
+        admin.save()
+        with self.assertRaises(InvalidToken):
+            self.authenticator.get_user(self.authenticator.get_validated_token(token))
+
+    def test_deactivated_admin_token_is_revoked(self):
+        admin = User.objects.create_user(email='admin@example.com', password='pw', role='admin')
+        self.authenticate(admin)
+        token = str(ScopedRefreshToken.for_user(admin).access_token)
+
+        admin.is_active = False
+        admin.save()
+        with self.assertRaises(InvalidToken):
+            self.authenticator.get_user(self.authenticator.get_validated_token(token))
+
+    def test_revocation_by_another_worker_is_seen_without_a_shared_cache(self):
+        user = User.objects.create_user(email='cook@example.com', password='pw', role='kitchen')
+        employee = Employee.objects.create(name='Cook', email=user.email, role='kitchen', password='x')
+        token = str(ScopedRefreshToken.for_user(user).access_token)
+        self.authenticator.get_user(self.authenticator.get_validated_token(token))
+
+        # Another worker's write: this process's cache is never told
+        Employee.objects.filter(pk=employee.pk).update(token_version=employee.token_version + 1)
+        with self.assertRaises(InvalidToken):
+            self.authenticator.get_user(self.authenticator.get_validated_token(token))
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+                                           'LOCATION': 'rms_test_cache'}})
+    def test_revocation_is_seen_through_a_shared_cache(self):
+        call_command('createcachetable', verbosity=0)
+        user = User.objects.create_user(email='cook@example.com', password='pw', role='kitchen')
+        employee = Employee.objects.create(name='Cook', email=user.email, role='kitchen', password='x')
+        token = str(ScopedRefreshToken.for_user(user).access_token)
+        self.authenticator.get_user(self.authenticator.get_validated_token(token))
+        self.assertEqual(cache.get(TOKEN_VERSION_KEY.format(employee.pk)), employee.token_version)
+
+        revoke_employee_tokens(employee.pk)
+        # The checking worker starts with nothing of its own in memory
+        caches.close_all()
+        del caches['default']
+        with self.assertRaises(InvalidToken):
+            self.authenticator.get_user(self.authenticator.get_validated_token(token))
+
+
+class AsyncMiddlewareTests(TestCase):
+    """The instrumentation middleware measure requests served through ASGI"""
+
+    def setUp(self):
+        create_restaurant()
+        admin = User.objects.create_user(email='admin@example.com', password='pw', role='admin')
+        self.headers = {'Authorization': f'Bearer {ScopedRefreshToken.for_user(admin).access_token}'}
+
+    async def test_async_request_is_counted(self):
+        with mock.patch.object(middleware, 'METRICS_ENABLED', True), \
+                mock.patch.object(metrics, 'METRICS_DIR', tempfile.mkdtemp()):
+            metrics.process_metrics._reset()
+            try:
+                response = await AsyncClient().get('/api/superadmin/active-restaurants/', headers=self.headers)
+                self.assertEqual(response.status_code, 200)
+                requests = metrics.process_metrics.counters[(
+                    'rms_http_requests_total',
+                    (('method', 'GET'), ('status', '200'), ('view', 'superadmin:count_restaurants'))
+                )]
+                queries = metrics.process_metrics.histograms[(
+                    'rms_db_queries_per_request', (('view', 'superadmin:count_restaurants'),)
+                )]
+            finally:
+                metrics.process_metrics._reset()
+        self.assertEqual(requests, 1)
+        self.assertGreater(queries[-1], 0)
+
+    async def test_sampled_async_request_gets_server_timing(self):
+        with mock.patch.object(middleware, 'SAMPLE_RATE', 1.0), \
+                self.assertLogs('superadmin.requests', 'INFO') as logs:
+            response = await AsyncClient().get('/api/superadmin/active-restaurants/', headers=self.headers)
+        queries = re.search(r'desc="(\d+) queries"', response['Server-Timing'])
+        self.assertGreater(int(queries.group(1)), 0)
+        self.assertEqual(json.loads(logs.records[0].getMessage())['view'], 'superadmin:count_restaurants')
+
+    async def test_slow_async_request_is_profiled(self):
+        directory = tempfile.mkdtemp()
+        with mock.patch.object(middleware, 'SLOW_REQUEST_PROFILING_ENABLED', True), \
+                mock.patch.multiple(profiling, PROFILE_DIR=directory, THRESHOLD_MS=0,
+                                    PROFILED_NAMESPACES=('superadmin',)):
+            await AsyncClient().get('/api/superadmin/active-restaurants/', headers=self.headers)
+        [filename] = os.listdir(directory)
+        with open(os.path.join(directory, filename)) as f:
+            profile = json.load(f)
+        self.assertEqual(profile['view'], 'superadmin:count_restaurants')
+        self.assertGreater(profile['queries']['count'], 0)
+
+
+class SerializerTimingTests(TestCase):
+    def test_serializers_are_timed_only_while_profiling(self):
+        restaurants = [create_restaurant(f'Restaurant {index}') for index in range(3)]
+        # DRF itself is left alone
+        self.assertEqual(BaseSerializer.data.fget.__module__, 'rest_framework.serializers')
+
+        with profile_request() as idle:
+            pass
+        with profile_request() as profile:
+            data = RestaurantSerializer(restaurants, many=True).data
+        self.assertEqual(len(data), 3)
+        self.assertEqual(idle.serializer_time, 0)
+        self.assertGreater(profile.serializer_time, 0)
+        self.assertEqual(profile._serializer_depth, 0)
+
+
+class MetricsMergeTests(TestCase):
+    """Files of exited processes are folded into the aggregate without changing the totals"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        patcher = mock.patch.object(metrics, 'METRICS_DIR', self.directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        metrics.process_metrics._reset()
+        self.addCleanup(metrics.process_metrics._reset)
+
+    def write_exited_process_file(self, requests):
+        exited = subprocess.Popen([sys.executable, '-c', ''])
+        exited.wait()
+        filename = f'{exited.pid}-{time.time_ns()}.json'
+        metrics._write(os.path.join(self.directory, filename), {
+            'counters': [['rms_http_requests_total', [['view', 'test']], requests]],
+            'histograms': [['rms_db_queries_per_request', [['view', 'test']], [0, requests, 0, 0, 0, 0, 0, 0, 0, requests]]],
+        })
+        return filename
+
+    def total(self):
+        counters, histograms = metrics.collect()
+        key = ('rms_db_queries_per_request', (('view', 'test'),))
+        return counters[('rms_http_requests_total', (('view', 'test'),))], histograms[key][-1]
+
+    def test_exited_process_files_are_merged(self):
+        first = self.write_exited_process_file(3)
+        self.assertEqual(self.total(), (3, 3))
+        second = self.write_exited_process_file(2)
+        self.assertEqual(self.total(), (5, 5))
+        self.assertEqual(self.total(), (5, 5))
+
+        files = os.listdir(self.directory)
+        self.assertIn(metrics.AGGREGATE_FILE, files)
+        self.assertNotIn(first, files)
+        self.assertNotIn(second, files)
+        # Only this process's own file is left besides the aggregate
+        self.assertEqual(len(files), 2)
+
+    def test_file_merged_but_not_deleted_is_counted_once(self):
+        filename = self.write_exited_process_file(4)
+        self.assertEqual(self.total(), (4, 4))
+        aggregate = os.path.join(self.directory, metrics.AGGREGATE_FILE)
+        with open(aggregate) as f:
+            data = json.load(f)
+        # As if the merging process died between writing the aggregate and deleting
+        metrics._write(os.path.join(self.directory, filename), {
+            'counters': [['rms_http_requests_total', [['view', 'test']], 4]],
+            'histograms': [],
+        })
+        data['merged'] = [filename]
+        metrics._write(aggregate, data)
+        self.assertEqual(self.total(), (4, 4))
+        self.assertNotIn(filename, os.listdir(self.directory))
+
+
+class DailyStatsBackfillTests(TestCase):
+    def test_backfilled_days_have_unknown_health(self):
+        create_restaurant()
+        self.assertEqual(backfill_daily_stats(days=3), 3)
+        self.assertEqual(DailyStats.objects.filter(system_health_avg__isnull=True).count(), 3)
+
+    def test_snapshot_without_health_history_stores_unknown_health(self):
+        cache.clear()
+        with mock.patch('superadmin.health.ensure_sampler_running') as ensure_sampler_running:
+            stats = store_daily_stats()
+        ensure_sampler_running.assert_not_called()
+        self.assertIsNone(stats.system_health_avg)
+
+    def test_snapshot_stores_the_rolling_average(self):
+        cache.clear()
+        for score in (80, 90):
+            record_sample({'score': score})
+        self.assertEqual(store_daily_stats().system_health_avg, 85.0)
+
+
+@mock.patch.multiple(metrics, ENABLED=True, ALLOWED_IPS=frozenset({'10.0.0.1'}), TOKEN='scrape-secret')
+class MetricsEndpointTests(TestCase):
+    """/metrics is off by default and only answers allowed scrapers"""
+
+    def setUp(self):
+        patcher = mock.patch.object(metrics, 'METRICS_DIR', tempfile.mkdtemp())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_disabled_endpoint_is_not_found(self):
+        with mock.patch.object(metrics, 'ENABLED', False):
+            self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.1').status_code, 404)
+
+    def test_allowed_address_can_scrape(self):
+        response = self.client.get('/metrics', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('rms_http_requests_total', response.content.decode())
+
+    def test_other_addresses_need_the_token(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.9').status_code, 403)
+        for header in ('Bearer wrong', 'scrape-secret', 'Basic scrape-secret'):
+            response = self.client.get('/metrics', REMOTE_ADDR='203.0.113.9', HTTP_AUTHORIZATION=header)
+            self.assertEqual(response.status_code, 403, header)
+        response = self.client.get('/metrics', REMOTE_ADDR='203.0.113.9', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+
+    def test_empty_token_grants_nothing(self):
+        with mock.patch.object(metrics, 'TOKEN', ''):
+            response = self.client.get('/metrics', REMOTE_ADDR='203.0.113.9', HTTP_AUTHORIZATION='Bearer ')
+        self.assertEqual(response.status_code, 403)
+
+
+class RestaurantAccessTests(TestCase):
+    def test_roles_do_not_depend_on_email_case(self):
+        restaurant = create_restaurant()
+        employee = Employee.objects.create(name='Cook', email='Cook@Example.com', role='kitchen', password='x')
+        employee.restaurants.add(restaurant)
+        # Both spellings share one cache entry, so the first lookup decides for both
+        self.assertEqual(get_restaurant_roles('cook@example.com'), {restaurant.pk: 'kitchen'})
+        self.assertEqual(get_restaurant_roles('Cook@Example.com'), {restaurant.pk: 'kitchen'})
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    DATABASE = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'rms_cache'}}
+
+    def test_process_local_cache_is_refused_without_debug(self):
+        with override_settings(DEBUG=False, CACHES=self.LOCMEM):
+            self.assertEqual([error.id for error in checks.check_shared_cache(None)], ['superadmin.E001'])
+        with override_settings(DEBUG=True, CACHES=self.LOCMEM):
+            self.assertEqual(checks.check_shared_cache(None), [])
+        with override_settings(DEBUG=False, CACHES=self.DATABASE):
+            self.assertEqual(checks.check_shared_cache(None), [])
+
+
+class GenerateDatasetTests(TestCase):
+    def generate(self, prefix):
+        call_command(
+            'generate_dataset', '--restaurants', '1', '--days', '3', '--orders-per-day', '5', '--vendors', '3',
+            '--as-of', '2025-06-01T12:00:00Z', '--prefix', prefix, stdout=StringIO(),
+        )
+        orders = Order.objects.filter(restaurant__email__startswith=f'{prefix}-')
+        return list(orders.order_by('created_at', 'total').values_list('created_at', 'status', 'total'))
+
+    def test_same_seed_and_as_of_generate_the_same_history(self):
+        first = self.generate('a')
+        self.assertTrue(first)
+        self.assertEqual(self.generate('b'), first)
+        self.assertTrue(User.objects.filter(email='a-admin@example.com', role='admin', is_staff=True).exists())
+        self.assertEqual(Vendor.objects.filter(email__startswith='a-').count(), 3)
+        self.assertTrue(Notification.objects.exists())
+
+
+class EndpointBenchmarkTests(TestCase):
+    def dataset_counts(self):
+        return (Restaurant.objects.count(), Order.objects.count(), OrderItem.objects.count(),
+                list(OrderItem.objects.order_by('pk').values_list('status', flat=True)),
+                list(RestaurantDailyRollup.objects.order_by('pk').values_list('orders_total', flat=True)))
+
+    def test_writes_admin_and_nested_routes_are_measured(self):
+        call_command('generate_dataset', '--restaurants', '1', '--days', '2', '--orders-per-day', '5',
+                     '--as-of', '2025-06-01', stdout=StringIO())
+        benchmark = EndpointBenchmark(Restaurant.objects.get().pk, runs=1, warmup=0)
+        names = ['submit-order', 'bulk-item-status', 'order-eta', 'station-queue', 'staff-login', 'dashboard_stats',
+                 'restaurant-create']
+        counts = self.dataset_counts()
+        results, skipped = benchmark.run(names)
+        # Every write was rolled back
+        self.assertEqual(self.dataset_counts(), counts)
+        self.assertEqual(skipped, {})
+        self.assertEqual(len(results), len(names))
+        for name, result in results.items():
+            self.assertLess(result['status'], 400, name)
+        self.assertEqual(results['staff_dashboard:submit-order']['method'], 'POST')
@@ -0,0 +1,108 @@
+"""
+JWTs carrying the holder's restaurant scope.
+
+Access tokens issued at login embed the employee id, role and restaurant
+ids, so dashboard requests can be authorized from the token alone (see
+``superadmin.authentication``). Changing an employee's role or restaurants
+bumps ``Employee.token_version``, which revokes tokens issued before it.
+The ``role`` claim comes from the User, so every token is also checked
+against the User's current role and is_active flag, cached per user and
+dropped whenever the User is saved or deleted. Both are only cached when
+the cache is shared by every worker; a per-process cache would keep
+accepting tokens another worker revoked, so they are read from the
+database instead.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .checks import is_shared_cache
+from .models import Employee, User
+
+
+TOKEN_VERSION_CACHE_TIMEOUT = getattr(settings, 'TOKEN_VERSION_CACHE_TIMEOUT', 300)
+
+TOKEN_VERSION_KEY = 'token_version:{}'
+
+USER_ROLE_KEY = 'token_user_role:{}'
+
+# Claims added on top of simplejwt's own
+SCOPE_CLAIMS = ('email', 'name', 'role', 'employee_id', 'employee_role', 'restaurant_ids', 'token_version')
+
+
+def get_token_version(employee_id):
+    """Current token version of an employee, or None if it no longer exists"""
+    versions = Employee.objects.filter(pk=employee_id).values_list('token_version', flat=True)
+    if not is_shared_cache():
+        return versions.first()
+    key = TOKEN_VERSION_KEY.format(employee_id)
+    version = cache.get(key)
+    if version is None:
+        version = versions.first()
+        if version is not None:
+            cache.set(key, version, timeout=TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def revoke_employee_tokens(employee_id):
+    """Invalidate every scoped token issued to an employee so far"""
+    Employee.objects.filter(pk=employee_id).update(token_version=F('token_version') + 1)
+    cache.delete(TOKEN_VERSION_KEY.format(employee_id))
+
+
+def forget_token_version(employee_id):
+    cache.delete(TOKEN_VERSION_KEY.format(employee_id))
+
+
+def get_user_role(user_id):
+    """Current role of an active user, or None if it was deactivated or deleted"""
+    roles = User.objects.filter(pk=user_id, is_active=True).values_list('role', flat=True)
+    if not is_shared_cache():
+        return roles.first()
+    key = USER_ROLE_KEY.format(user_id)
+    role = cache.get(key)
+    if role is None:
+        # Cached as '' so missing and inactive users are cached too
+        role = roles.first() or ''
+        cache.set(key, role, timeout=TOKEN_VERSION_CACHE_TIMEOUT)
+    return role or None
+
+
+def forget_user_role(user_id):
+    cache.delete(USER_ROLE_KEY.format(user_id))
+
+
+def scope_claims(user, employee=None):
+    """Claims describing which restaurants ``user`` may act on, and as what"""
+    if employee is None:
+        employee = Employee.objects.filter(email=user.email).first()
+
+    claims = {
+        'email': user.email,
+        'name': user.name,
+        'role': user.role,
+        'employee_id': None,
+        'employee_role': None,
+        'restaurant_ids': [],
+        'token_version': None,
+    }
+    if employee is not None:
+        claims.update({
+            'employee_id': employee.pk,
+            'employee_role': employee.role,
+            'restaurant_ids': sorted(restaurant.pk for restaurant in employee.restaurants.all()),
+            'token_version': employee.token_version,
+        })
+    return claims
+
+
+class ScopedRefreshToken(RefreshToken):
+    """Refresh token whose access tokens carry the scope claims"""
+
+    @classmethod
+    def for_user(cls, user, employee=None):
+        token = super().for_user(user)
+        for claim, value in scope_claims(user, employee).items():
+            token[claim] = value
+        return token
@@ -1,6 +1,7 @@
 from django.urls import path
 from .views import (
     system_health_percent, RestaurantCreateView, count_restaurants, dashboard_stats,
+    dashboard_cache_stats, slow_request_profiles, download_slow_request_profile,
     admin_login, owner_login, staff_login, logout, verify_token
 )
 
@@ -9,6 +10,9 @@ app_name = 'superadmin'
 urlpatterns = [
     # === ADMIN DASHBOARD & APIS ===
     path('dashboard-stats/', dashboard_stats, name='dashboard_stats'),
+    path('dashboard-cache/stats/', dashboard_cache_stats, name='dashboard_cache_stats'),
+    path('profiles/', slow_request_profiles, name='slow_request_profiles'),
+    path('profiles/<str:profile_id>/', download_slow_request_profile, name='download_slow_request_profile'),
 
     # Legacy endpoints (kept for backward compatibility)
     path('system-health/', system_health_percent, name='system_health'),
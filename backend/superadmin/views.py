@@ -1,6 +1,3 @@
-import psutil
-from django.db import connections
-from django.db.utils import OperationalError
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import generics, status
@@ -8,63 +5,51 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden
 from django.db import transaction
 from django.core.cache import cache
 from django.utils import timezone
 from datetime import timedelta
-from .models import Restaurant, Employee, User
+from .models import Restaurant, Employee, User, Vendor, DailyStats
 from .serializers import RestaurantSerializer
+from .health import format_change, get_history, get_latest_sample, get_rolling_average
+from .stats import get_platform_counters
+from .dashboard_cache import get_cache_stats
+from . import metrics as metrics_module
+from .metrics import render_metrics, scrape_allowed
+from .profiling import list_profiles, profile_path
+from .tokens import ScopedRefreshToken
 
 
 @api_view(['GET'])
 def system_health_percent(request):
-    score = 100
-
-    # CPU usage check
-    cpu_usage = psutil.cpu_percent(interval=0.5)
-    if cpu_usage > 80:
-        score -= 10
-
-    # Memory usage check
-    memory_usage = psutil.virtual_memory().percent
-    if memory_usage > 80:
-        score -= 10
-
-    # Disk usage check
-    disk_usage = psutil.disk_usage('/').percent
-    if disk_usage > 90:
-        score -= 10
-
-    # Note: In production, remove any artificial variations
-
-    # Database connection check
+    """Latest sampled health score with a short history and rolling average"""
     try:
-        connections['default'].cursor()
-    except OperationalError:
-        score -= 30
-
-    # Clamp score between 0 and 100
-    score = max(0, min(score, 100))
+        limit = int(request.GET.get('history', 12))
+    except ValueError:
+        limit = 12
 
-    # Store previous health value for tracking changes
-    previous_health = cache.get('previous_system_health', None)
-
-    # Calculate change only if we have a previous value
-    if previous_health is not None:
-        change = score - previous_health
-        change_str = f"{'+' if change > 0 else ''}{change}%" if change != 0 else "0%"
-    else:
-        # First time running, no previous value to compare
-        change_str = "0%"
-        previous_health = score  # Set for display purposes
-
-    # Store current score as previous for next time
-    cache.set('previous_system_health', score, timeout=3600)  # Store for 1 hour
+    latest = get_latest_sample()
+    history = get_history(limit)
+    previous = history[-2]['score'] if len(history) > 1 else None
 
     return Response({
-        'system_health_percent': score,
-        'previous_health': previous_health,
-        'change': change_str
+        'system_health_percent': latest['score'],
+        'previous_health': previous if previous is not None else latest['score'],
+        'change': format_change(latest['score'], previous),
+        'sampled_at': latest['timestamp'],
+        'rolling_average': get_rolling_average(),
+        'details': {
+            'cpu_usage': latest['cpu_usage'],
+            'memory_usage': latest['memory_usage'],
+            'disk_usage': latest['disk_usage'],
+            'database_ok': latest['database_ok'],
+            'database_latency_ms': latest['database_latency_ms']
+        },
+        'history': [
+            {'timestamp': sample['timestamp'], 'score': sample['score']}
+            for sample in history
+        ]
     })
 
 
@@ -92,59 +77,27 @@ def calculate_percentage_change(current, previous):
         return f"{change:.1f}%"
 
 
-def get_weekly_stats():
-    """Get statistics from 1 week ago for comparison using created_at dates"""
-    from datetime import timedelta
-    from django.utils import timezone
-    from superadmin.models import DailyStats
-
-    # Calculate date 1 week ago
-    one_week_ago = timezone.now() - timedelta(days=7)
-    one_week_ago_date = one_week_ago.date()
+def get_weekly_stats(counters=None):
+    """Get statistics from 1 week ago for comparison; never writes"""
+    one_week_ago_date = timezone.localdate() - timedelta(days=7)
 
-    # Try to get stored daily stats from 1 week ago
-    try:
-        daily_stats = DailyStats.objects.get(date=one_week_ago_date)
+    # Prefer the stored snapshot; otherwise use the created_at-based counters
+    daily_stats = DailyStats.objects.filter(date=one_week_ago_date).first()
+    if daily_stats is not None:
         return {
             'restaurants': daily_stats.restaurant_count,
             'employees': daily_stats.employee_count,
             'vendors': daily_stats.vendor_count,
             'date': daily_stats.date.isoformat()
         }
-    except DailyStats.DoesNotExist:
-        # If no stored stats, calculate based on created_at dates
-        restaurants_week_ago = Restaurant.objects.filter(created_at__lte=one_week_ago).count()
-        employees_week_ago = Employee.objects.filter(created_at__lte=one_week_ago).count()
-
-        return {
-            'restaurants': restaurants_week_ago,
-            'employees': employees_week_ago,
-            'vendors': 0,  # No vendors yet
-            'date': one_week_ago_date.isoformat()
-        }
-
 
-def store_daily_stats():
-    """Store current statistics for future weekly comparisons"""
-    from datetime import date
-    from superadmin.models import DailyStats
-
-    today = date.today()
-    current_restaurants = Restaurant.objects.count()
-    current_employees = Employee.objects.count()
-
-    # Update or create today's stats
-    daily_stats, created = DailyStats.objects.update_or_create(
-        date=today,
-        defaults={
-            'restaurant_count': current_restaurants,
-            'employee_count': current_employees,
-            'vendor_count': 0,  # No vendors yet
-            'system_health_avg': 90.0  # Default health score
-        }
-    )
-
-    return daily_stats
+    counters = counters or get_platform_counters()
+    return {
+        'restaurants': counters['restaurants']['week_ago'],
+        'employees': counters['employees']['week_ago'],
+        'vendors': counters['vendors']['week_ago'],
+        'date': one_week_ago_date.isoformat()
+    }
 
 
 @api_view(['GET'])
@@ -157,70 +110,35 @@ def dashboard_stats(request):
     - Vendor counts with percentage changes
     """
     try:
-        # === SYSTEM HEALTH CALCULATION ===
-        health_score = 100
-
-        # CPU usage check
-        cpu_usage = psutil.cpu_percent(interval=0.5)
-        if cpu_usage > 80:
-            health_score -= 10
-
-        # Memory usage check
-        memory_usage = psutil.virtual_memory().percent
-        if memory_usage > 80:
-            health_score -= 10
-
-        # Disk usage check
-        disk_usage = psutil.disk_usage('/').percent
-        if disk_usage > 90:
-            health_score -= 10
-
-        # Database connection check
-        try:
-            connections['default'].cursor()
-        except OperationalError:
-            health_score -= 30
-
-        # Clamp score between 0 and 100
-        health_score = max(0, min(health_score, 100))
-
-        # Track system health changes
-        previous_health = cache.get('previous_system_health', None)
-        if previous_health is not None:
-            health_change = health_score - previous_health
-            health_change_str = f"{'+' if health_change > 0 else ''}{health_change}%" if health_change != 0 else "0%"
-        else:
-            health_change_str = "0%"
-        cache.set('previous_system_health', health_score, timeout=3600)
+        # === SYSTEM HEALTH (read from the background sampler) ===
+        latest_health = get_latest_sample()
+        health_score = latest_health['score']
+        recent_health = get_history(2)
+        previous_health = recent_health[0]['score'] if len(recent_health) > 1 else None
+        health_change_str = format_change(health_score, previous_health)
 
-        # === STORE TODAY'S STATS FOR FUTURE COMPARISONS ===
-        store_daily_stats()
+        # === PLATFORM COUNTERS (one aggregate query, cached as a unit) ===
+        counters = get_platform_counters()
+        by_role = counters['employees_by_role']
 
         # === GET WEEKLY COMPARISON DATA ===
-        weekly_stats = get_weekly_stats()
+        weekly_stats = get_weekly_stats(counters)
 
         # === RESTAURANT STATISTICS ===
-        current_restaurants = Restaurant.objects.all().count()
+        current_restaurants = counters['restaurants']['total']
         restaurants_week_ago = weekly_stats['restaurants']
         restaurant_change = calculate_percentage_change(current_restaurants, restaurants_week_ago)
 
         # === USER/EMPLOYEE STATISTICS ===
-        current_users = Employee.objects.all().count()
+        current_users = counters['employees']['total']
         users_week_ago = weekly_stats['employees']
         user_change = calculate_percentage_change(current_users, users_week_ago)
 
         # Active users (assuming all employees are active for now)
         active_users = current_users
 
-        # Employee breakdown by role
-        owners = Employee.objects.filter(role='owner').count()
-        managers = Employee.objects.filter(role='manager').count()
-        kitchen_staff = Employee.objects.filter(role='kitchen_staff').count()
-        restaurant_staff = Employee.objects.filter(role='resturant_staff').count()
-
         # === VENDOR STATISTICS ===
-        # For now, vendors = 0 since there's no vendor model
-        current_vendors = 0
+        current_vendors = counters['vendors']['total']
         vendors_week_ago = weekly_stats['vendors']
         vendor_change = calculate_percentage_change(current_vendors, vendors_week_ago)
 
@@ -230,10 +148,13 @@ def dashboard_stats(request):
                 'current': health_score,
                 'previous': previous_health,
                 'change': health_change_str,
+                'rolling_average': get_rolling_average(),
+                'sampled_at': latest_health['timestamp'],
                 'details': {
-                    'cpu_usage': cpu_usage,
-                    'memory_usage': memory_usage,
-                    'disk_usage': disk_usage
+                    'cpu_usage': latest_health['cpu_usage'],
+                    'memory_usage': latest_health['memory_usage'],
+                    'disk_usage': latest_health['disk_usage'],
+                    'database_ok': latest_health['database_ok']
                 }
             },
             'restaurants': {
@@ -249,11 +170,13 @@ def dashboard_stats(request):
                 'change': user_change,
                 'comparison_period': '1 week',
                 'breakdown': {
-                    'owners': owners,
-                    'managers': managers,
-                    'kitchen_staff': kitchen_staff,
-                    'restaurant_staff': restaurant_staff
-                }
+                    'owners': by_role['owner']['total'],
+                    'managers': by_role['manager']['total'],
+                    'kitchen_staff': by_role['kitchen']['total'],
+                    'restaurant_staff': by_role['staff']['total'],
+                    'waiters': by_role['waiter']['total']
+                },
+                'by_role': {role: counts['total'] for role, counts in by_role.items()}
             },
             'vendors': {
                 'total': current_vendors,
@@ -273,6 +196,59 @@ def dashboard_stats(request):
     except Exception as e:
         return Response({'error': str(e)}, status=500)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dashboard_cache_stats(request):
+    """Hit/miss counters of the per-restaurant dashboard cache"""
+    if request.user.role != 'admin':
+        return Response({'error': 'Only administrators can view cache statistics'},
+                        status=status.HTTP_403_FORBIDDEN)
+
+    return Response({
+        'dashboards': get_cache_stats(),
+        'timestamp': timezone.now().isoformat()
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def slow_request_profiles(request):
+    """Newest stored profiles of slow dashboard requests"""
+    if request.user.role != 'admin':
+        return Response({'error': 'Only administrators can view request profiles'},
+                        status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 50)), 200))
+    except ValueError:
+        limit = 50
+    return Response({'profiles': list_profiles(limit)})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def download_slow_request_profile(request, profile_id):
+    """One stored profile as a JSON file"""
+    if request.user.role != 'admin':
+        return Response({'error': 'Only administrators can download request profiles'},
+                        status=status.HTTP_403_FORBIDDEN)
+
+    path = profile_path(profile_id)
+    if path is None:
+        return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'{profile_id}.json',
+                        content_type='application/json')
+
+
+def metrics(request):
+    """Request metrics of all server processes for Prometheus to scrape"""
+    if not metrics_module.ENABLED:
+        raise Http404
+    if not scrape_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 class RestaurantCreateView(generics.CreateAPIView):
     queryset = Restaurant.objects.all()
     serializer_class = RestaurantSerializer
@@ -295,6 +271,18 @@ class RestaurantCreateView(generics.CreateAPIView):
 
 # === AUTHENTICATION VIEWS ===
 
+def _employee_restaurants(user):
+    """The Employee behind a login and a summary of its restaurants"""
+    employee = Employee.objects.filter(email=user.email).prefetch_related('restaurants').first()
+    if employee is None:
+        return None, []
+    restaurants = [
+        {'id': restaurant.pk, 'name': restaurant.name, 'address': restaurant.address}
+        for restaurant in employee.restaurants.all()
+    ]
+    return employee, restaurants
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def admin_login(request):
@@ -323,7 +311,7 @@ def admin_login(request):
             }, status=status.HTTP_401_UNAUTHORIZED)
 
         # Generate tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = ScopedRefreshToken.for_user(user)
         access_token = refresh.access_token
 
         # Update last login
@@ -376,18 +364,17 @@ def owner_login(request):
                 'error': 'Invalid owner credentials'
             }, status=status.HTTP_401_UNAUTHORIZED)
 
+        # Restaurants this owner works at, also embedded in the token claims
+        employee, restaurants = _employee_restaurants(user)
+
         # Generate tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = ScopedRefreshToken.for_user(user, employee)
         access_token = refresh.access_token
 
         # Update last login
         user.last_login = timezone.now()
         user.save()
 
-        # Get restaurants owned by this user (assuming User model has restaurants relationship)
-        # For now, return empty list - this needs to be implemented based on your User model
-        restaurants = []
-
         return Response({
             'message': 'Owner login successful',
             'access_token': str(access_token),
@@ -438,17 +425,17 @@ def staff_login(request):
                 'error': 'Invalid staff credentials'
             }, status=status.HTTP_401_UNAUTHORIZED)
 
+        # Restaurants this staff member works at, also embedded in the token claims
+        employee, restaurants = _employee_restaurants(user)
+
         # Generate tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = ScopedRefreshToken.for_user(user, employee)
         access_token = refresh.access_token
 
         # Update last login
         user.last_login = timezone.now()
         user.save()
 
-        # Get restaurants for this staff member (empty for now)
-        restaurants = []
-
         return Response({
             'message': 'Staff login successful',
             'access_token': str(access_token),